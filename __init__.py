@@ -1,6 +1,10 @@
 from aqt import mw, gui_hooks
-from aqt.qt import QAction
-from .review import run_review
+
+# Ohne laufende Anki-GUI (mw is None) keine Menüs/Hooks; die Parse-Worker (parallel.py) laden diese Datei gar nicht
+if mw is not None:
+    from aqt.qt import QAction
+    from .review import run_review
+    from .dupindex import install_hooks
 
 # ---- Tools-Menü ----
 def _run_review_from_tools():
@@ -13,9 +17,6 @@ def _run_review_from_tools():
         pass
     run_review(mw, note_ids)
 
-tools_review = QAction("MC-Mapper…", mw)
-tools_review.triggered.connect(_run_review_from_tools)
-mw.form.menuTools.addAction(tools_review)
 
 # ---- Browser-Menüs ----
 def _ensure_browser_menu_actions(browser):
@@ -33,6 +34,15 @@ def on_browser_context_menu(browser, menu):
     if review_action and not any(a.text() == "MC-Mapper…" for a in menu.actions()):
         menu.addAction(review_action)
 
-# ---- Hooks ----
-gui_hooks.browser_menus_did_init.append(on_browser_menus_did_init)
-gui_hooks.browser_will_show_context_menu.append(on_browser_context_menu)
+# ---- Menü & Hooks ----
+if mw is not None:
+    tools_review = QAction("MC-Mapper…", mw)
+    tools_review.triggered.connect(_run_review_from_tools)
+    mw.form.menuTools.addAction(tools_review)
+
+    gui_hooks.browser_menus_did_init.append(on_browser_menus_did_init)
+    gui_hooks.browser_will_show_context_menu.append(on_browser_context_menu)
+
+# ---- Dublettenindizes (dupindex.py) ----
+if mw is not None:
+    install_hooks()  # Indizes bei Bearbeiten/Löschen aktuell halten, sonst veralten sie bis zum nächsten sync()
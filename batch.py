@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# batch.py — MC-Mapper ohne Anki-GUI: Regex-Parser + Dublettenprüfung über eine Collection-Kopie, auf mehrere Prozesse verteilt
+#
+#   python batch.py sammlung.apkg --out bericht.jsonl                 # nur Bericht
+#   python batch.py collection.anki2 --out bericht.jsonl --workers 8  # Original bleibt unangetastet (Kopie)
+#   python batch.py sammlung.apkg --out bericht.jsonl --write --copy migriert.anki2
+#
+# Gearbeitet wird immer auf einer Kopie (--copy, sonst neben --out). Anki darf dabei nicht dieselbe
+# Datei offen haben. --write legt die sicheren Vorschläge (Kriterien wie Auto-Accept) in der Kopie an.
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from standalone import load_addon
+
+
+def open_copy(src: str, dst: str):
+    """Collection-Datei kopieren bzw. .apkg in eine neue Collection importieren; liefert die offene Kopie."""
+    from anki.collection import Collection
+
+    if os.path.abspath(src) == os.path.abspath(dst):
+        raise SystemExit("Ziel der Kopie ist die Eingabedatei selbst – bitte --copy angeben.")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(dst + suffix):
+            os.remove(dst + suffix)
+
+    if src.lower().endswith((".apkg", ".colpkg")):
+        from anki.import_export_pb2 import ImportAnkiPackageRequest, ImportAnkiPackageOptions
+        col = Collection(dst)
+        col.import_anki_package(ImportAnkiPackageRequest(
+            package_path=os.path.abspath(src),
+            options=ImportAnkiPackageOptions(merge_notetypes=True, with_scheduling=True, with_deck_configs=True),
+        ))
+        return col
+
+    shutil.copy2(src, dst)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(src + suffix):
+            shutil.copy2(src + suffix, dst + suffix)
+    return Collection(dst)
+
+
+def select_notes(col, target, search: str | None, include_migrated: bool, tag_new: str) -> list:
+    """NoteRows der zu prüfenden Notizen (ohne Ziel-Notiztyp, ohne migrierte)."""
+    from mc_mapper.notedata import iter_note_rows
+    nids = col.find_notes(search) if search else col.db.list("select id from notes")
+    skip_mid = int(target["id"]) if target else None
+    return [row for row in iter_note_rows(col, nids)
+            if row.mid != skip_mid and (include_migrated or tag_new not in row.tags)]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="MC-Mapper Batch-Lauf ohne Anki-GUI")
+    ap.add_argument("input", help=".anki2/.anki21-Collection oder .apkg-Export")
+    ap.add_argument("--out", required=True, help="Bericht (JSON Lines, eine Zeile pro Notiz)")
+    ap.add_argument("--copy", help="Pfad der Arbeitskopie (Standard: neben --out)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Prozesse für den Parser (1 = ohne Pool)")
+    ap.add_argument("--search", help="Anki-Suche zur Auswahl der Notizen (Standard: alle)")
+    ap.add_argument("--target-model", help="Ziel-Notiztyp (Standard: config.TARGET_MODEL_NAME)")
+    ap.add_argument("--threshold", type=float, default=0.85, help="Schwelle der Fuzzy-Dublettenprüfung")
+    ap.add_argument("--include-migrated", action="store_true", help="auch bereits migrierte Notizen prüfen")
+    ap.add_argument("--write", action="store_true", help="sichere Vorschläge in der Kopie anlegen")
+    ap.add_argument("--skip-duplicates", action="store_true", help="mit --write: Vorschläge mit Dublette auslassen")
+    ap.add_argument("--header", default="", help="mit --write: Kopfzeile für neue Notizen")
+    ap.add_argument("--state-dir", help="Ordner für Fuzzy-Index & Caches (Standard: temporär)")
+    args = ap.parse_args(argv)
+
+    out_dir = os.path.dirname(os.path.abspath(args.out))
+    copy_path = args.copy or os.path.join(out_dir, os.path.splitext(os.path.basename(args.input))[0] + ".mc-mapper.anki2")
+    state_dir = args.state_dir or tempfile.mkdtemp(prefix="mc_mapper_batch_")
+    os.makedirs(state_dir, exist_ok=True)
+
+    load_addon(state_dir)
+    from mc_mapper import config
+    from mc_mapper.parallel import ParsePool, field_jobs
+    from mc_mapper.dupindex import get_key_index
+    from mc_mapper.util import find_model_by_name, find_similar_notes_fuzzy
+
+    t0 = time.perf_counter()
+    col = open_copy(args.input, copy_path)
+    try:
+        target = find_model_by_name(col, args.target_model or config.TARGET_MODEL_NAME)
+        if target is None:
+            print(f"Ziel-Notiztyp '{args.target_model or config.TARGET_MODEL_NAME}' fehlt – keine Dublettenprüfung.", file=sys.stderr)
+            if args.write:
+                raise SystemExit("--write braucht den Ziel-Notiztyp.")
+
+        rows = select_notes(col, target, args.search, args.include_migrated, config.TAG_NEW)
+        nids = [row.id for row in rows]
+        jobs = field_jobs(col, rows)
+        keys = get_key_index(col, target) if target is not None else None
+        print(f"{len(nids)} Notizen in {len(jobs)} Aufträgen, {max(args.workers, 1)} Prozesse")
+
+        counts = {"safe": 0, "warning": 0, "no_proposal": 0, "duplicate": 0}
+        safe = []
+        done = 0
+        with open(args.out, "w", encoding="utf-8") as fh:
+            def on_chunk(result):
+                nonlocal done
+                # Dubletten im Hauptprozess: Index und Collection gibt es nur hier
+                for nid, prop, warnings, key_tag in result:
+                    hits, is_fuzzy = (keys.lookup(key_tag, exclude=(nid,)) if keys is not None else []), False
+                    if prop and not hits and target is not None and prop.get("Frage"):
+                        hits = [h for h, _ in find_similar_notes_fuzzy(col, prop["Frage"], threshold=args.threshold, model=target) if h != nid]
+                        is_fuzzy = bool(hits)
+                    status = "no_proposal" if not prop else ("warning" if warnings else "safe")
+                    counts[status] += 1
+                    counts["duplicate"] += bool(hits)
+                    if status == "safe" and not (args.skip_duplicates and hits):
+                        safe.append((nid, prop))
+                    fh.write(json.dumps({
+                        "nid": nid, "status": status, "prop": prop, "warnings": warnings,
+                        "key_tag": key_tag, "has_duplicate": bool(hits), "is_fuzzy_duplicate": is_fuzzy,
+                        "duplicates": hits[:10],
+                    }, ensure_ascii=False) + "\n")
+                done += len(result)
+                print(f"\r{done}/{len(nids)} geprüft", end="", flush=True)
+
+            pool = ParsePool(args.workers)
+            try:
+                pool.parse(jobs, on_chunk)
+            finally:
+                pool.shutdown()
+        print()
+        if pool.error is not None:
+            print(f"Prozess-Pool nicht nutzbar, sequentiell weitergerechnet: {pool.error!r}", file=sys.stderr)
+
+        if args.write and safe:
+            from mc_mapper.bulk import commit_proposals
+            res = commit_proposals(col, target, safe, args.header, undo_name="MC-Mapper Batch")
+            print(f"{res.count} Notizen angelegt ({res.rate:.0f}/s)")
+    finally:
+        col.close()
+
+    print(f"sicher {counts['safe']} · Warnungen {counts['warning']} · ohne Vorschlag {counts['no_proposal']}"
+          f" · mit Dublette {counts['duplicate']} · {time.perf_counter() - t0:.1f} s")
+    print(f"Bericht: {args.out}\nArbeitskopie: {copy_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
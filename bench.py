@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# bench.py — Benchmarks der Parse-/Dubletten-Pfade ohne Anki (Stand-in-Collection + synthetische Altfragen)
+#
+#   python bench.py                          # 1k/10k/100k, Vergleich mit bench_baseline.json
+#   python bench.py --sizes 1000 10000       # nur diese Größen
+#   python bench.py --save                   # Ergebnis als neue Baseline speichern
+#   python bench.py --check                  # Exit-Code 1 bei Regression > --tolerance (relativ zur Kalibrierung)
+#   python bench.py --verify                 # zusätzlich: Sanitizer gegen die bs4-Referenz prüfen
+#   python bench.py --html collection.anki2  # Sanitizer auf echten Feldern messen (Kopie der eigenen Sammlung
+#                                            # oder JSON-Liste; Standard: tests/data/exam_html.json)
+import os
+import sys
+import json
+import time
+import types
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import importlib
+import tracemalloc
+
+from standalone import load_addon as load_package, PACKAGE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "bench_baseline.json")
+DEFAULT_SIZES = (1000, 10000, 100000)
+FILTER_SAMPLE = 2000     # so viele Notizen "ausgewählt" für apply_all_filters
+QUERY_SAMPLE = 1000      # Fuzzy-Abfragen pro Lauf
+VERIFY_SAMPLE = 2000     # Notizen für den bs4-Vergleich
+PATHOLOGICAL_SAMPLE = 200  # lange Fallvignetten mit vielen einzelnen Buchstaben (_pick_best_sequence)
+EXAM_HTML_PATH = os.path.join(HERE, "tests", "data", "exam_html.json")
+EXAM_HTML_ITEMS = 5000     # Prüfungsfelder pro Messung (die Liste wird bei Bedarf wiederholt)
+REPEAT_BELOW = 0.5         # Stufen unter 0.5 s werden 3x gemessen, es zählt der schnellste Lauf
+CALIBRATION = "Kalibrierung"
+SOURCE_MODELS = ("Basic (Altfrage)", "MC-Struktur")
+
+
+def load_addon():
+    load_package()
+    mods = {m: importlib.import_module(f"{PACKAGE}.{m}") for m in ("config", "util", "parsing", "dupindex", "cache", "noteinfo")}
+    return types.SimpleNamespace(**mods)
+
+
+# ---- Stand-in für Collection/Note (nur was die Hot Paths benutzen)
+_SCHEMA = """
+create table notes (id integer primary key, guid text, mid integer, mod integer, usn integer,
+                    tags text, flds text, sfld text, csum integer, flags integer, data text);
+create table cards (id integer primary key, nid integer, did integer, ord integer);
+create index ix_notes_mid on notes (mid);
+create index ix_cards_nid on cards (nid);
+"""
+
+
+class BenchDB:
+    """Wie anki.dbproxy: all/first/scalar/list mit positionalen Parametern."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def all(self, sql, *args):
+        return self._conn.execute(sql, args).fetchall()
+
+    def list(self, sql, *args):
+        return [row[0] for row in self._conn.execute(sql, args)]
+
+    def first(self, sql, *args):
+        row = self._conn.execute(sql, args).fetchone()
+        return list(row) if row is not None else None
+
+    def scalar(self, sql, *args):
+        row = self._conn.execute(sql, args).fetchone()
+        return row[0] if row is not None else None
+
+    def execute(self, sql, *args):
+        return self.all(sql, *args)
+
+
+class BenchModels:
+    def __init__(self):
+        self._by_id = {}
+
+    def add(self, mid, name, field_names):
+        model = {"id": mid, "name": name, "flds": [{"name": n, "ord": i} for i, n in enumerate(field_names)]}
+        self._by_id[mid] = model
+        return model
+
+    def all(self):
+        return list(self._by_id.values())
+
+    def get(self, mid):
+        return self._by_id.get(mid)
+
+    def by_name(self, name):
+        return next((m for m in self._by_id.values() if m["name"] == name), None)
+
+
+class BenchNote:
+    def __init__(self, col, nid, mid, mod, tags, flds):
+        self.col = col
+        self.id = nid
+        self.mid = mid
+        self.mod = mod
+        self.tags = tags.split()
+        self.fields = flds.split("\x1f")
+        self._fmap = {f["name"]: f["ord"] for f in col.models.get(mid)["flds"]}
+
+    def note_type(self):
+        return self.col.models.get(self.mid)
+
+    model = note_type
+
+    def keys(self):
+        return list(self._fmap)
+
+    def __getitem__(self, key):
+        return self.fields[self._fmap[key]]
+
+
+class BenchCollection:
+    """
+    SQLite im Speicher mit Ankis notes/cards-Schema. find_notes kennt nur, was das Add-on
+    benutzt: tag:"…" (LIKE-Scan über alle Notizen wie bei Anki), "deck:current" und Wortsuche.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.models = BenchModels()
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self.db = BenchDB(self._conn)
+        self.media = types.SimpleNamespace(dir=lambda: os.path.join(os.path.dirname(path), "collection.media"))
+        self._next_id = 1_600_000_000_000
+
+    def add_notes(self, mid, rows, did=1):
+        """rows: [(fields, tags)] -> nids"""
+        nids, notes, cards = [], [], []
+        for fields, tags in rows:
+            self._next_id += 1
+            nid = self._next_id
+            nids.append(nid)
+            tag_str = f" {' '.join(tags)} " if tags else ""
+            notes.append((nid, f"g{nid}", mid, nid // 1000, -1, tag_str, "\x1f".join(fields), fields[0], 0, 0, ""))
+            cards.append((nid, nid, did, 0))
+        self._conn.executemany("insert into notes values (?,?,?,?,?,?,?,?,?,?,?)", notes)
+        self._conn.executemany("insert into cards values (?,?,?,?)", cards)
+        return nids
+
+    def get_note(self, nid):
+        row = self._conn.execute("select id, mid, mod, tags, flds from notes where id = ?", (nid,)).fetchone()
+        if row is None:
+            raise KeyError(nid)
+        return BenchNote(self, *row)
+
+    def find_notes(self, query: str):
+        query = query.strip()
+        if query.startswith("tag:"):
+            tag = query[4:].strip('"')
+            return self.db.list("select id from notes where tags like ?", f"% {tag} %")
+        if query == "deck:current":
+            return self.db.list("select id from notes")
+        return self.db.list("select id from notes where flds like ?", f"%{query.strip(chr(34))}%")
+
+
+# ---- Synthetische Altfragen
+_WORDS = (
+    "Myokardinfarkt Troponin Herzinsuffizienz Vorhofflimmern Antikoagulation Niereninsuffizienz Kreatinin "
+    "Hyperkaliämie Diabetes Insulin Metformin Pneumonie Antibiotikum Sepsis Laktat Leberzirrhose Aszites "
+    "Pankreatitis Lipase Appendizitis Cholezystitis Ikterus Anämie Ferritin Thrombozyten Heparin Lungenembolie "
+    "D-Dimere Schlaganfall Lyse Epilepsie Meningitis Liquor Hypothyreose TSH Cortisol Morbus Addison Cushing "
+    "Osteoporose Fraktur Arthrose Gicht Harnsäure Asthma COPD Spirometrie Tuberkulose Hepatitis Antikörper"
+).split()
+_FILLER = "welche der folgenden aussagen zum trifft zu ist bei typischerweise nicht am ehesten die der das ein eine".split()
+
+
+def _sentence(rng, n_min=6, n_max=16):
+    words = [rng.choice(_WORDS) if rng.random() < 0.4 else rng.choice(_FILLER) for _ in range(rng.randint(n_min, n_max))]
+    return " ".join(words).capitalize()
+
+
+def _img(rng):
+    return f'<img src="paste-{rng.getrandbits(48):012x}.jpg">'
+
+
+def make_question(rng):
+    """Eine Altfrage als dict: question, options, correct (Index) und gelegentlich ein Bild."""
+    n_opts = 5 if rng.random() < 0.85 else rng.choice((3, 4))
+    q = _sentence(rng) + "?"
+    if rng.random() < 0.1:
+        q += "<br>" + _img(rng)
+    opts = [_sentence(rng, 2, 7) for _ in range(n_opts)]
+    if rng.random() < 0.05:
+        opts[rng.randrange(n_opts)] += " " + _img(rng)
+    return {"question": q, "options": opts, "correct": rng.randrange(n_opts)}
+
+
+def pathological_front(rng) -> str:
+    """
+    Fallvignette wie aus Altklausuren: Hunderte Wörter mit einzelnen Buchstaben (Hepatitis B, Typ a,
+    Gruppe C …) und vielen „a)“-Aufzählungen, Optionen erst am Ende. Worst Case für die Marker-Suche.
+    """
+    parts = []
+    n_words = rng.randint(300, 900) if rng.random() < 0.9 else rng.randint(4000, 6000)  # einzelne Ausreißer
+    for _ in range(n_words):
+        r = rng.random()
+        if r < 0.25:
+            parts.append(rng.choice("aAbBcCdDeE"))
+        elif r < 0.32:
+            parts.append("a" + rng.choice(")).:-"))
+        else:
+            parts.append(rng.choice(_WORDS) if rng.random() < 0.4 else rng.choice(_FILLER))
+    # Hälfte ohne Klammer-Marker -> strikte Suche findet nichts, die lockere läuft zusätzlich
+    mark = rng.choice((")", ""))
+    opts = " ".join(f"{ch}{mark} {_sentence(rng, 2, 6)}" for ch in "ABCDE"[:rng.choice((3, 4, 5))])
+    return " ".join(parts) + "? " + opts
+
+
+def inline_fields(rng, qa):
+    """Vorderseite mit A–E-Markern, Rückseite mit Buchstabe / 'C) Text' / Binärcode."""
+    style = rng.random()
+    letters = "ABCDE" if style < 0.5 else "abcde"
+    mark = rng.choice((")", ".", ":", ")")) if style < 0.85 else ""
+    sep = rng.choice(("<br>", "<div>", " "))
+    front = f"<div>{qa['question']}</div>"
+    for i, opt in enumerate(qa["options"]):
+        front += f"{sep}{letters[i]}{mark} {opt}" + ("</div>" if sep == "<div>" else "")
+    if rng.random() < 0.05:
+        front = qa["question"] + " " + " ".join(qa["options"])  # ohne Marker -> Warnung
+    c = qa["correct"]
+    kind = rng.random()
+    if kind < 0.4:
+        back = "ABCDE"[c]
+    elif kind < 0.6:
+        back = f"{'ABCDE'[c]}) {qa['options'][c]}"
+    elif kind < 0.8:
+        back = " ".join("1" if i == c else "0" for i in range(5))
+    else:
+        back = "".join("1" if i == c else "0" for i in range(5))
+    if rng.random() < 0.3:
+        back += "<br>Kommentar: " + _sentence(rng)
+    return [front, back]
+
+
+def structured_fields(rng, qa):
+    """Question, Q_1..Q_5, Answers (01000 / Buchstabe), Comment."""
+    opts = qa["options"] + [""] * (5 - len(qa["options"]))
+    c = qa["correct"]
+    sol = "".join("1" if i == c else "0" for i in range(5)) if rng.random() < 0.8 else "ABCDE"[c]
+    if rng.random() < 0.05:
+        sol = ""  # ohne Lösung -> Warnung
+    return [qa["question"], *opts, sol, _sentence(rng) if rng.random() < 0.5 else ""]
+
+
+def target_fields(qa, fields):
+    c = qa["correct"]
+    opts = [qa["options"][c]] + [o for i, o in enumerate(qa["options"]) if i != c]
+    values = {"Frage": qa["question"], "Kopfzeile": "", "Eigene Notizen": "", "Antwort": ""}
+    for i, name in enumerate(("Antwort A", "Antwort B", "Antwort C", "Antwort D", "Antwort E")):
+        values[name] = opts[i] if i < len(opts) else ""
+    return [values[f] for f in fields]
+
+
+def build_collection(addon, n: int, seed: int, path: str):
+    """
+    n Quellnotizen (70 % Inline-Marker, 30 % strukturiert) plus Ziel-Notiztyp mit bereits
+    migrierten Fragen: ~5 % der Quellfragen exakt, ~5 % leicht abgewandelt; ~3 % Dubletten
+    innerhalb der Quellen; ~10 % schon mit TAG_NEW markiert.
+    """
+    rng = random.Random(seed)
+    col = BenchCollection(path)
+    basic = col.models.add(1, SOURCE_MODELS[0], ["Vorderseite", "Rückseite"])
+    struct = col.models.add(2, SOURCE_MODELS[1], ["Question", "Q_1", "Q_2", "Q_3", "Q_4", "Q_5", "Answers", "Comment"])
+    target = col.models.add(3, addon.config.TARGET_MODEL_NAME, addon.config.FIELDS)
+
+    inline_rows, struct_rows, target_rows, seen = [], [], [], []
+    for _ in range(n):
+        qa = dict(rng.choice(seen)) if seen and rng.random() < 0.03 else make_question(rng)
+        seen.append(qa)
+        tags = [addon.config.TAG_NEW] if rng.random() < 0.1 else []
+        if rng.random() < 0.7:
+            inline_rows.append((inline_fields(rng, qa), tags))
+        else:
+            struct_rows.append((structured_fields(rng, qa), tags))
+        r = rng.random()
+        if r < 0.05:
+            target_rows.append((target_fields(qa, addon.config.FIELDS), []))
+        elif r < 0.10:
+            near = dict(qa, question=qa["question"].replace(" ", "  ", 1).rstrip("?") + " genau?")
+            target_rows.append((target_fields(near, addon.config.FIELDS), []))
+    src_ids = col.add_notes(basic["id"], inline_rows) + col.add_notes(struct["id"], struct_rows)
+    col.add_notes(target["id"], target_rows)
+    return col, src_ids, target
+
+
+def load_exam_html(path: str) -> list:
+    """Feld-HTML aus einer JSON-Liste oder allen Notizen einer Sammlung (.anki2, nur lesend)."""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as fh:
+            return [v for v in json.load(fh) if v]
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [v for (flds,) in conn.execute("select flds from notes") for v in flds.split("\x1f") if v]
+    finally:
+        conn.close()
+
+
+def has_bs4() -> bool:
+    try:
+        import bs4  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ---- Messung
+class Stage:
+    def __init__(self, name, setup, run):
+        self.name = name
+        self.setup = setup   # () -> ctx (nicht gemessen)
+        self.run = run       # (ctx) -> Anzahl verarbeiteter Elemente
+
+
+def calibration_stage() -> Stage:
+    """
+    Fester reiner Python-Aufwand (Strings, Dicts, Regex) als Maß für die Maschine. --check vergleicht
+    jede Stufe als Verhältnis zu dieser Messung aus demselben Lauf; so fällt die Tagesform der
+    Maschine (CPU-Takt, andere Last) heraus und eine alte Baseline bleibt vergleichbar.
+    """
+    import re
+    word_re = re.compile(r"\w+")
+    text = " ".join(f"Antwort{i} &nbsp;<b>wert</b>" for i in range(40))
+
+    def run(_):
+        for _ in range(2000):
+            counts = {}
+            for w in word_re.findall(text.lower()):
+                counts[w] = counts.get(w, 0) + 1
+            "|".join(sorted(counts))
+        return 2000
+    return Stage(CALIBRATION, lambda: None, run)
+
+
+def _timed_run(stage: Stage):
+    ctx = stage.setup()
+    t0 = time.perf_counter()
+    count = stage.run(ctx)
+    return count, time.perf_counter() - t0
+
+
+def measure(stage: Stage, memory: bool = True) -> dict:
+    count, seconds = _timed_run(stage)
+    if seconds < REPEAT_BELOW:
+        seconds = min([seconds] + [_timed_run(stage)[1] for _ in range(2)])
+    result = {"seconds": round(seconds, 4), "items": count, "per_item_us": round(seconds / max(count, 1) * 1e6, 2)}
+    if memory:
+        # Zweiter Lauf unter tracemalloc (verfälscht sonst die Zeit)
+        ctx = stage.setup()
+        tracemalloc.start()
+        stage.run(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_kb"] = round(peak / 1024)
+    return result
+
+
+def stages_for(addon, col, src_ids, target, tmpdir, exam_html) -> list:
+    notes = [col.get_note(nid) for nid in src_ids]
+    fields = [v for note in notes for v in note.fields if v]
+    inline_texts = [addon.util.strip_html_keep_media(n.fields[0]) for n in notes if n.mid == 1]
+    questions = [addon.parsing.NoteIR.from_note(n).prop for n in notes[:QUERY_SAMPLE]]
+    questions = [p["Frage"] for p in questions if p]
+    patho_rng = random.Random(len(src_ids))
+    patho_texts = [pathological_front(patho_rng) for _ in range(PATHOLOGICAL_SAMPLE)]
+    selection = src_ids[:FILTER_SAMPLE]
+    config = {"duplicate_threshold": 0.85}
+    cache_path = os.path.join(tmpdir, "proposals.sqlite")
+    q_ord = next(f["ord"] for f in target["flds"] if f["name"] == "Frage")
+
+    def sanitize(_):
+        for v in fields:
+            addon.util.sanitize_keep_img(v)
+        return len(fields)
+
+    exam = (exam_html * (EXAM_HTML_ITEMS // max(len(exam_html), 1) + 1))[:EXAM_HTML_ITEMS] if exam_html else []
+
+    def sanitize_exam(fn):
+        def run(_):
+            for v in exam:
+                fn(v)
+            return len(exam)
+        return run
+
+    def pick(_):
+        for t in inline_texts:
+            addon.parsing._pick_best_sequence(t)
+        return len(inline_texts)
+
+    def pick_patho(fn):
+        def run(_):
+            for t in patho_texts:
+                fn(t)
+            return len(patho_texts)
+        return run
+
+    def parse(_):
+        for n in notes:
+            addon.parsing.parse_note_to_proposal(n)
+        return len(notes)
+
+    def build_index(_):
+        addon.dupindex.FuzzyIndex(target["id"], q_ord).sync(col)
+        return len(col.db.list("select id from notes where mid = ?", target["id"]))
+
+    def fuzzy_setup():
+        addon.util.find_similar_notes_fuzzy(col, "warmup", model=target)  # Index einmal aufbauen
+        return None
+
+    def fuzzy(_):
+        for q in questions:
+            addon.util.find_similar_notes_fuzzy(col, q, threshold=0.85, model=target)
+        return len(questions)
+
+    def fresh_cache():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        return addon.cache.ProposalCache(cache_path, addon.parsing.PARSER_VERSION)
+
+    def filters_cold_setup():
+        return addon.noteinfo.NoteInfoStore(col, target, config, fresh_cache())
+
+    def filters_warm_setup():
+        store = filters_cold_setup()
+        store.filter_ids(selection)
+        return addon.noteinfo.NoteInfoStore(col, target, config, addon.cache.ProposalCache(cache_path, addon.parsing.PARSER_VERSION))
+
+    def filters(store):
+        store.filter_ids(selection)
+        return len(selection)
+
+    return [
+        Stage("sanitize_keep_img", lambda: None, sanitize),
+        Stage("sanitize (Prüfungs-HTML)", lambda: None, sanitize_exam(addon.util.sanitize_keep_img)),
+    ] + ([
+        Stage("  bs4-Referenz (Prüfung)", lambda: None, sanitize_exam(addon.util._sanitize_keep_img_bs4)),
+    ] if has_bs4() else []) + [
+        Stage("_pick_best_sequence", lambda: None, pick),
+        Stage("_pick_best_sequence (patho.)", lambda: None, pick_patho(addon.parsing._pick_best_sequence)),
+        Stage("parse_note_to_proposal", lambda: None, parse),
+        Stage("fuzzy index build", lambda: None, build_index),
+        Stage("find_similar_notes_fuzzy", fuzzy_setup, fuzzy),
+        Stage("apply_all_filters (kalt)", filters_cold_setup, filters),
+        Stage("apply_all_filters (warm)", filters_warm_setup, filters),
+    ]
+
+
+def verify_sanitizer(addon, col, src_ids, exam_html) -> int:
+    """Streaming-Sanitizer gegen die bs4-Referenz (synthetische Felder + Prüfungs-HTML); Anzahl Abweichungen."""
+    media_dir = col.media.dir()
+    values = [v for nid in src_ids[:VERIFY_SAMPLE] for v in col.get_note(nid).fields] + list(exam_html)
+    bad = 0
+    for v in values:
+        for kw in ({}, {"preview": True, "media_dir": media_dir}):
+            if addon.util.sanitize_keep_img(v, **kw) != addon.util._sanitize_keep_img_bs4(v, **kw):
+                bad += 1
+    return bad
+
+
+# ---- Baseline
+def load_baseline() -> dict:
+    try:
+        with open(BASELINE_PATH, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results: dict):
+    data = load_baseline()
+    data["machine"] = {"python": platform.python_version(), "platform": platform.platform(), "cpu": platform.processor()}
+    data.setdefault("sizes", {}).update(results)
+    with open(BASELINE_PATH, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, ensure_ascii=False)
+        fh.write("\n")
+
+
+def report(size: int, results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Druckt die Tabelle; liefert die Stufen, die langsamer als Baseline * (1 + tolerance) sind.
+    Verglichen wird µs/Element geteilt durch die Kalibrierung desselben Laufs (fehlt sie in der
+    Baseline: absolute Zeiten). Die Kalibrierung selbst zeigt nur, wie schnell die Maschine gerade ist.
+    """
+    regressions = []
+    base = baseline.get("sizes", {}).get(str(size), {})
+    cal = results.get(CALIBRATION, {}).get("per_item_us")
+    base_cal = (base.get(CALIBRATION) or {}).get("per_item_us")
+    scale = cal / base_cal if cal and base_cal else 1.0
+    print(f"\n== {size} Notizen ==")
+    print(f"{'Stufe':<28}{'Zeit':>10}{'Elemente':>10}{'µs/Elem.':>11}{'Peak':>10}{'vs. Baseline':>14}")
+    for name, r in results.items():
+        delta = ""
+        b = base.get(name)
+        if name == CALIBRATION and b and b.get("per_item_us"):
+            delta = f"Maschine {r['per_item_us'] / b['per_item_us'] - 1:+.0%}"
+        elif b and b.get("per_item_us"):
+            change = r["per_item_us"] / (b["per_item_us"] * scale) - 1
+            delta = f"{change:+.0%}"
+            if change > tolerance:
+                delta += " !"
+                regressions.append(name)
+        peak = f"{r['peak_kb'] / 1024:.1f} MB" if "peak_kb" in r else "–"
+        print(f"{name:<28}{r['seconds']:>9.3f}s{r['items']:>10}{r['per_item_us']:>11.1f}{peak:>10}{delta:>14}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="MC-Mapper Benchmarks ohne Anki")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--save", action="store_true", help="Ergebnis als Baseline speichern")
+    ap.add_argument("--check", action="store_true", help="Exit-Code 1 bei Regression")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="erlaubte Verlangsamung pro Element relativ zur Kalibrierung (0.25 = 25 %%)")
+    ap.add_argument("--no-memory", action="store_true", help="ohne tracemalloc-Lauf (halbe Laufzeit)")
+    ap.add_argument("--verify", action="store_true", help="Sanitizer gegen die bs4-Referenz prüfen")
+    ap.add_argument("--html", default=EXAM_HTML_PATH, help="Feld-HTML für den Sanitizer: JSON-Liste oder .anki2")
+    args = ap.parse_args(argv)
+
+    addon = load_addon()
+    baseline = load_baseline()
+    exam_html = load_exam_html(args.html)
+    print(f"Prüfungs-HTML: {len(exam_html)} Felder aus {args.html}")
+    all_results, regressions, skipped, failed = {}, [], [], False
+    if not has_bs4():
+        skipped.append("bs4-Referenz/Sanitizer-Vergleich (bs4 nicht installiert: pip install beautifulsoup4)")
+    with tempfile.TemporaryDirectory(prefix="mc_mapper_bench_") as tmpdir:
+        addon.util.USER_FILES = tmpdir  # Fuzzy-Index & Co. nicht in den Add-on-Ordner schreiben
+        for size in args.sizes:
+            t0 = time.perf_counter()
+            col, src_ids, target = build_collection(addon, size, args.seed, os.path.join(tmpdir, f"bench_{size}.anki2"))
+            print(f"\nCollection mit {size} Quellnotizen erzeugt ({time.perf_counter() - t0:.1f} s)")
+            if args.verify:
+                if has_bs4():
+                    bad = verify_sanitizer(addon, col, src_ids, exam_html)
+                    print(f"Sanitizer-Vergleich mit bs4: {bad} Abweichungen")
+                    failed |= bad > 0
+                else:
+                    print("Sanitizer-Vergleich mit bs4: ÜBERSPRUNGEN (bs4 nicht installiert)")
+            stages = [calibration_stage()] + stages_for(addon, col, src_ids, target, tmpdir, exam_html)
+            results = {s.name: measure(s, memory=not args.no_memory) for s in stages}
+            all_results[str(size)] = results
+            regressions += [f"{size}: {name}" for name in report(size, results, baseline, args.tolerance)]
+
+    if args.save:
+        save_baseline(all_results)
+        print(f"\nBaseline gespeichert: {BASELINE_PATH}")
+    if regressions:
+        print("\nLangsamer als Baseline:", ", ".join(regressions))
+    for what in skipped:
+        print("Übersprungen:", what)
+    return 1 if failed or (args.check and regressions) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
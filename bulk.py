@@ -0,0 +1,118 @@
+# bulk.py — Sammel-Schreibpfad: neue Notizen + TAG_NEW in wenigen Backend-Aufrufen, ein Undo-Schritt
+import time
+
+from anki.notes import Note
+
+from anki.collection import OpChanges
+
+try:
+    from anki.collection import AddNoteRequest  # ab 2.1.55
+except ImportError:
+    AddNoteRequest = None
+
+from .config import FIELDS, TAG_NEW
+from .notedata import SQL_CHUNK
+from .util import with_img_breaks_exact
+from .stats import stage
+
+BATCH_SIZE = 500
+
+
+class BulkResult:
+    """Ergebnis von commit_proposals; `changes` macht es als CollectionOp-Rückgabe nutzbar."""
+
+    def __init__(self, changes, count: int, seconds: float):
+        self.changes = changes
+        self.count = count
+        self.seconds = seconds
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.seconds if self.seconds > 0 else float(self.count)
+
+
+def build_note(col, model, prop: dict, header: str = "") -> Note:
+    n = Note(col, model)
+    for f in FIELDS:
+        val = prop.get(f, "")
+        if f == "Kopfzeile" and header and not val:
+            val = header
+        n[f] = with_img_breaks_exact(val)
+    return n
+
+
+def resolve_deck_ids(col, nids, default_did) -> dict:
+    """Deck der ersten Karte je Quellnotiz, SQL_CHUNK nids pro Abfrage."""
+    nids = list(nids)
+    dids = {}
+    for i in range(0, len(nids), SQL_CHUNK):
+        ids = ",".join(str(int(n)) for n in nids[i:i + SQL_CHUNK])
+        # SQLite: bei min() liefern die übrigen Spalten die Werte der Minimum-Zeile
+        rows = col.db.all(f"select nid, did, min(ord) from cards where nid in ({ids}) group by nid")
+        dids.update((nid, did) for nid, did, _ in rows)
+    return {int(n): dids.get(int(n), default_did) for n in nids}
+
+
+class BulkWriter:
+    """
+    Schreibt Vorschläge in Teilmengen, die finish() zu EINEM Undo-Schritt zusammenfasst.
+    write()/tag() dürfen mehrfach aufgerufen werden, aber nur innerhalb derselben Operation:
+    alles zwischen dem ersten Schreiben und finish() landet im Undo-Schritt, also auch
+    fremde Änderungen, wenn der GUI-Thread dazwischen frei wäre.
+    """
+
+    def __init__(self, col, model, header: str = "", undo_name: str = "MC-Mapper Auto-Accept"):
+        self.col = col
+        self.model = model
+        self.header = header
+        self.undo_name = undo_name
+        self.count = 0
+        self._started = time.perf_counter()
+        self._pos = None  # Undo-Marke erst beim ersten Schreiben -> kein leerer Undo-Eintrag
+
+    def _begin(self):
+        if self._pos is None:
+            self._pos = self.col.add_custom_undo_entry(self.undo_name)
+
+    @stage("db.bulk_write")
+    def write(self, items, on_progress=None):
+        """Legt für alle (quell_nid, prop) neue Notizen an und taggt die Quellen mit TAG_NEW."""
+        col = self.col
+        items = list(items)
+        if not items:
+            return
+        self._begin()
+        dids = resolve_deck_ids(col, [nid for nid, _ in items], col.decks.get_current_id())
+        for i in range(0, len(items), BATCH_SIZE):
+            batch = items[i:i + BATCH_SIZE]
+            notes = [(build_note(col, self.model, prop, self.header), dids[int(nid)]) for nid, prop in batch]
+            if AddNoteRequest is not None:
+                col.add_notes([AddNoteRequest(note=n, deck_id=did) for n, did in notes])
+            else:
+                for n, did in notes:
+                    col.add_note(n, did)
+            if on_progress:
+                on_progress(i + len(batch), len(items))
+        col.tags.bulk_add([nid for nid, _ in items], TAG_NEW)
+        self.count += len(items)
+
+    def tag(self, nids, tag: str):
+        """Taggt Quellnotizen ohne neue Notiz (landet im selben Undo-Schritt)."""
+        nids = list(nids)
+        if nids:
+            self._begin()
+            self.col.tags.bulk_add(nids, tag)
+
+    def finish(self) -> BulkResult:
+        changes = self.col.merge_undo_entries(self._pos) if self._pos is not None else OpChanges()
+        return BulkResult(changes, self.count, time.perf_counter() - self._started)
+
+
+def commit_proposals(col, model, items, header: str = "", undo_name: str = "MC-Mapper Auto-Accept", on_progress=None) -> BulkResult:
+    """
+    Legt für alle (quell_nid, prop) neue Notizen an und taggt die Quellen mit TAG_NEW.
+    Alles landet in EINEM Undo-Schritt. on_progress(done, total) wird pro Batch gerufen.
+    """
+    writer = BulkWriter(col, model, header, undo_name)
+    writer.write(items, on_progress)
+    return writer.finish()
@@ -0,0 +1,212 @@
+# cache.py — persistente Caches (SQLite-Sidecars in user_files): Vorschläge und LLM-Antworten
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+
+from .util import user_files_path, user_files_dir
+
+_SCHEMA = """
+create table if not exists proposals (
+    nid       integer primary key,
+    mod       integer not null,
+    version   integer not null,
+    data      text not null,
+    dup_stamp text
+)
+"""
+
+# Felder der Note-Info, die den Dublettenstatus beschreiben (hängen an anderen Notizen, nicht an mod)
+DUP_KEYS = ("key_tag", "has_duplicate", "is_fuzzy_duplicate")
+
+
+class ProposalCache:
+    """
+    Speichert Vorschlag, Warnungen und Dublettenstatus pro Notiz.
+    - Schlüssel ist die nid; ein Treffer zählt nur bei gleichem (mod, Parser-Version)
+      -> jede Änderung der Notiz invalidiert ihren Eintrag
+    - Der Dublettenstatus trägt zusätzlich einen dup_stamp (Stand des Ziel-Notiztyps);
+      passt er nicht mehr, wird nur der Dublettenteil neu berechnet
+    """
+
+    def __init__(self, path: str, version: int):
+        self.version = int(version)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    def get_many(self, keys) -> dict:
+        """keys: [(nid, mod), ...] -> {nid: (info, dup_stamp)} für gültige Einträge."""
+        wanted = {int(nid): int(mod) for nid, mod in keys}
+        out = {}
+        with self._lock:
+            for nid in list(wanted):
+                hit = self._pending.get(nid)
+                if hit and hit[0] == wanted[nid]:
+                    out[nid] = (hit[1], hit[2])
+                    del wanted[nid]
+            ids = list(wanted)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self._db.execute(
+                    f"select nid, mod, data, dup_stamp from proposals where version = ? and nid in ({','.join('?' * len(chunk))})",
+                    [self.version, *chunk],
+                ).fetchall()
+                for nid, mod, data, stamp in rows:
+                    if wanted.get(nid) != mod:
+                        continue
+                    try:
+                        out[nid] = (json.loads(data), stamp)
+                    except ValueError:
+                        pass
+        return out
+
+    def get(self, nid: int, mod: int):
+        return self.get_many([(nid, mod)]).get(int(nid))
+
+    def put(self, nid: int, mod: int, info: dict, dup_stamp: str | None):
+        with self._lock:
+            self._pending[int(nid)] = (int(mod), dict(info), dup_stamp)
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            rows = [
+                (nid, mod, self.version, json.dumps(info, ensure_ascii=False), stamp)
+                for nid, (mod, info, stamp) in self._pending.items()
+            ]
+            self._pending.clear()
+            self._db.executemany("insert or replace into proposals values (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+_CACHES = {}
+
+
+def get_proposal_cache(col, version: int) -> ProposalCache:
+    key = str(getattr(col, "path", ""))
+    cache = _CACHES.get(key)
+    if cache is None or cache.version != version:
+        if cache is not None:
+            # alte Verbindung schließen, sonst bleibt der Sidecar-Handle offen
+            try:
+                cache.close()
+            except Exception:
+                pass
+        path = user_files_path(col, "proposals.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cache = ProposalCache(path, version)
+        _CACHES[key] = cache
+    return cache
+
+
+def flush_all():
+    for cache in _CACHES.values():
+        try:
+            cache.flush()
+        except Exception:
+            pass
+
+
+# ---- LLM-Antworten (inhaltsadressiert, collection-übergreifend)
+_LLM_SCHEMA = """
+create table if not exists responses (
+    key       text primary key,
+    content   text not null,
+    size      integer not null,
+    last_used real not null
+)
+"""
+
+
+def llm_cache_key(prompt_version: int, model: str, prompt_text: str, images=()) -> str:
+    """Hash über Prompt-Version, Modell, Prompt-Text und die Bytes aller Bilder."""
+    h = hashlib.sha256()
+    for part in (str(prompt_version), model or "", prompt_text or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    for raw in images:
+        h.update(hashlib.sha256(raw).digest())
+    return h.hexdigest()
+
+
+class LlmCache:
+    """
+    Antwort-Cache für parse_with_llm mit LRU-Verdrängung nach Gesamtgröße.
+    hits/misses zählen pro Sitzung (Trefferquote für Statistik/Meldungen).
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(_LLM_SCHEMA)
+        self._db.execute("create index if not exists idx_responses_used on responses (last_used)")
+        self._db.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute("select content from responses where key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("update responses set last_used = ? where key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key: str, content: str):
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            self._db.execute("insert or replace into responses values (?, ?, ?, ?)", (key, content, size, time.time()))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("select coalesce(sum(size), 0) from responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Älteste zuerst löschen, bis 90 % des Limits erreicht sind (vermeidet Evict bei jedem put)
+        target = self.max_bytes * 0.9
+        for key, size in self._db.execute("select key, size from responses order by last_used").fetchall():
+            if total <= target:
+                break
+            self._db.execute("delete from responses where key = ?", (key,))
+            total -= size
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._db.execute("select count(), coalesce(sum(size), 0) from responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "entries": entries, "bytes": size}
+
+
+_LLM_CACHE = None
+_LLM_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache(max_mb: float = 50) -> LlmCache:
+    global _LLM_CACHE
+    with _LLM_CACHE_LOCK:
+        if _LLM_CACHE is None:
+            os.makedirs(user_files_dir(), exist_ok=True)
+            _LLM_CACHE = LlmCache(user_files_dir("llm_cache.sqlite"), max_mb * 1024 * 1024)
+        else:
+            _LLM_CACHE.max_bytes = int(max_mb * 1024 * 1024)
+        return _LLM_CACHE
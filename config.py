@@ -11,4 +11,5 @@ FIELDS = [
 
 # Tags
 TAG_NEW = "migrated/by-mc-mapper"       # markiert ALT-Karten nach Migration
-TAG_HASH_PREFIX = "MMKEY_"              # Hash-Tag-Präfix für Dublettenwarnung
\ No newline at end of file
+TAG_HASH_PREFIX = "MMKEY_"              # Hash-Tag-Präfix für Dublettenwarnung
+TAG_BATCH_DUP = "review/mc-mapper-duplicate"  # Auto-Accept: Dublette innerhalb der Auswahl, nicht angelegt
\ No newline at end of file
@@ -0,0 +1,564 @@
+# dupindex.py — persistente Dublettenindizes: MinHash/LSH (fuzzy) und Kombi-Key (exakt)
+import os
+import re
+import pickle
+import hashlib
+import difflib
+import threading
+from array import array
+
+from .util import strip_html_keep_media, user_files_path, normalize_combo_key, key_to_tag, COMBO_FIELDS
+
+# ---- LSH-Parameter: 20 Bänder à 3 Zeilen.
+# Kandidatenwahrscheinlichkeit 1-(1-s^3)^20: J=0.5 -> 93 %, J=0.7 -> >99.9 %.
+# Die eigentliche Entscheidung fällt danach per SequenceMatcher auf den Kandidaten.
+NUM_BANDS = 20
+BAND_ROWS = 3
+NUM_PERM = NUM_BANDS * BAND_ROWS
+INDEX_VERSION = 1
+KEY_INDEX_VERSION = 1
+DEFAULT_TOP_K = 10
+
+_PRIME = (1 << 61) - 1
+# Deterministische Permutationen (a*x + b) mod p, damit Signaturen über Sitzungen stabil bleiben
+_PERMS = [
+    (int.from_bytes(hashlib.sha1(f"a{i}".encode()).digest()[:8], "little") % (_PRIME - 1) + 1,
+     int.from_bytes(hashlib.sha1(f"b{i}".encode()).digest()[:8], "little") % _PRIME)
+    for i in range(NUM_PERM)
+]
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _question_text(value: str) -> str:
+    """Gestrippter Fragetext, so wie er verglichen wird."""
+    return strip_html_keep_media(value or "")
+
+
+def _tokens(text: str) -> set:
+    return set(_WORD_RE.findall(_TAG_RE.sub(" ", text).lower()))
+
+
+def _token_hash(tok: str) -> int:
+    return int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash_signature(text: str):
+    """MinHash-Signatur (NUM_PERM Werte) über die Wortmenge eines Textes; None bei leerem Text."""
+    hashes = [_token_hash(t) for t in _tokens(text)]
+    if not hashes:
+        return None
+    return array("Q", [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS])
+
+
+def band_keys(sig) -> list:
+    return [hash(tuple(sig[b * BAND_ROWS:(b + 1) * BAND_ROWS])) for b in range(NUM_BANDS)]
+
+
+def _ids_sql(ids) -> str:
+    return "(" + ",".join(str(int(i)) for i in ids) + ")"
+
+
+def _dump(path: str, data: dict):
+    """Atomar schreiben (tmp + replace)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+class _SavedNotes:
+    """
+    Hook-Seite beider Indizes. note_will_flush kommt auch bei Tastendrücken im Editor (fields_check)
+    und beim Rendern, nicht nur beim Speichern: gemerkt wird daher nur die nid, neue Notizen über
+    note_will_be_added (einmal pro Notiz-Objekt). Eingerechnet wird immer die Zeile aus der
+    Collection, ungespeicherte Änderungen landen so nie im Index. Eine nid bleibt gemerkt, bis ihr
+    mod sich geändert hat oder eine Operation durch ist (operation_did_execute -> final=True).
+    """
+
+    def note_changed(self, note):
+        if getattr(note, "mid", None) != self.mid or not note.id:
+            return
+        with self._lock:
+            self._touched.add(int(note.id))
+
+    def note_added(self, note):
+        if getattr(note, "mid", None) != self.mid:
+            return
+        with self._lock:
+            self._pending[id(note)] = note
+
+    def _flush_pending(self, final: bool = False):
+        with self._lock:
+            if (not self._touched and not self._pending) or self.col is None:
+                return
+            nids, self._touched = self._touched, set()
+            for key, note in list(self._pending.items()):
+                if note.id:
+                    nids.add(int(note.id))
+                if note.id or final:
+                    del self._pending[key]
+        rows = {}
+        todo = sorted(nids)
+        for i in range(0, len(todo), 500):
+            for nid, mod, flds in self.col.db.all(f"select id, mod, flds from notes where id in {_ids_sql(todo[i:i + 500])}"):
+                rows[nid] = (mod, flds)
+        keep = set()
+        for nid in todo:
+            row = rows.get(nid)
+            if row is None:
+                self.remove(nid)
+                continue
+            with self._lock:
+                saved = self._mods.get(nid) != row[0]
+            self._put_row(nid, row[0], row[1].split("\x1f"))
+            if not saved and not final:
+                keep.add(nid)  # Hook kam vor dem Schreiben oder ohne Speichern -> später nochmal
+        if keep:
+            with self._lock:
+                self._touched |= keep
+
+
+class FuzzyIndex(_SavedNotes):
+    """
+    Ähnlichkeitsindex über das Frage-Feld aller Notizen eines Ziel-Notiztyps.
+    - einmal aufgebaut, danach in user_files gespeichert
+    - sync() gleicht per (id, mod) mit der Collection ab und rechnet nur Geänderte neu
+    - Hooks (install_hooks) halten ihn während der Sitzung mit gespeicherten Änderungen aktuell
+      (_SavedNotes); nach einem Undo (das die
+      Hooks nicht auslöst) ist er `stale` und get_fuzzy_index() gleicht ihn vor der nächsten Abfrage ab
+    Thread-sicher: Hooks (GUI/CollectionOp) und Abfragen (Prefetch, Auto-Accept) laufen parallel;
+    query() sperrt nur das Sammeln der Kandidaten, verglichen wird ohne Lock.
+    """
+
+    def __init__(self, mid: int, field_ord: int, path: str | None = None):
+        self.mid = int(mid)
+        self.field_ord = int(field_ord)
+        self.path = path
+        self._mods = {}       # nid -> mod
+        self._texts = {}      # nid -> gestrippter Fragetext
+        self._sigs = {}       # nid -> array('Q') | None
+        self._buckets = [dict() for _ in range(NUM_BANDS)]
+        self._touched = set()  # nids aus note_will_flush, Zeile noch nachzulesen
+        self._pending = {}    # id(note) -> per note_will_be_added gemeldete Notiz, deren id noch 0 ist
+        self._dirty = False
+        self.stale = False    # nach Undo: vor der nächsten Abfrage sync()
+        self.col = None       # zuletzt abgeglichene Collection (liest gemerkte nids nach)
+        self._lock = threading.RLock()
+
+    # ---- Pflege
+    def _unbucket(self, nid: int):
+        sig = self._sigs.get(nid)
+        if sig is None:
+            return
+        for b, key in enumerate(band_keys(sig)):
+            bucket = self._buckets[b].get(key)
+            if bucket:
+                bucket.discard(nid)
+                if not bucket:
+                    del self._buckets[b][key]
+
+    def _bucket(self, nid: int, sig):
+        if sig is None:
+            return
+        for b, key in enumerate(band_keys(sig)):
+            self._buckets[b].setdefault(key, set()).add(nid)
+
+    def put(self, nid: int, mod, raw_question: str):
+        nid = int(nid)
+        text = _question_text(raw_question)
+        with self._lock:
+            if nid in self._texts:
+                if self._texts[nid] == text:
+                    self._mods[nid] = mod
+                    return
+                self._unbucket(nid)
+            sig = minhash_signature(text)
+            self._texts[nid] = text
+            self._sigs[nid] = sig
+            self._mods[nid] = mod
+            self._bucket(nid, sig)
+            self._dirty = True
+
+    def remove(self, nid: int):
+        nid = int(nid)
+        with self._lock:
+            if nid not in self._texts:
+                return
+            self._unbucket(nid)
+            self._texts.pop(nid, None)
+            self._sigs.pop(nid, None)
+            self._mods.pop(nid, None)
+            self._dirty = True
+
+    def _put_row(self, nid: int, mod, fields):
+        self.put(nid, mod, fields[self.field_ord] if self.field_ord < len(fields) else "")
+
+    def sync(self, col):
+        """Gleicht den Index mit der Collection ab (neu/geändert/gelöscht)."""
+        self.stale = False
+        self.col = col
+        self._flush_pending()
+        current = dict(col.db.all("select id, mod from notes where mid = ?", self.mid))
+        with self._lock:
+            gone = [n for n in self._texts if n not in current]
+            todo = [nid for nid, mod in current.items() if self._mods.get(nid) != mod]
+        for nid in gone:
+            self.remove(nid)
+        for i in range(0, len(todo), 500):
+            for nid, mod, flds in col.db.all(f"select id, mod, flds from notes where id in {_ids_sql(todo[i:i + 500])}"):
+                self._put_row(nid, mod, flds.split("\x1f"))
+        self.save()
+
+    # ---- Abfrage
+    def query(self, text: str, threshold: float = 0.85, top_k: int | None = DEFAULT_TOP_K, exclude=()):
+        """Top-k (nid, ratio) mit ratio >= threshold, absteigend sortiert."""
+        self._flush_pending()
+        q = _question_text(text)
+        sig = minhash_signature(q)
+        if sig is None:
+            return []
+        cands = set()
+        with self._lock:
+            for b, key in enumerate(band_keys(sig)):
+                cands.update(self._buckets[b].get(key, ()))
+            cands.difference_update(exclude)
+            texts = [(nid, self._texts[nid]) for nid in cands]
+
+        hits = []
+        sm = difflib.SequenceMatcher(None)
+        sm.set_seq2(q)  # seq2 wird von SequenceMatcher vorverarbeitet -> einmal pro Abfrage
+        for nid, text in texts:
+            sm.set_seq1(text)
+            if sm.real_quick_ratio() < threshold or sm.quick_ratio() < threshold:
+                continue
+            ratio = sm.ratio()
+            if ratio >= threshold:
+                hits.append((nid, ratio))
+        hits.sort(key=lambda x: x[1], reverse=True)
+        return hits[:top_k] if top_k else hits
+
+    def __len__(self):
+        return len(self._texts)
+
+    # ---- Persistenz
+    def save(self):
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            data = {
+                "version": INDEX_VERSION,
+                "mid": self.mid,
+                "field_ord": self.field_ord,
+                "notes": {nid: (self._mods.get(nid), self._texts[nid], self._sigs[nid]) for nid in self._texts},
+            }
+            _dump(self.path, data)
+            self._dirty = False
+
+    def load(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as fh:
+                data = pickle.load(fh)
+        except Exception:
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("field_ord") != self.field_ord:
+            return False
+        with self._lock:
+            for nid, (mod, text, sig) in data.get("notes", {}).items():
+                self._texts[nid] = text
+                self._sigs[nid] = sig
+                self._mods[nid] = mod
+                self._bucket(nid, sig)
+        return True
+
+
+class KeyIndex(_SavedNotes):
+    """
+    Exakte Dubletten: key_tag (Hash von normalize_combo_key) -> nids aller Notizen des Ziel-Notiztyps.
+    Ersetzt die Suche nach MMKEY_-Tags, die neue Notizen nie bekommen haben. Erster sync()
+    rechnet alle Notizen ein, danach wie FuzzyIndex nur Geänderte; Hooks halten ihn aktuell,
+    nach einem Undo gilt wie dort `stale`. lookup() prüft Treffer zusätzlich gegen die Collection
+    (Redo hat keinen Hook) und wirft nicht mehr vorhandene nids aus dem Index.
+    Thread-sicher wie FuzzyIndex.
+    """
+
+    def __init__(self, mid: int, field_ords: dict, path: str | None = None):
+        self.mid = int(mid)
+        self.field_ords = dict(field_ords)  # Kombi-Feldname -> ord im Ziel-Notiztyp
+        self.path = path
+        self._mods = {}       # nid -> mod
+        self._keys = {}       # nid -> key_tag
+        self._nids = {}       # key_tag -> set(nid)
+        self._touched = set()
+        self._pending = {}
+        self._dirty = False
+        self.stale = False
+        self.col = None       # zuletzt abgeglichene Collection (Existenzprüfung in lookup)
+        self._lock = threading.RLock()
+
+    def key_for_fields(self, fields) -> str:
+        prop = {name: fields[o] for name, o in self.field_ords.items() if o < len(fields)}
+        return key_to_tag(normalize_combo_key(prop))
+
+    # ---- Pflege
+    def put(self, nid: int, mod, fields):
+        nid = int(nid)
+        key = self.key_for_fields(fields)
+        with self._lock:
+            self._mods[nid] = mod
+            old = self._keys.get(nid)
+            if old == key:
+                return
+            if old is not None:
+                self._discard(nid, old)
+            self._keys[nid] = key
+            self._nids.setdefault(key, set()).add(nid)
+            self._dirty = True
+
+    def _discard(self, nid: int, key: str):
+        bucket = self._nids.get(key)
+        if bucket:
+            bucket.discard(nid)
+            if not bucket:
+                del self._nids[key]
+
+    def remove(self, nid: int):
+        nid = int(nid)
+        with self._lock:
+            key = self._keys.pop(nid, None)
+            self._mods.pop(nid, None)
+            if key is not None:
+                self._discard(nid, key)
+                self._dirty = True
+
+    def _put_row(self, nid: int, mod, fields):
+        self.put(nid, mod, fields)
+
+    def sync(self, col):
+        """Gleicht mit der Collection ab; beim ersten Mal Backfill über alle Notizen des Notiztyps."""
+        self.stale = False
+        self.col = col
+        self._flush_pending()
+        current = dict(col.db.all("select id, mod from notes where mid = ?", self.mid))
+        with self._lock:
+            gone = [n for n in self._keys if n not in current]
+            todo = [nid for nid, mod in current.items() if self._mods.get(nid) != mod]
+        for nid in gone:
+            self.remove(nid)
+        for i in range(0, len(todo), 500):
+            for nid, mod, flds in col.db.all(f"select id, mod, flds from notes where id in {_ids_sql(todo[i:i + 500])}"):
+                self.put(nid, mod, flds.split("\x1f"))
+        self.save()
+
+    # ---- Abfrage
+    def lookup(self, key_tag: str | None, exclude=()) -> list:
+        """nids mit genau diesem key_tag (ohne exclude)."""
+        self._flush_pending()
+        if not key_tag:
+            return []
+        with self._lock:
+            hits = sorted(n for n in self._nids.get(key_tag, ()) if n not in exclude)
+        if not hits or self.col is None:
+            return hits
+        alive = set(self.col.db.list(f"select id from notes where id in {_ids_sql(hits)}"))
+        for nid in hits:
+            if nid not in alive:
+                self.remove(nid)
+        return [n for n in hits if n in alive]
+
+    def __len__(self):
+        return len(self._keys)
+
+    # ---- Persistenz
+    def save(self):
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            data = {
+                "version": KEY_INDEX_VERSION,
+                "mid": self.mid,
+                "field_ords": self.field_ords,
+                "notes": {nid: (self._mods.get(nid), key) for nid, key in self._keys.items()},
+            }
+            _dump(self.path, data)
+            self._dirty = False
+
+    def load(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as fh:
+                data = pickle.load(fh)
+        except Exception:
+            return False
+        if data.get("version") != KEY_INDEX_VERSION or data.get("field_ords") != self.field_ords:
+            return False
+        with self._lock:
+            for nid, (mod, key) in data.get("notes", {}).items():
+                self._keys[nid] = key
+                self._mods[nid] = mod
+                self._nids.setdefault(key, set()).add(nid)
+        return True
+
+
+def near_key(prop: dict) -> str | None:
+    """
+    Signatur für Fast-Dubletten ohne Paarvergleich: Wortfolge der Frage, richtige Antwort und
+    Menge der übrigen Antworten, ohne Groß-/Kleinschreibung, Satzzeichen und Leerraum.
+    Bild-Dateinamen zählen als Wörter (gleiche Frage zu anderem Bild bleibt verschieden).
+    """
+    question = _WORD_RE.findall((prop.get("Frage") or "").lower())
+    if not question:
+        return None
+    opts = [" ".join(_WORD_RE.findall((prop.get(f) or "").lower())) for f in COMBO_FIELDS[1:]]
+    sig = " ".join(question) + "\x1f" + opts[0] + "\x1f" + "\x1f".join(sorted(o for o in opts[1:] if o))
+    return hashlib.blake2b(sig.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BatchDeduper:
+    """
+    Gruppiert Vorschläge einer Auswahl in einem Durchlauf nach Kombi-Key und near_key
+    (nur Dict-Zugriffe, keine Paarvergleiche, keine DB-Suche). Der erste Vorschlag eines
+    Clusters ist der Vertreter; split() darf chunkweise aufgerufen werden.
+    """
+
+    def __init__(self):
+        self._reps = {}   # key_tag / near_key -> nid des Vertreters
+
+    def split(self, items) -> tuple[list, list]:
+        """items = [(nid, prop)] -> (Vertreter [(nid, prop)], Dubletten [(nid, vertreter_nid)])"""
+        keep, dups = [], []
+        for nid, prop in items:
+            keys = [key_to_tag(normalize_combo_key(prop)), near_key(prop)]
+            rep = next((self._reps[k] for k in keys if k in self._reps), None)
+            if rep is None:
+                keep.append((nid, prop))
+                rep = nid
+            else:
+                dups.append((nid, rep))
+            for k in keys:
+                if k is not None:
+                    self._reps.setdefault(k, rep)
+        return keep, dups
+
+
+# ---- Registry (ein Index pro Collection + Notiztyp)
+_INDEXES = {}
+_KEY_INDEXES = {}
+
+
+def _question_ord(model) -> int:
+    for f in model.get("flds", []):
+        if f.get("name") == "Frage":
+            return f.get("ord", 0)
+    return 0
+
+
+def get_fuzzy_index(col, model, refresh: bool = False) -> FuzzyIndex:
+    """Liefert den (ggf. von Platte geladenen und abgeglichenen) Index für den Ziel-Notiztyp.
+
+    refresh=True gleicht einen bereits geladenen Index erneut mit der Collection ab
+    (z. B. nach Sync oder Bearbeitungen außerhalb des Add-ons).
+    """
+    mid = int(model["id"])
+    key = (str(getattr(col, "path", "")), mid)
+    idx = _INDEXES.get(key)
+    if idx is None:
+        idx = FuzzyIndex(mid, _question_ord(model), user_files_path(col, f"fuzzy_{mid}.pickle"))
+        idx.load()
+        idx.sync(col)
+        _INDEXES[key] = idx
+    elif refresh or idx.stale:
+        idx.sync(col)
+    return idx
+
+
+def _combo_ords(model) -> dict:
+    ords = {f.get("name"): f.get("ord", 0) for f in model.get("flds", [])}
+    return {name: ords[name] for name in COMBO_FIELDS if name in ords}
+
+
+def get_key_index(col, model, refresh: bool = False) -> KeyIndex:
+    """Wie get_fuzzy_index, für den exakten Kombi-Key-Index des Ziel-Notiztyps."""
+    mid = int(model["id"])
+    key = (str(getattr(col, "path", "")), mid)
+    idx = _KEY_INDEXES.get(key)
+    if idx is None:
+        idx = KeyIndex(mid, _combo_ords(model), user_files_path(col, f"keys_{mid}.pickle"))
+        idx.load()
+        idx.sync(col)
+        _KEY_INDEXES[key] = idx
+    elif refresh or idx.stale:
+        idx.sync(col)
+    return idx
+
+
+def _all_indexes():
+    return list(_INDEXES.values()) + list(_KEY_INDEXES.values())
+
+
+def save_all():
+    for idx in _all_indexes():
+        try:
+            idx.save()
+        except Exception:
+            pass
+
+
+# ---- Hooks
+def _on_note_will_flush(note):
+    for idx in _all_indexes():
+        idx.note_changed(note)
+
+
+def _on_note_will_be_added(col, note, deck_id):
+    for idx in _all_indexes():
+        idx.note_added(note)
+
+
+def _on_operation_did_execute(changes, handler):
+    # erst jetzt ist gespeichert, was note_will_flush angekündigt hat
+    if not getattr(changes, "note_text", False):
+        return
+    for idx in _all_indexes():
+        idx._flush_pending(final=True)
+
+
+def _on_notes_will_be_deleted(col, ids):
+    for idx in _all_indexes():
+        for nid in ids:
+            idx.remove(nid)
+
+
+def _on_state_did_undo(changes):
+    # Undo stellt Zeilen im Backend wieder her, ohne note_will_flush/notes_will_be_deleted
+    for idx in _all_indexes():
+        idx.stale = True
+
+
+def _register(hook, callback):
+    """
+    Hängt callback an den Hook, höchstens einmal. Ein Add-on-Reload lädt das Modul neu (neue
+    Funktionsobjekte, Modul-Globals zurückgesetzt): die Version aus dem alten Modul wird ersetzt.
+    """
+    for old in list(hook._hooks):
+        if old is callback:
+            return
+        if (getattr(old, "__module__", None) == callback.__module__
+                and getattr(old, "__qualname__", None) == callback.__qualname__):
+            hook.remove(old)
+    hook.append(callback)
+
+
+def install_hooks():
+    """Hält die Indizes bei Bearbeiten/Löschen aktuell; beim Laden des Add-ons, mehrfacher Aufruf schadet nicht."""
+    from anki import hooks
+    from aqt import gui_hooks
+    _register(hooks.note_will_flush, _on_note_will_flush)
+    _register(hooks.note_will_be_added, _on_note_will_be_added)
+    _register(hooks.notes_will_be_deleted, _on_notes_will_be_deleted)
+    _register(gui_hooks.operation_did_execute, _on_operation_did_execute)
+    _register(gui_hooks.state_did_undo, _on_state_did_undo)
@@ -0,0 +1,314 @@
+# http_client.py — wiederverwendbarer HTTP-Client für die OpenAI-Aufrufe
+# (Keep-Alive-Pool, gzip, Connect-/Read-Timeout, Retry mit Backoff, Abbruch per Token, SSE-Streaming)
+import json
+import gzip
+import time
+import random
+import socket
+import threading
+import http.client
+from queue import LifoQueue, Empty, Full
+from urllib.parse import urlsplit
+
+from .stats import count
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class Cancelled(Exception):
+    """Request wurde über das CancelToken abgebrochen."""
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+class CancelToken:
+    """
+    Von der UI auslösbarer Abbruch. cancel() schließt laufende Verbindungen (blockierende
+    Reads kehren sofort zurück) und weckt wartende Backoffs auf.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._conns = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+        with self._lock:
+            conns, self._conns = list(self._conns), set()
+        for conn in conns:
+            try:
+                if conn.sock is not None:
+                    conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def wait(self, seconds: float) -> bool:
+        """Schläft bis zu `seconds`; True, wenn inzwischen abgebrochen wurde."""
+        return self._event.wait(seconds)
+
+    def _attach(self, conn):
+        with self._lock:
+            self._conns.add(conn)
+        if self.cancelled:
+            self.cancel()
+
+    def _detach(self, conn):
+        with self._lock:
+            self._conns.discard(conn)
+
+
+class HttpClient:
+    """Verbindungspool für genau einen Host (base_url); thread-sicher."""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, connect_timeout: float = 10.0, read_timeout: float = 120.0,
+                 retries: int = 3, backoff: float = 1.0, pool_size: int = 8):
+        parts = urlsplit(base_url.rstrip("/"))
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self._idle = LifoQueue(maxsize=max(1, int(pool_size)))
+
+    # ---- Pool
+    def _new_conn(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait(), True
+        except Empty:
+            return self._new_conn(), False
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+    # ---- Requests
+    def _open(self, method: str, path: str, body: bytes | None, headers: dict, token: CancelToken | None):
+        """Request senden, Antwort-Header lesen; Body bleibt ungelesen. Kaputte Keep-Alive-Verbindung -> einmal neu."""
+        conn, reused = self._acquire()
+        if token is not None:
+            token._attach(conn)
+        try:
+            try:
+                conn.request(method, self.base_path + path, body=body, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused or (token is not None and token.cancelled):
+                    raise
+                # Server hat die Idle-Verbindung geschlossen -> einmal frisch verbinden
+                conn.close()
+                if token is not None:
+                    token._detach(conn)
+                conn = self._new_conn()
+                if token is not None:
+                    token._attach(conn)
+                conn.request(method, self.base_path + path, body=body, headers=headers)
+                return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            if token is not None:
+                token._detach(conn)
+            raise
+
+    def _done(self, conn, resp, token: CancelToken | None):
+        """Nach vollständig gelesenem Body: Verbindung zurück in den Pool (oder schließen)."""
+        if token is not None:
+            token._detach(conn)
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+    def _send(self, method: str, path: str, body: bytes | None, headers: dict, token: CancelToken | None):
+        """Ein Versuch. Gibt (status, headers, body) zurück; verwirft kaputte Keep-Alive-Verbindungen."""
+        conn, resp = self._open(method, path, body, headers, token)
+        try:
+            data = resp.read()
+            if (resp.getheader("Content-Encoding") or "").lower() == "gzip":
+                data = gzip.decompress(data)
+        except Exception:
+            conn.close()
+            if token is not None:
+                token._detach(conn)
+            raise
+        self._done(conn, resp, token)
+        return resp.status, resp, data
+
+    def _backoff(self, attempt: int, retry_after: float | None, token: CancelToken | None):
+        # Exponentielles Backoff mit Jitter (Retry-After hat Vorrang)
+        delay = retry_after if retry_after is not None else self.backoff * (2 ** attempt) * (0.5 + random.random())
+        count("http.retries")
+        if token is not None:
+            if token.wait(delay):
+                raise Cancelled()
+        else:
+            time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(resp) -> float | None:
+        try:
+            return float(resp.getheader("Retry-After") or "")
+        except ValueError:
+            return None
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None,
+                token: CancelToken | None = None) -> bytes:
+        hdrs = {"Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        hdrs.update(headers or {})
+        attempt = 0
+        while True:
+            if token is not None and token.cancelled:
+                raise Cancelled()
+            retry_after = None
+            count("http.requests")
+            count("http.bytes_sent", len(body or b""))
+            try:
+                status, resp, data = self._send(method, path, body, hdrs, token)
+                count("http.bytes_received", len(data))
+                if status < 300:
+                    return data
+                if status not in RETRY_STATUS or attempt >= self.retries:
+                    raise HttpError(status, data.decode("utf-8", "replace"))
+                retry_after = self._retry_after(resp)
+            except (OSError, http.client.HTTPException):
+                if token is not None and token.cancelled:
+                    raise Cancelled()
+                if attempt >= self.retries:
+                    raise
+            self._backoff(attempt, retry_after, token)
+            attempt += 1
+
+    def post_json(self, path: str, payload: dict, headers: dict | None = None, token: CancelToken | None = None) -> dict:
+        hdrs = {"Content-Type": "application/json"}
+        hdrs.update(headers or {})
+        data = self.request("POST", path, json.dumps(payload).encode("utf-8"), hdrs, token)
+        return json.loads(data.decode("utf-8"))
+
+    def stream_sse(self, path: str, payload: dict, headers: dict | None = None, token: CancelToken | None = None):
+        """
+        POST, Antwort als Server-Sent Events: liefert den data-Teil jedes Events (str) bis „[DONE]“.
+        Retry/Backoff wie request(), aber nur bis die ersten Bytes der Antwort da sind.
+        Bricht der Aufrufer vorzeitig ab, wird die Verbindung geschlossen statt wiederverwendet.
+        """
+        hdrs = {"Content-Type": "application/json", "Accept": "text/event-stream",
+                "Accept-Encoding": "identity", "Connection": "keep-alive"}
+        hdrs.update(headers or {})
+        body = json.dumps(payload).encode("utf-8")
+        attempt = 0
+        while True:
+            if token is not None and token.cancelled:
+                raise Cancelled()
+            retry_after = None
+            count("http.requests")
+            count("http.bytes_sent", len(body))
+            try:
+                conn, resp = self._open("POST", path, body, hdrs, token)
+                if resp.status < 300:
+                    break
+                data = resp.read()
+                self._done(conn, resp, token)
+                count("http.bytes_received", len(data))
+                if resp.status not in RETRY_STATUS or attempt >= self.retries:
+                    raise HttpError(resp.status, data.decode("utf-8", "replace"))
+                retry_after = self._retry_after(resp)
+            except (OSError, http.client.HTTPException):
+                if token is not None and token.cancelled:
+                    raise Cancelled()
+                if attempt >= self.retries:
+                    raise
+            self._backoff(attempt, retry_after, token)
+            attempt += 1
+
+        received, finished = 0, False
+        try:
+            lines = []
+            while True:
+                line = resp.readline()
+                if not line:
+                    break
+                received += len(line)
+                line = line.rstrip(b"\r\n")
+                if line:
+                    name, _, value = line.partition(b":")
+                    if name == b"data":  # „event:“, „id:“ und Kommentare („: ping“) braucht hier niemand
+                        lines.append(value[1:] if value.startswith(b" ") else value)
+                    continue
+                if not lines:
+                    continue
+                event, lines = b"\n".join(lines).decode("utf-8"), []
+                if event == "[DONE]":
+                    received += len(resp.read())  # Rest (Chunk-Ende) lesen, damit die Verbindung wiederverwendbar ist
+                    break
+                yield event
+            if token is not None and token.cancelled:
+                raise Cancelled()
+            if lines:
+                yield b"\n".join(lines).decode("utf-8")
+            finished = True
+        except Exception:
+            # cancel() schließt die Verbindung unter readline() weg; http.client meldet das uneinheitlich
+            if token is not None and token.cancelled:
+                raise Cancelled()
+            raise
+        finally:
+            count("http.bytes_received", received)
+            if finished:
+                self._done(conn, resp, token)
+            else:
+                conn.close()
+                if token is not None:
+                    token._detach(conn)
+
+
+_CLIENT = None
+_CLIENT_KEY = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client(config: dict) -> HttpClient:
+    """Gemeinsamer Client; wird neu gebaut, wenn sich URL/Timeouts/Retries in der Config ändern."""
+    global _CLIENT, _CLIENT_KEY
+    key = (
+        (config.get("openai_base_url") or DEFAULT_BASE_URL).strip(),
+        float(config.get("http_connect_timeout", 10)),
+        float(config.get("http_read_timeout", 120)),
+        int(config.get("http_retries", 3)),
+        max(int(config.get("ai_workers", 4)), 1) * 2,
+    )
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT_KEY != key:
+            if _CLIENT is not None:
+                _CLIENT.close()
+            _CLIENT = HttpClient(key[0], connect_timeout=key[1], read_timeout=key[2], retries=key[3], pool_size=key[4])
+            _CLIENT_KEY = key
+        return _CLIENT
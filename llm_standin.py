@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# llm_standin.py — lokaler Stand-in für /v1/chat/completions (JSON und SSE-Streaming) ohne OpenAI-Zugang
+#
+#   python llm_standin.py                       # http://127.0.0.1:8765/v1, dann in der Config:
+#                                               #   "openai_base_url": "http://127.0.0.1:8765/v1", "openai_api_key": "x"
+#   python llm_standin.py --delay 0.2 --piece 8 # langsamer Stream in kleinen Stücken
+#   python llm_standin.py --fail 2              # die ersten 2 Requests mit 503 (Retry testen)
+#
+# tests/test_llm_standin.py startet serve() und prüft stream_sse, parse_with_llm und Abbruch dagegen.
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = {
+    "Frage": "Welcher Laborwert ist beim akuten Myokardinfarkt am frühesten erhöht?",
+    "Antwort A": "Kreatinkinase",
+    "Antwort B": "Hochsensitives Troponin",
+    "Antwort C": "LDH",
+    "Antwort D": "Myoglobin",
+    "Antwort E": "AST",
+    "Correct": "D",
+    "Antwort": "Myoglobin steigt bereits nach 1–2 Stunden an, ist aber wenig spezifisch.",
+}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive + Chunked wie bei der echten API
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.requests += 1
+            fail = server.requests <= server.fail
+        if fail:
+            return self._send(503, b'{"error": "stand-in: busy"}', {"Retry-After": "0"})
+        if self.path.rstrip("/") != server.base_path + "/chat/completions":
+            return self._send(404, b'{"error": "unknown path"}')
+        req = json.loads(body or b"{}")
+        content = json.dumps(server.answer, ensure_ascii=False)
+        usage = {"prompt_tokens": len(body) // 4, "completion_tokens": len(content) // 4}
+        if not req.get("stream"):
+            time.sleep(server.delay * max(1, len(content) // server.piece))
+            msg = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}], "usage": usage}
+            return self._send(200, json.dumps(msg).encode("utf-8"))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self._chunk(b": stand-in\n\n")  # Kommentarzeile, wie Keep-Alive-Pings mancher Proxys
+            for i in range(0, len(content), server.piece):
+                time.sleep(server.delay)
+                self._event({"choices": [{"index": 0, "delta": {"content": content[i:i + server.piece]}}]})
+            if (req.get("stream_options") or {}).get("include_usage"):
+                self._event({"choices": [], "usage": usage})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # Client hat abgebrochen
+
+    def _event(self, obj):
+        self._chunk(b"data: " + json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send(self, status: int, data: bytes, headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(port: int = 0, delay: float = 0.05, piece: int = 16, fail: int = 0, answer: dict | None = None):
+    """Startet den Stand-in im Hintergrund-Thread; base_url = f"http://127.0.0.1:{server.server_port}/v1"."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandinHandler)
+    server.daemon_threads = True
+    server.base_path = "/v1"
+    server.delay = delay
+    server.piece = max(1, piece)
+    server.fail = fail
+    server.answer = answer or ANSWER
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Stand-in für die OpenAI Chat Completions API (JSON + SSE)")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--delay", type=float, default=0.05, help="Pause pro Stream-Stück in Sekunden")
+    ap.add_argument("--piece", type=int, default=16, help="Zeichen pro Stream-Stück")
+    ap.add_argument("--fail", type=int, default=0, help="so viele Requests zuerst mit 503 beantworten")
+    args = ap.parse_args(argv)
+    server = serve(args.port, args.delay, args.piece, args.fail)
+    print(f"Stand-in läuft auf http://127.0.0.1:{server.server_port}/v1 (Strg+C beendet)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
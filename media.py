@@ -0,0 +1,165 @@
+# media.py — Bildaufbereitung für Vision-Requests: verkleinern, neu komprimieren, Ergebnis cachen
+import os
+import hashlib
+import logging
+import threading
+
+# QImage ist auch außerhalb des GUI-Threads nutzbar (anders als QPixmap)
+try:
+    from aqt.qt import QImage, QImageReader, QBuffer, QByteArray, QIODevice, Qt
+    _HAS_QT = True
+except Exception:
+    _HAS_QT = False
+
+from .util import user_files_dir
+
+log = logging.getLogger(__name__)
+
+CACHE_MAX_BYTES = 100 * 1024 * 1024
+CACHE_LOW_WATER = 0.9   # Verdrängung räumt bis 90 % frei, damit nicht jedes put() wieder scannt
+SMALL_IMAGE_BYTES = 256 * 1024  # kleinere Bilder innerhalb max_side gehen unverändert raus
+
+_lock = threading.Lock()
+_cache_bytes = None      # Größe des Cache-Ordners, einmal gescannt und dann mitgezählt
+_cache_bytes_dir = None
+
+
+def cache_dir() -> str:
+    """user_files/media_cache, erst beim Aufruf aufgelöst (standalone.load_addon setzt user_files um)."""
+    return user_files_dir("media_cache")
+
+
+def _image_size(raw: bytes):
+    """(Breite, Höhe) aus dem Bildkopf, ohne zu dekodieren; None, wenn Qt das Format nicht kennt."""
+    buf = QBuffer()
+    buf.setData(QByteArray(raw))
+    buf.open(QIODevice.OpenModeFlag.ReadOnly)
+    size = QImageReader(buf).size()
+    return (size.width(), size.height()) if size.isValid() else None
+
+
+def _recompress(raw: bytes, max_side: int, quality: int):
+    """
+    (mime, bytes) mit längster Kante <= max_side; None, wenn Qt das Bild nicht lesen kann.
+    Bilder mit Transparenz bleiben PNG, alle anderen werden JPEG(quality).
+    """
+    img = QImage.fromData(raw)
+    if img.isNull():
+        return None
+    if max(img.width(), img.height()) > max_side:
+        img = img.scaled(max_side, max_side, Qt.AspectRatioMode.KeepAspectRatio,
+                         Qt.TransformationMode.SmoothTransformation)
+    mime, fmt, q = ("image/png", "PNG", -1) if img.hasAlphaChannel() else ("image/jpeg", "JPEG", quality)
+    buf = QBuffer()
+    buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    if not img.save(buf, fmt, q):
+        return None
+    return mime, bytes(buf.data())
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(cache_dir(), key + ".bin")
+
+
+def _cache_get(key: str):
+    # Dateiformat: b"<mime>\n" + Bildbytes; ohne Bildbytes = Original verwenden
+    path = _cache_path(key)
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+        os.utime(path)  # mtime = zuletzt benutzt (für die Verdrängung)
+    except OSError:
+        return None
+    mime, _, raw = data.partition(b"\n")
+    return mime.decode("ascii"), raw
+
+
+def _scan(folder: str) -> list:
+    """[(mtime, size, path)] aller Cache-Dateien, älteste zuerst."""
+    out = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, entry.path))
+    out.sort()
+    return out
+
+
+def _cache_put(key: str, mime: str, data: bytes):
+    global _cache_bytes, _cache_bytes_dir
+    folder = cache_dir()
+    os.makedirs(folder, exist_ok=True)
+    if _cache_bytes is None or _cache_bytes_dir != folder:
+        _cache_bytes = sum(size for _, size, _ in _scan(folder))
+        _cache_bytes_dir = folder
+    path = _cache_path(key)
+    try:
+        _cache_bytes -= os.path.getsize(path)
+    except OSError:
+        pass
+    blob = mime.encode("ascii") + b"\n" + data
+    with open(path, "wb") as fh:
+        fh.write(blob)
+    _cache_bytes += len(blob)
+    if _cache_bytes <= CACHE_MAX_BYTES:
+        return
+    # Nur beim Überlauf scannen und die am längsten unbenutzten Einträge verdrängen
+    stats = _scan(folder)
+    total = sum(size for _, size, _ in stats)
+    for _, size, old in stats:
+        if total <= CACHE_MAX_BYTES * CACHE_LOW_WATER:
+            break
+        try:
+            os.remove(old)
+        except OSError:
+            continue
+        total -= size
+    _cache_bytes = total
+
+
+def prepare_image(raw: bytes, mime: str, max_side: int = 1536, quality: int = 80):
+    """
+    Liefert (mime, bytes) für den Request. Große Bilder werden auf max_side verkleinert und
+    neu kodiert (JPEG(quality), mit Transparenz PNG); wird es dadurch nicht kleiner, bleibt das
+    Original. Kleine Bilder (<= max_side und < SMALL_IMAGE_BYTES) werden gar nicht erst dekodiert.
+    Ergebnis wird pro Inhalts-Hash (inkl. Einstellungen) in user_files/media_cache gecacht;
+    bleibt es beim Original, steht dort nur die Entscheidung, nicht die Bytes.
+    max_side <= 0 oder fehlendes Qt: Original unverändert.
+    """
+    if not _HAS_QT or not max_side or max_side <= 0:
+        return mime, raw
+    max_side = int(max_side)
+    if len(raw) < SMALL_IMAGE_BYTES:
+        size = _image_size(raw)
+        if size is not None and max(size) <= max_side:
+            return mime, raw
+    key = hashlib.sha256(raw + f"|{max_side}|{quality}".encode()).hexdigest()
+    with _lock:
+        hit = _cache_get(key)
+    if hit is not None:
+        return hit if hit[1] else (mime, raw)
+
+    try:
+        out = _recompress(raw, max_side, int(quality))
+    except Exception:
+        out = None
+    keep = out is None or len(out[1]) >= len(raw)
+    try:
+        with _lock:
+            _cache_put(key, mime, b"") if keep else _cache_put(key, *out)
+    except OSError:
+        pass
+    return (mime, raw) if keep else out
+
+
+def prepare_images(images, max_side: int = 1536, quality: int = 80):
+    """[(mime, bytes)] -> aufbereitete Liste; protokolliert die eingesparten Bytes."""
+    prepared = [prepare_image(raw, mime, max_side, quality) for mime, raw in images]
+    before = sum(len(raw) for _, raw in images)
+    after = sum(len(raw) for _, raw in prepared)
+    if images:
+        log.info("MC-Mapper AI-Fix: %d Bild(er) %d -> %d Bytes (%d gespart)", len(images), before, after, before - after)
+    return prepared
@@ -0,0 +1,44 @@
+# notedata.py — Notizdaten für viele nids in wenigen SQL-Abfragen statt col.get_note() pro Notiz
+SQL_CHUNK = 2000  # ids pro "where id in (...)"
+
+
+class NoteRow:
+    """
+    Eine Zeile der notes-Tabelle: Felder, Tags, Notiztyp und mod ohne Note-Objekt.
+    Für Schleifen, die nur lesen; zum Ändern weiter col.get_note() benutzen.
+    """
+
+    __slots__ = ("id", "mid", "mod", "tags", "fields")
+
+    def __init__(self, nid: int, mid: int, mod: int, tags: str, flds: str):
+        self.id = nid
+        self.mid = mid
+        self.mod = mod
+        self.tags = tags.split()
+        self.fields = flds.split("\x1f")
+
+    def items(self, names) -> list:
+        """(Feldname, Wert) wie Note.items(); names aus field_names()."""
+        return list(zip(names, self.fields))
+
+
+def iter_note_rows(col, nids):
+    """NoteRow je nid in Eingabereihenfolge, SQL_CHUNK ids pro Abfrage; gelöschte nids fehlen."""
+    nids = list(nids)
+    for i in range(0, len(nids), SQL_CHUNK):
+        chunk = nids[i:i + SQL_CHUNK]
+        ids = ",".join(str(int(n)) for n in chunk)
+        rows = {r[0]: r for r in col.db.all(f"select id, mid, mod, tags, flds from notes where id in ({ids})")}
+        for nid in chunk:
+            row = rows.get(nid)
+            if row is not None:
+                yield NoteRow(*row)
+
+
+def field_names(col, mids) -> dict:
+    """mid -> Feldnamen in Feldreihenfolge (unbekannter Notiztyp -> [])."""
+    names = {}
+    for mid in set(mids):
+        model = col.models.get(mid)
+        names[mid] = [f["name"] for f in model["flds"]] if model else []
+    return names
@@ -0,0 +1,296 @@
+# noteinfo.py — Bewertung der Quellnotizen (Vorschlag, Warnungen, Dublettenstatus), ohne Qt
+import threading
+from itertools import islice
+
+from .config import TAG_NEW
+from .parsing import NoteIR
+from .util import normalize_combo_key, key_to_tag, find_similar_notes_fuzzy
+from .dupindex import FuzzyIndex, get_key_index
+from .parallel import ParsePool, field_jobs
+from .notedata import iter_note_rows, SQL_CHUNK
+from .stats import stage, timed
+
+# Teil des dup_stamp; erhöhen, wenn sich die Dublettenprüfung ändert (verwirft gecachte Dublettenstatus)
+DUP_CHECK_VERSION = 2
+
+# Stufen der Note-Info; jede wird erst beim ersten Zugriff berechnet (get(..., tier=)) und einzeln gecacht
+TIER_PARSE = 0   # prop, warnings, has_warnings, no_correct, key_tag
+TIER_EXACT = 1   # + has_duplicate über den Kombi-Key-Index
+TIER_FUZZY = 2   # + is_fuzzy_duplicate (Fuzzy-Suche nur ohne exakte Dublette)
+
+EMPTY_INFO = {"prop": None, "warnings": [], "has_warnings": False, "no_correct": False, "key_tag": None,
+              "has_duplicate": False, "is_fuzzy_duplicate": False, "dup_tier": TIER_FUZZY}
+
+
+class NoteInfoStore:
+    """
+    Note-Info pro nid für den Review-Dialog und die Pipelines:
+      - Speicher-Cache -> persistenter ProposalCache (nid, mod) -> Neuberechnung
+      - gestuft: Parsen immer, Dublettenprüfung (exakt, dann fuzzy) erst wenn jemand sie liest
+      - merkt sich key_tag -> nids und einen Fragen-Index der Auswahl für inkrementelle Updates
+    Thread-sicher (Prefetch, Auto-Accept laufen im Hintergrund): gerechnet wird ohne Lock,
+    gesperrt nur das Nachschlagen und Einfügen im Cache. Cache-Einträge werden nicht verändert,
+    eine höhere Stufe ersetzt den Eintrag. prop_cache=None: nur im Speicher.
+    """
+
+    def __init__(self, col, model, config: dict | None = None, prop_cache=None):
+        self.col = col
+        self.model = model
+        self.config = config or {}
+        self.prop_cache = prop_cache
+        self.on_forget = None                # on_forget(nid), z. B. Prefetch-Eintrag verwerfen
+        self.parse_pool = None               # ParsePool für prefill(); None -> sequentiell
+        self._cache = {}
+        self._mods = {}                      # nid -> mod des gecachten Eintrags (für Nachträge im ProposalCache)
+        self._key_nids = {}                  # key_tag -> nids der Auswahl
+        self._sel_index = FuzzyIndex(0, 0)   # Fragen der Auswahl, nicht persistiert
+        self._epoch = 0                      # zählt forget()/clear(); ältere Ergebnisse nicht mehr einfügen
+        self._lock = threading.RLock()
+        self.dup_stamp = self.compute_dup_stamp()
+
+    @property
+    def dup_threshold(self) -> float:
+        return self.config.get("duplicate_threshold", 0.85)
+
+    def compute_dup_stamp(self) -> str:
+        """Stand des Ziel-Notiztyps + Schwelle; ändert sich, sobald Dublettenstatus veralten kann."""
+        cnt, max_mod = self.col.db.first("select count(), max(mod) from notes where mid = ?", self.model["id"])
+        return f"{DUP_CHECK_VERSION}:{self.model['id']}:{cnt}:{max_mod}:{self.dup_threshold}"
+
+    def refresh_dup_stamp(self):
+        self.dup_stamp = self.compute_dup_stamp()
+
+    # ---- Berechnung
+    def _ensure_dup(self, nid: int, info: dict, tier: int) -> bool:
+        """Rechnet fehlende Dublettenstufen bis `tier` in info nach; True, wenn sich info geändert hat."""
+        if info.get("dup_tier", TIER_FUZZY) >= tier:
+            return False
+        if info["dup_tier"] < TIER_EXACT:
+            with timed("dup.exact"):
+                info["has_duplicate"] = bool(get_key_index(self.col, self.model).lookup(info["key_tag"], exclude=(nid,)))
+            info["dup_tier"] = TIER_EXACT
+        if tier >= TIER_FUZZY and info["dup_tier"] < TIER_FUZZY:
+            question = info["prop"].get("Frage")
+            if not info["has_duplicate"] and question:
+                hits = find_similar_notes_fuzzy(self.col, question, threshold=self.dup_threshold, model=self.model)
+                info["is_fuzzy_duplicate"] = bool(hits)
+                info["has_duplicate"] = any(hid != nid for hid, _ in hits)
+            info["dup_tier"] = TIER_FUZZY
+        return True
+
+    @staticmethod
+    def _reset_dup(info: dict):
+        info["has_duplicate"] = False
+        info["is_fuzzy_duplicate"] = False
+        info["dup_tier"] = TIER_PARSE if info.get("prop") else TIER_FUZZY
+
+    def build(self, nid: int, note, ir: NoteIR | None = None) -> dict:
+        if ir is None:
+            ir = NoteIR.from_note(note)
+        return self._make_info(ir.prop, ir.warnings, ir.key_tag)
+
+    def _make_info(self, prop, warnings, key_tag) -> dict:
+        """Nur die Parse-Stufe; ohne Vorschlag gibt es nichts zu prüfen (alle Stufen fertig)."""
+        warnings = list(warnings)
+        if prop and key_tag is None:
+            key_tag = key_to_tag(normalize_combo_key(prop))
+        info = {
+            "prop": prop,
+            "warnings": warnings,
+            "has_warnings": bool(warnings),
+            "no_correct": any("Keine eindeutige richtige Antwort" in w for w in warnings),
+            "key_tag": key_tag if prop else None,
+        }
+        self._reset_dup(info)
+        return info
+
+    def get(self, nid: int, note=None, ir: NoteIR | None = None, tier: int = TIER_PARSE) -> dict:
+        """Note-Info mit mindestens `tier`; Filter und Auto-Accept brauchen nur TIER_PARSE."""
+        with self._lock:
+            info = self._cache.get(nid)
+            epoch = self._epoch
+        if info is None:
+            loaded = self._load(nid, note, ir)
+            if loaded is None:
+                return dict(EMPTY_INFO)
+            mod, info = loaded
+            with self._lock:
+                if epoch != self._epoch:
+                    return info  # inzwischen vergessen -> nicht mehr einfügen
+                info = self._cache.setdefault(nid, info)  # paralleler Aufruf war schneller -> dessen Eintrag
+                if info is loaded[1]:
+                    self._remember(nid, mod, info)
+        if info.get("dup_tier", TIER_FUZZY) >= tier:
+            return info
+
+        # Dublettenprüfung auf einer Kopie; die Indizes sperren selbst
+        upgraded = dict(info)
+        self._ensure_dup(nid, upgraded, tier)
+        with self._lock:
+            current = self._cache.get(nid)
+            if current is not info or epoch != self._epoch:
+                # ersetzt oder vergessen: nur eine mindestens gleich weite Stufe übernehmen
+                return current if current is not None and current.get("dup_tier", TIER_FUZZY) >= tier else upgraded
+            self._cache[nid] = upgraded
+            mod = self._mods.get(nid)
+        if self.prop_cache is not None and mod is not None:
+            self.prop_cache.put(nid, mod, upgraded, self.dup_stamp)
+        return upgraded
+
+    def _load(self, nid: int, note, ir):
+        """(mod, info) aus dem persistenten Cache oder neu geparst; None, wenn es die Notiz nicht gibt."""
+        if note is None:
+            try:
+                note = self.col.get_note(nid)
+            except Exception:
+                return None
+
+        # Persistenter Cache: Parse-Ergebnis gilt solange (nid, mod, Parser-Version) passen,
+        # die Dublettenstufen nur solange der Ziel-Notiztyp unverändert ist
+        info = self._from_prop_cache(nid, note.mod)
+        if info is None:
+            info = self.build(nid, note, ir)
+            if self.prop_cache is not None:
+                self.prop_cache.put(nid, note.mod, info, self.dup_stamp)
+        return note.mod, info
+
+    def _from_prop_cache(self, nid: int, mod: int):
+        hit = self.prop_cache.get(nid, mod) if self.prop_cache is not None else None
+        return self._cached_info(nid, mod, hit)
+
+    def _cached_info(self, nid: int, mod: int, hit):
+        """Treffer (info, dup_stamp) aus ProposalCache.get/get_many -> info; None ohne Treffer."""
+        if hit is None:
+            return None
+        info, stamp = hit
+        if stamp != self.dup_stamp:
+            # veraltet ist nur der Dublettenteil -> verwerfen, bei Bedarf neu rechnen
+            self._reset_dup(info)
+            self.prop_cache.put(nid, mod, info, self.dup_stamp)
+        return info
+
+    @stage("parse.prefill")
+    def prefill(self, nids):
+        """
+        Füllt den Cache für viele nids auf einmal: Felder per SQL statt get_note(), Cache-Treffer
+        direkt, den Rest parst parse_pool in Worker-Prozessen. Die Dublettenprüfung braucht
+        die Collection und läuft danach hier. Notizen des Ziel-Notiztyps werden übersprungen.
+        """
+        with self._lock:
+            missing = [nid for nid in nids if nid not in self._cache]
+        if missing:
+            self._prefill_rows(iter_note_rows(self.col, missing))
+
+    def _prefill_rows(self, rows):
+        target_mid = self.model["id"] if self.model else None
+        mods, todo = {}, []
+        rows = iter(rows)
+        # Cache-Treffer per get_many: eine Abfrage pro SQL_CHUNK Zeilen statt einer pro Notiz
+        while chunk := list(islice(rows, SQL_CHUNK)):
+            chunk = [row for row in chunk if row.mid != target_mid]
+            hits = {}
+            if self.prop_cache is not None:
+                hits = self.prop_cache.get_many([(row.id, row.mod) for row in chunk])
+            with self._lock:
+                for row in chunk:
+                    if row.id in self._cache:
+                        continue
+                    info = self._cached_info(row.id, row.mod, hits.get(row.id))
+                    if info is not None:
+                        self._remember(row.id, row.mod, info)
+                        continue
+                    mods[row.id] = row.mod
+                    todo.append(row)
+        if not todo:
+            return
+
+        def merge(result):
+            with self._lock:
+                for nid, prop, warnings, key_tag in result:
+                    info = self._make_info(prop, warnings, key_tag)
+                    if self.prop_cache is not None:
+                        self.prop_cache.put(nid, mods[nid], info, self.dup_stamp)
+                    self._remember(nid, mods[nid], info)
+
+        (self.parse_pool or ParsePool(1)).parse(field_jobs(self.col, todo), merge)
+        self.flush()
+
+    def flush(self):
+        if self.prop_cache is not None:
+            self.prop_cache.flush()
+
+    # ---- Verwaltung
+    def _remember(self, nid: int, mod: int, info: dict):
+        self._cache[nid] = info
+        self._mods[nid] = mod
+        if info.get("key_tag"):
+            self._key_nids.setdefault(info["key_tag"], set()).add(nid)
+        if info.get("prop") and info["prop"].get("Frage"):
+            self._sel_index.put(nid, None, info["prop"]["Frage"])
+
+    def forget(self, nid: int):
+        with self._lock:
+            self._epoch += 1
+            info = self._cache.pop(nid, None)
+            self._mods.pop(nid, None)
+            if info and info.get("key_tag"):
+                self._key_nids.get(info["key_tag"], set()).discard(nid)
+            self._sel_index.remove(nid)
+        if self.on_forget is not None:
+            self.on_forget(nid)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._cache.clear()
+            self._mods.clear()
+            self._key_nids.clear()
+            self._sel_index = FuzzyIndex(0, 0)
+
+    def affected_by_new_note(self, prop: dict) -> set:
+        """nids der Auswahl, deren Dublettenstatus eine neu angelegte Notiz mit `prop` ändert."""
+        with self._lock:
+            affected = set(self._key_nids.get(key_to_tag(normalize_combo_key(prop)), ()))
+            if prop.get("Frage"):
+                affected.update(nid for nid, _ in self._sel_index.query(prop["Frage"], self.dup_threshold, top_k=None))
+        return affected
+
+    # ---- Auswahl
+    @stage("filter.filter_ids")
+    def filter_ids(self, nids, *, hide_migrated: bool = False, only=None, no_correct_only: bool = False) -> list:
+        """
+        Filter des Review-Dialogs. Notizen des Ziel-Notiztyps fallen immer raus;
+        only: Menge erlaubter nids (z. B. AI-Prüf-Queue) oder None.
+        """
+        target_mid = self.model["id"] if self.model else None
+        rows = []
+        for row in iter_note_rows(self.col, nids):
+            if row.mid == target_mid:
+                continue
+            if hide_migrated and TAG_NEW in row.tags:
+                continue
+            if only is not None and row.id not in only:
+                continue
+            rows.append(row)
+
+        self._prefill_rows(rows)
+        filtered = []
+        for row in rows:
+            if no_correct_only and not self.get(row.id).get("no_correct"):
+                continue
+            filtered.append(row.id)
+        self.flush()
+        return filtered
+
+    def safe_proposals(self, nids) -> list:
+        """Wertet nids aus (auch im Hintergrund-Thread) und liefert die 100% sicheren (nid, prop)."""
+        self.prefill(nids)
+        accepted = []
+        for nid in nids:
+            info = self.get(nid)
+            if (info["prop"]
+                and not info["has_warnings"]
+                and not info["no_correct"]):
+                accepted.append((nid, info["prop"]))
+        self.flush()
+        return accepted
@@ -0,0 +1,236 @@
+# overview.py — Übersichtstabelle aller Vorschläge (Qt Model/View, Zeilen erst beim Anzeigen berechnet)
+import heapq
+
+from aqt.qt import (
+    QAbstractTableModel, QModelIndex, QTableView, QAbstractItemView, QHeaderView, QColor, Qt,
+)
+
+from .noteinfo import TIER_PARSE, TIER_EXACT, TIER_FUZZY
+
+# Status in Sortierreihenfolge; ST_PENDING = Fuzzy-Prüfung steht noch aus und kann ok/Warnung noch ändern
+ST_OK, ST_WARNING, ST_NO_CORRECT, ST_DUPLICATE, ST_FUZZY, ST_AI, ST_PENDING = range(7)
+STATUS_LABELS = {
+    ST_OK: "ok",
+    ST_WARNING: "Warnung",
+    ST_NO_CORRECT: "keine Lösung",
+    ST_DUPLICATE: "Dublette",
+    ST_FUZZY: "Fuzzy-Dublette",
+    ST_AI: "AI-Vorschlag",
+    ST_PENDING: "wird geprüft…",
+}
+STATUS_COLORS = {
+    ST_OK: "#2aa158",
+    ST_WARNING: "#d39e00",
+    ST_NO_CORRECT: "#d9534f",
+    ST_DUPLICATE: "#9b59b6",
+    ST_FUZZY: "#b07cc6",
+    ST_AI: "#0096ff",
+    ST_PENDING: "#8a8a8a",
+}
+COLUMNS = ("#", "Status", "Frage")
+QUESTION_CHARS = 160
+
+
+def note_status(info: dict, has_ai: bool) -> int:
+    if has_ai:
+        return ST_AI
+    if not info.get("prop") or info.get("no_correct"):
+        return ST_NO_CORRECT
+    if info.get("is_fuzzy_duplicate"):
+        return ST_FUZZY
+    if info.get("has_duplicate"):
+        return ST_DUPLICATE
+    if info.get("has_warnings"):
+        return ST_WARNING
+    return ST_OK
+
+
+class OverviewModel(QAbstractTableModel):
+    """
+    Eine Zeile pro nid der aktuellen Filterliste. data() fragt NoteInfoStore erst ab, wenn Qt die
+    Zeile zeichnet (QTableView fragt nur sichtbare Zeilen) -> Kosten wie die sichtbare Seite.
+    status() braucht nur TIER_EXACT; solange die Fuzzy-Stufe fehlt und den Status noch ändern
+    kann, heißt er ST_PENDING. Sichtbare offene Zeilen rechnet run_in_background(fn, on_done)
+    nach und zeichnet sie dann neu (None -> sofort im Aufrufer). Sortiert wird nach den schon
+    berechneten Stufen (keine Dublettenprüfung für unsichtbare Zeilen): was noch nicht geprüft ist,
+    steht unter ST_PENDING; erneutes Sortieren ordnet inzwischen angezeigte Zeilen richtig ein.
+    """
+
+    def __init__(self, notes, ai_results, parent=None, run_in_background=None):
+        super().__init__(parent)
+        self.notes = notes
+        self.ai_results = ai_results     # nid -> (prop, warnings), vom Review-Dialog geteilt
+        self.run_in_background = run_in_background  # z. B. mw.taskman.run_in_background
+        self._ids = []                    # Liste des Review-Dialogs (Reihenfolge = Position #)
+        self._pos = {}                    # nid -> Position in _ids
+        self._rows = []                   # angezeigte Reihenfolge (nids)
+        self._row_of = {}                 # nid -> Zeile in _rows
+        self._sort = None                 # (column, order)
+        self._sort_values = {}            # nid -> Sortwert der Zeile beim letzten Einsortieren
+        self._fuzzy_queue = []            # sichtbare ST_PENDING-Zeilen, deren Fuzzy-Stufe noch fehlt
+        self._fuzzy_requested = set()
+        self._fuzzy_running = False
+
+    # ---- Daten
+    def set_ids(self, ids):
+        """Neue Filterliste; gleiche Liste (Identität) -> nichts tun."""
+        if ids is self._ids:
+            return
+        self.beginResetModel()
+        self._ids = ids
+        self._pos = {nid: i for i, nid in enumerate(ids)}
+        self._rows = self._merge_rows(ids) if self._sort is not None else list(ids)
+        self._row_of = {nid: i for i, nid in enumerate(self._rows)}
+        self.endResetModel()
+
+    def refresh(self):
+        """Status kann sich geändert haben (Übernehmen, AI); neu gezeichnet werden nur sichtbare Zeilen."""
+        if self._rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, len(COLUMNS) - 1))
+
+    def nid_at(self, row: int):
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    def row_of(self, nid: int) -> int:
+        return self._row_of.get(nid, -1)
+
+    def position_of(self, nid: int) -> int:
+        """Index in der Liste des Review-Dialogs (self.i)."""
+        return self._pos.get(nid, -1)
+
+    def status(self, nid: int, tier: int = TIER_EXACT) -> int:
+        """
+        Angezeigter Status. Dublette, keine Lösung und AI stehen schon nach TIER_EXACT fest.
+        tier=TIER_PARSE rechnet nichts nach (Sortieren): ungeprüfte Zeilen -> ST_PENDING.
+        """
+        info = self.notes.get(nid, tier=tier)
+        status = note_status(info, nid in self.ai_results)
+        if status in (ST_OK, ST_WARNING) and info.get("dup_tier", TIER_FUZZY) < TIER_FUZZY:
+            return ST_PENDING
+        return status
+
+    def question(self, nid: int) -> str:
+        """Angezeigte Frage: AI-Vorschlag aus der Prüf-Queue vor dem geparsten Vorschlag."""
+        prop = self.ai_results[nid][0] if nid in self.ai_results else self.notes.get(nid)["prop"]
+        return ((prop or {}).get("Frage") or "").replace("\n", " ")
+
+    def _request_fuzzy(self, nid: int):
+        if nid in self._fuzzy_requested:
+            return
+        self._fuzzy_requested.add(nid)
+        if self.run_in_background is None:
+            self.notes.get(nid, tier=TIER_FUZZY)
+            return
+        self._fuzzy_queue.append(nid)
+        self._kick_fuzzy()
+
+    def _kick_fuzzy(self):
+        if self._fuzzy_running or not self._fuzzy_queue:
+            return
+        nids, self._fuzzy_queue = self._fuzzy_queue, []
+        self._fuzzy_running = True
+
+        def work():
+            for nid in nids:
+                self.notes.get(nid, tier=TIER_FUZZY)
+
+        self.run_in_background(work, lambda fut: self._fuzzy_done(nids, fut))
+
+    def _fuzzy_done(self, nids, fut):
+        self._fuzzy_running = False
+        try:
+            fut.result()
+        except Exception:
+            pass  # Zeilen bleiben "wird geprüft…"; der Review-Dialog rechnet beim Anzeigen selbst
+        for nid in nids:
+            row = self._row_of.get(nid)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 1), self.index(row, 1))
+        self._kick_fuzzy()
+
+    # ---- QAbstractTableModel
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (
+            Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.ToolTipRole
+        ):
+            return None
+        nid = self._rows[index.row()]
+        col = index.column()
+        if col == 0:
+            return str(self._pos.get(nid, -1) + 1) if role == Qt.ItemDataRole.DisplayRole else None
+        if col == 1:
+            status = self.status(nid)
+            if status == ST_PENDING:
+                self._request_fuzzy(nid)
+                status = self.status(nid)  # ohne run_in_background schon fertig
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return QColor(STATUS_COLORS[status])
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return " | ".join(self.notes.get(nid)["warnings"]) or None
+            return STATUS_LABELS[status]
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self.question(nid)[:QUESTION_CHARS]
+
+    def _sort_value(self, column: int, nid: int):
+        if column == 1:
+            return self.status(nid, tier=TIER_PARSE)
+        if column == 2:
+            return self.question(nid).lower()
+        return 0  # Spalte # -> nur die Position
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        values = self._sort_values = {nid: self._sort_value(column, nid) for nid in self._rows}
+        self._rows.sort(key=lambda nid: (values[nid], self._pos[nid]), reverse=order == Qt.SortOrder.DescendingOrder)
+        self._row_of = {nid: i for i, nid in enumerate(self._rows)}
+        self.layoutChanged.emit()
+
+    def _merge_rows(self, ids) -> list:
+        """
+        Neue Filterliste in der aktiven Sortierung: bleibende Zeilen mit unverändertem Sortwert
+        behalten ihre Reihenfolge, nur neue und geänderte Zeilen werden sortiert und eingemischt.
+        """
+        column, order = self._sort
+        old = self._sort_values
+        values = self._sort_values = {nid: self._sort_value(column, nid) for nid in ids}
+        key = lambda nid: (values[nid], self._pos[nid])
+        reverse = order == Qt.SortOrder.DescendingOrder
+        # Filter behalten die Reihenfolge der Liste -> bleibende Zeilen sind weiter sortiert
+        stay = [nid for nid in self._rows if nid in values and old.get(nid) == values[nid]]
+        kept = set(stay)
+        moved = sorted((nid for nid in ids if nid not in kept), key=key, reverse=reverse)
+        return list(heapq.merge(stay, moved, key=key, reverse=reverse))
+
+
+def build_overview_view(model, parent=None) -> QTableView:
+    """Tabelle mit fester Zeilenhöhe: Qt muss keine Zeile außerhalb des sichtbaren Bereichs vermessen."""
+    view = QTableView(parent)
+    view.setModel(model)
+    view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+    view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    view.setSortingEnabled(True)
+    view.setWordWrap(False)
+    view.verticalHeader().setVisible(False)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 6)
+    header = view.horizontalHeader()
+    header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+    header.setStretchLastSection(True)
+    header.resizeSection(0, 56)
+    header.resizeSection(1, 110)
+    view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+    return view
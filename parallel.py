@@ -0,0 +1,126 @@
+# parallel.py — Regex-Parser für große Auswahlen auf mehrere Prozesse verteilen
+import os
+import sys
+import runpy
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .parsing import parse_field_rows
+from .notedata import field_names
+
+CHUNK_SIZE = 250       # Notizen pro Worker-Auftrag
+MIN_PARALLEL = 500     # darunter lohnt der Prozessstart nicht -> sequentiell
+
+_PACKAGE = __name__.rpartition(".")[0]   # Name des Add-on-Pakets (in Anki der Ordnername)
+_STANDALONE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standalone.py")
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)  # ein Kern bleibt für die GUI
+
+
+def can_spawn() -> bool:
+    """
+    spawn startet sys.executable neu. In gebündelten Builds (PyInstaller/PyOxidizer, sys.frozen)
+    ist das Anki selbst und kein Python-Interpreter -> dort nur sequentiell.
+    """
+    if getattr(sys, "frozen", False):
+        return False
+    exe = os.path.basename(sys.executable or "").lower()
+    return exe.startswith(("python", "pypy"))
+
+
+def worker_initializer():
+    """Initializer für die Worker: Paket ohne __init__.py registrieren (siehe standalone.py)."""
+    from .standalone import WORKER_RUN_NAME
+    return functools.partial(runpy.run_path, _STANDALONE, {"WORKER_PACKAGE": _PACKAGE}, WORKER_RUN_NAME)
+
+
+def field_jobs(col, rows):
+    """
+    rows = notedata.NoteRow -> Aufträge [(names, [(nid, values)])], je Notiztyp in CHUNK_SIZE-Stücken.
+    Die Worker bekommen nur Strings, keine Collection-Objekte.
+    """
+    by_mid = {}
+    for row in rows:
+        by_mid.setdefault(row.mid, []).append((row.id, row.fields))
+    names = field_names(col, by_mid)
+    jobs = []
+    for mid, items in by_mid.items():
+        for i in range(0, len(items), CHUNK_SIZE):
+            jobs.append((names[mid], items[i:i + CHUNK_SIZE]))
+    return jobs
+
+
+class ParsePool:
+    """
+    Prozess-Pool (spawn) für parse_field_rows, wird beim ersten großen Auftrag gestartet und
+    bis shutdown() wiederverwendet. Die Worker laden nur die Parser-Module (worker_initializer).
+    Scheitert der Pool, läuft alles Weitere sequentiell im aufrufenden Thread.
+    workers <= 1 oder gebündelter Build (can_spawn): nie parallel.
+    """
+
+    def __init__(self, workers: int | None = None, initializer=None):
+        self.workers = default_workers() if not workers else max(1, int(workers))
+        if not can_spawn():
+            self.workers = 1
+        self.initializer = initializer or worker_initializer()
+        self.broken = False
+        self.error = None
+        self._pool = None
+
+    def parse(self, jobs, on_chunk):
+        """Ruft on_chunk([(nid, prop, warnings, key_tag), ...]) pro Auftrag auf, in Auftragsreihenfolge."""
+        for result in self._results(jobs):
+            on_chunk(result)
+
+    def _results(self, jobs):
+        # Generator: Ausnahmen aus on_chunk landen nicht im except unten, nur Fehler des Pools
+        done = 0
+        n_notes = sum(len(rows) for _, rows in jobs)
+        if self.workers > 1 and not self.broken and len(jobs) > 1 and n_notes >= MIN_PARALLEL:
+            try:
+                for result in self._get_pool().map(parse_field_rows, *zip(*jobs)):
+                    yield result
+                    done += 1
+                return
+            except Exception as e:
+                self.error = e  # Pool bleibt für die Sitzung abgeschaltet
+                self.broken = True
+                self.shutdown()
+        for names, rows in jobs[done:]:
+            yield parse_field_rows(names, rows)
+
+    def _get_pool(self):
+        if self._pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=self.initializer)
+        return self._pool
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_POOL = None
+
+
+def get_parse_pool(workers: int | None = None) -> ParsePool:
+    """Gemeinsamer Pool der Sitzung; workers = 0/None -> Kerne - 1, gebündelter Build -> 1."""
+    global _POOL
+    wanted = default_workers() if not workers else max(1, int(workers))
+    if not can_spawn():
+        wanted = 1
+    if _POOL is None or _POOL.workers != wanted:
+        shutdown_pool()
+        _POOL = ParsePool(wanted)
+    return _POOL
+
+
+def shutdown_pool():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
@@ -1,12 +1,25 @@
 import re
 import json
-import urllib.request
-import urllib.error
+import time
+import urllib.parse
 import os
 import base64
 import mimetypes
-from aqt import mw  # Zugriff auf Anki Settings & Media DB
-from .util import strip_html_keep_media, normalize_option_text
+try:
+    from aqt import mw  # Zugriff auf Anki Settings & Media DB
+except ImportError:
+    mw = None  # außerhalb von Anki (bench.py); parse_with_llm braucht dann config/media_dir
+from .util import (
+    sanitize_parts, render_sanitized, one_line, strip_option_prefix, normalize_option_text, key_to_tag,
+    COMBO_FIELDS, normalize_combo_key,
+)
+from .cache import get_llm_cache, llm_cache_key
+from .media import prepare_images
+from .http_client import get_client, Cancelled
+from .stats import STATS, stage, timed, count
+
+# Version der Parser-Logik; erhöhen, wenn sich Vorschläge für gleiche Felder ändern (invalidiert den Cache)
+PARSER_VERSION = 1
 
 # ---- Patterns
 LETTER_ONLY   = re.compile(r'^\s*([a-eA-E])\s*$')
@@ -15,41 +28,159 @@ BIN_5_COMPACT = re.compile(r'\b[01]{5}\b')
 LETTER_PLUS   = re.compile(r'^\s*([a-eA-E])(?:[\)\.\:\-])?\s+(.*)$')
 STRICT_OPT_MARK  = re.compile(r'(?<![A-Za-z0-9])([a-eA-E])[\)\.\:\-]\s+', re.M)
 LENIENT_OPT_MARK = re.compile(r'(?<![A-Za-z0-9])([a-eA-E])\s+', re.M)
+OPTION_LETTERS = "abcdefgh"  # _pick_best_sequence erkennt bis zu 8 Optionen (Standard: A–E)
+_LETTER_INDEX = {c: i for i, c in enumerate(OPTION_LETTERS)} | {c.upper(): i for i, c in enumerate(OPTION_LETTERS)}
+
+def _option_mark_patterns(n_options: int):
+    if n_options == 5:
+        return STRICT_OPT_MARK, LENIENT_OPT_MARK
+    last = OPTION_LETTERS[n_options - 1]
+    cls = f"a-{last}A-{last.upper()}"
+    return (re.compile(rf'(?<![A-Za-z0-9])([{cls}])[\)\.\:\-]\s+', re.M),
+            re.compile(rf'(?<![A-Za-z0-9])([{cls}])\s+', re.M))
+
+def _best_run(ms, n_options: int = 5):
+    """
+    Ein Durchlauf über die Marker (ms, Matches in Textreihenfolge) statt eines Scans pro „a“. Jeder
+    Lauf ist ein Automat mit Zustand (erwarteter Buchstabe, Länge); Läufe im gleichen Zustand hängen
+    ab dann dieselben Marker an -> nur der früheste Start wird weitergeführt. Höchstens n_options²
+    Zustände, also O(Marker).
+    Ergebnis wie beim Scan: Lauf mit 3..n_options Markern, dessen letzter Marker am weitesten hinten
+    endet; bei Gleichstand der früher beginnende.
+    """
+    last = n_options - 1
+    active = {}                  # (ei, Länge) -> (Start, Marker)
+    best, best_key = [], None    # best_key = (Ende, -Start)
+
+    def offer(start, seq):
+        nonlocal best, best_key
+        key = (seq[-1].end(), -start)
+        if best_key is None or key > best_key:
+            best, best_key = seq, key
+
+    for i, m in enumerate(ms):
+        k = _LETTER_INDEX[m.group(1)]
+        if not active:
+            if k == 0:
+                active = {(1, 1): (i, [m])}
+            continue
+        moved = {}
+        for (ei, ln), (start, seq) in active.items():
+            if k == ei:
+                state, seq = (min(ei + 1, last), ln + 1), seq + [m]
+            elif k > ei:
+                state, seq = (k, ln + 1), seq + [m]
+            else:
+                state = (ei, ln)
+            if state[1] == n_options:
+                offer(start, seq)
+                continue
+            prev = moved.get(state)
+            if prev is None:
+                moved[state] = (start, seq)
+                continue
+            # Gleicher Zustand: weiter geht es nur mit dem früheren Start. Der andere kann nur noch
+            # gewinnen, wenn nichts mehr angehängt wird -> als fertigen Lauf anbieten.
+            keep, drop = (prev, (start, seq)) if prev[0] < start else ((start, seq), prev)
+            moved[state] = keep
+            if state[1] >= 3:
+                offer(*drop)
+        if k == 0 and (1, 1) not in moved:
+            moved[(1, 1)] = (i, [m])
+        active = moved
+    for (_ei, ln), (start, seq) in active.items():
+        if ln >= 3:
+            offer(start, seq)
+    return best
+
+@stage("parse.pick_best_sequence")
+def _pick_best_sequence(txt: str, n_options: int = 5):
+    """Marker-Folge a), b), … der Optionen (strikt, sonst „a “-Stil); [] wenn keine mit ≥3 Markern."""
+    strict, lenient = _option_mark_patterns(n_options)
+    return _best_run(strict.finditer(txt), n_options) or _best_run(lenient.finditer(txt), n_options)
+
+class NoteIR:
+    """
+    Einmal aufbereitete Sicht auf eine Notiz, geteilt von Parser, Dublettenlogik und ALT-Preview:
+    jedes Feld wird genau einmal tokenisiert (sanitize_parts), bereinigt und jede Option nur einmal
+    normalisiert. Vorschlag und Kombi-Key entstehen beim ersten Zugriff.
+    Aus (names, values) baubar -> braucht kein Note-Objekt (Worker-Prozesse, Benchmarks).
+    """
+    __slots__ = ("names", "values", "_fields", "_parts", "_stripped", "_norm", "_parsed", "_combo_key")
+
+    def __init__(self, names, values):
+        self.names = tuple(names)
+        self.values = tuple(values)
+        self._fields = dict(zip(self.names, self.values))
+        self._parts = {}
+        self._stripped = {}
+        self._norm = {}
+        self._parsed = None
+        self._combo_key = None
+
+    @classmethod
+    def from_note(cls, note):
+        return cls(note.keys(), note.fields)
+
+    # ---- Felder
+    def field(self, name: str) -> str:
+        return self._fields.get(name, "")
+
+    def parts(self, name: str) -> list:
+        parts = self._parts.get(name)
+        if parts is None:
+            parts = self._parts[name] = sanitize_parts(self.field(name))
+        return parts
+
+    def stripped(self, name: str) -> str:
+        """= strip_html_keep_media(field(name))"""
+        txt = self._stripped.get(name)
+        if txt is None:
+            txt = self._stripped[name] = one_line(render_sanitized(self.parts(name)))
+        return txt
+
+    def preview(self, name: str, media_dir: str | None) -> str:
+        """= sanitize_keep_img(field(name), preview=True, media_dir=media_dir)"""
+        return render_sanitized(self.parts(name), preview=True, media_dir=media_dir)
 
-def _field_names(note):
-    return [f["name"] for f in note.model()["flds"]]
-
-def _get(note, name):
-    names = _field_names(note)
-    return note[name] if name in names else ""
-
-def _pick_best_sequence(txt: str):
-    def collect(mark_pat):
-        ms = list(mark_pat.finditer(txt))
-        if not ms: return []
-        runs = []
-        expected = ['a', 'b', 'c', 'd', 'e']
-        starts = [i for i, m in enumerate(ms) if m.group(1).lower() == 'a']
-        for si in starts:
-            seq, ei = [], 0
-            for m in ms[si:]:
-                ch = m.group(1).lower()
-                if ch == expected[ei]:
-                    seq.append(m); ei = min(ei + 1, 4)
-                elif ch in expected[ei+1:]:
-                    seq.append(m); ei = expected.index(ch)
-                if len(seq) == 5: break
-            if 3 <= len(seq) <= 5: runs.append(seq)
-        return runs
-
-    runs = collect(STRICT_OPT_MARK)
-    if not runs: runs = collect(LENIENT_OPT_MARK)
-    if not runs: return []
-    runs.sort(key=lambda r: r[-1].end(), reverse=True)
-    return runs[0]
-
-def _parse_front_stream(html: str):
-    txt = strip_html_keep_media(html)
+    def normalized(self, text: str) -> str:
+        """normalize_option_text mit Memo (Optionen werden in mehreren Lösungsformaten verglichen)."""
+        norm = self._norm.get(text)
+        if norm is None:
+            norm = self._norm[text] = normalize_option_text(text)
+        return norm
+
+    # ---- Ergebnis
+    @property
+    def prop(self):
+        return self._parse()[0]
+
+    @property
+    def warnings(self) -> list:
+        return self._parse()[1]
+
+    @property
+    def combo_key(self):
+        """= normalize_combo_key(prop); None ohne Vorschlag."""
+        if self._combo_key is None and self.prop:
+            # Parser-Ausgabe ist bereits whitespace-normalisiert -> nur noch zusammensetzen
+            key = "||".join(self.prop[f] for f in COMBO_FIELDS).lower()
+            self._combo_key = normalize_combo_key(self.prop) if "<br" in key else key
+        return self._combo_key
+
+    @property
+    def key_tag(self):
+        key = self.combo_key
+        return key_to_tag(key) if key is not None else None
+
+    def _parse(self):
+        if self._parsed is None:
+            self._parsed = _proposal_from_ir(self)
+        return self._parsed
+
+
+def _parse_front_stream(ir: NoteIR, name: str):
+    txt = ir.stripped(name)
     seq = _pick_best_sequence(txt)
     if not seq: return txt.strip(), []
     q = txt[:seq[0].start()].strip()
@@ -58,21 +189,21 @@ def _parse_front_stream(html: str):
         s = m.end()
         e = seq[i + 1].start() if i + 1 < len(seq) else len(txt)
         chunk = txt[s:e].strip()
-        if chunk: opts.append(normalize_option_text(chunk))
+        if chunk: opts.append(ir.normalized(chunk))
     return q, opts[:5]
 
-def _parse_structured_fields(note):
-    names = _field_names(note)
+def _parse_structured_fields(ir: NoteIR):
+    names = ir.names
     fmap = {n.lower(): n for n in names}
     q_key = (fmap.get("question") or fmap.get("frage") or fmap.get("front") or fmap.get("vorderseite") or (names[0] if names else None))
     if not q_key: return None
-    question = strip_html_keep_media(_get(note, q_key))
+    question = ir.stripped(q_key)
     opt_values = [""] * 5
     for i in range(1, 6):
         chosen = None
         for cand in (f"q_{i}", f"q{i}", f"q-{i}", f"q {i}", f"option {i}", f"antwort {i}", f"answer {i}"):
             if cand in fmap: chosen = fmap[cand]; break
-        if chosen: opt_values[i - 1] = normalize_option_text(_get(note, chosen))
+        if chosen: opt_values[i - 1] = strip_option_prefix(ir.stripped(chosen))
     indexed_opts = [(idx, text) for idx, text in enumerate(opt_values) if text]
     if not indexed_opts: return None
     options = [text for _, text in indexed_opts]
@@ -80,7 +211,7 @@ def _parse_structured_fields(note):
     sol_key = (fmap.get("answers") or fmap.get("solutions") or fmap.get("mc_solutions") or fmap.get("solution") or fmap.get("correct") or fmap.get("loesungen") or fmap.get("lösungen"))
     correct_idx, comment = None, ""
     if sol_key:
-        sol_raw = strip_html_keep_media(_get(note, sol_key))
+        sol_raw = ir.stripped(sol_key)
         selected_orig_idx = None
         m = BIN_5_SPACED.search(sol_raw)
         if m: bits = [int(x) for x in m.groups()]
@@ -96,22 +227,22 @@ def _parse_structured_fields(note):
                 m_letter_plus = LETTER_PLUS.match(stripped)
                 if m_letter_plus:
                     letter_idx = "ABCDE".index(m_letter_plus.group(1).upper())
-                    tail = normalize_option_text(m_letter_plus.group(2))
+                    tail = ir.normalized(m_letter_plus.group(2))
                     if tail:
                         for orig_idx, text in indexed_opts:
-                            if normalize_option_text(text) == tail: selected_orig_idx = orig_idx; break
+                            if ir.normalized(text) == tail: selected_orig_idx = orig_idx; break
                     if selected_orig_idx is None: selected_orig_idx = letter_idx
                 else:
-                    sol_norm = normalize_option_text(sol_raw)
+                    sol_norm = ir.normalized(sol_raw)
                     for orig_idx, text in indexed_opts:
-                        if normalize_option_text(text) == sol_norm: selected_orig_idx = orig_idx; break
+                        if ir.normalized(text) == sol_norm: selected_orig_idx = orig_idx; break
         if selected_orig_idx is not None: correct_idx = idx_lookup.get(selected_orig_idx)
     for cand in ("comment", "kommentar", "extra 1", "extra", "notes"):
-        if cand in fmap: comment = strip_html_keep_media(_get(note, fmap[cand])); break
+        if cand in fmap: comment = ir.stripped(fmap[cand]); break
     return question, options, correct_idx, comment
 
-def _detect_from_back(back_html: str, options: list[str]):
-    raw = strip_html_keep_media(back_html)
+def _detect_from_back(ir: NoteIR, name: str | None, options: list[str]):
+    raw = ir.stripped(name) if name else ""
     if not raw: return None, ""
     parts = re.split(r"\r?\n", raw, maxsplit=1)
     first = parts[0] if parts else raw
@@ -129,27 +260,25 @@ def _detect_from_back(back_html: str, options: list[str]):
     m = LETTER_PLUS.match(first)
     if m:
         letter_idx = "ABCDE".index(m.group(1).upper())
-        tail = normalize_option_text(m.group(2))
+        tail = ir.normalized(m.group(2))
         if tail:
             for i, o in enumerate(options):
-                if normalize_option_text(o) == tail: return i, rest_comment
+                if ir.normalized(o) == tail: return i, rest_comment
         return letter_idx, rest_comment
-    first_norm = normalize_option_text(first)
+    first_norm = ir.normalized(first)
     for i, o in enumerate(options):
-        if normalize_option_text(o) == first_norm: return i, rest_comment
+        if ir.normalized(o) == first_norm: return i, rest_comment
     return None, rest_comment
 
-def parse_note_to_proposal(note):
+@stage("parse.proposal")
+def _proposal_from_ir(ir: NoteIR):
     warnings = []
-    sf = _parse_structured_fields(note)
+    sf = _parse_structured_fields(ir)
     if sf: q, opts, correct, comment = sf
     else:
-        names = _field_names(note)
-        front = _get(note, names[0]) if names else ""
-        back  = _get(note, names[1]) if len(names) > 1 else ""
-        q, opts = _parse_front_stream(front)
-        correct, comment = _detect_from_back(back, opts)
-
+        names = ir.names
+        q, opts = _parse_front_stream(ir, names[0]) if names else ("", [])
+        correct, comment = _detect_from_back(ir, names[1] if len(names) > 1 else None, opts)
     if not q or not opts:
         warnings.append("Keine Frage/Optionen erkannt – Bearbeiten nötig")
         return None, warnings
@@ -168,15 +297,189 @@ def parse_note_to_proposal(note):
         prop[name] = ordered[i]
     return prop, warnings
 
+def parse_note_to_proposal(note):
+    ir = NoteIR.from_note(note)
+    return ir.prop, ir.warnings
+
+def parse_field_rows(names, rows):
+    """
+    Parst Feld-Snapshots eines Notiztyps ohne Note-Objekte; Einstieg für Worker-Prozesse.
+    rows = [(nid, values), ...] -> [(nid, prop, warnings, key_tag), ...]
+    """
+    out = []
+    for nid, values in rows:
+        ir = NoteIR(names, values)
+        out.append((nid, ir.prop, ir.warnings, ir.key_tag))
+    return out
+
+
 # --- AI & Vision Logic ---
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+# Version des LLM-Prompts; erhöhen, wenn sich prompt_text/Antwortformat ändern (invalidiert den Antwort-Cache)
+PROMPT_VERSION = 2
+LLM_OPTION_KEYS = ("Antwort A", "Antwort B", "Antwort C", "Antwort D", "Antwort E")
 
-def parse_with_llm(text_content: str) -> tuple[dict, list]:
-    # Lade Config dynamisch
-    config = mw.addonManager.getConfig(__name__) or {}
+def _llm_json_to_prop(js: dict, partial: bool = False) -> tuple[dict, list]:
+    """
+    JSON-Felder des Modells -> Vorschlag (richtige Antwort zuerst).
+    partial=True (Streaming): fehlt „Correct“ noch, bleiben die Optionen in Originalreihenfolge.
+    """
+    prop = {
+        "Frage": js.get("Frage", ""),
+        "Kopfzeile": "",
+        "Eigene Notizen": "",
+        "Antwort": js.get("Antwort", "")
+    }
+    correct_letter = (js.get("Correct") or "").upper().strip()
+    raw_opts = [js.get(k, "") for k in LLM_OPTION_KEYS]
+    
+    if correct_letter in "ABCDE" and len(correct_letter) == 1:
+        idx = "ABCDE".index(correct_letter)
+        correct_text = raw_opts[idx]
+        raw_opts.pop(idx)
+        raw_opts.insert(0, correct_text)
+    elif not partial:
+        return None, ["AI konnte keine Lösung identifizieren"]
+
+    for i, k in enumerate(LLM_OPTION_KEYS):
+        prop[k] = raw_opts[i] if i < len(raw_opts) else ""
+
+    return prop, []
+
+def _llm_content_to_prop(content: str) -> tuple[dict, list]:
+    """Wandelt die JSON-Antwort des Modells in einen Vorschlag (richtige Antwort zuerst) um."""
+    try:
+        content = content.replace("```json", "").replace("```", "").strip()
+        js = json.loads(content)
+    except json.JSONDecodeError:
+        return None, ["AI-Antwort war kein valides JSON"]
+    return _llm_json_to_prop(js)
+
+def llm_partial_prop(fields: dict) -> tuple[dict, bool]:
+    """Zwischenstand beim Streaming: (Vorschlag aus den bisher fertigen Feldern, Lösung schon bekannt)."""
+    prop, _ = _llm_json_to_prop(fields, partial=True)
+    letter = (fields.get("Correct") or "").upper().strip()
+    return prop, len(letter) == 1 and letter in "ABCDE"
+
+_JSON_STRING_STOP = re.compile(r'["\\]')  # in einem JSON-String: Ende oder Escape
+_JSON_SEP = re.compile(r'[\s,]*')  # zwischen zwei Feldern
+
+def _scan_json_string(s: str, pos: int, escape: bool) -> tuple[int, bool, bool]:
+    """Liest im Inneren eines JSON-Strings ab `pos` weiter. -> (Position, Escape offen, geschlossen)."""
+    while True:
+        if escape:
+            if pos >= len(s):
+                return pos, True, False
+            pos, escape = pos + 1, False
+        m = _JSON_STRING_STOP.search(s, pos)
+        if m is None:
+            return len(s), False, False
+        pos = m.end()
+        if m.group(0) == '"':
+            return pos, False, True
+        escape = True
+
+class JsonFieldStream:
+    """
+    Liest ein JSON-Objekt, das stückweise ankommt, und meldet jedes Feld der obersten Ebene, sobald
+    sein Wert vollständig ist. Text vor der ersten „{“ (z. B. ```json) wird übersprungen.
+    feed() gibt die neu fertigen Schlüssel zurück; alle bisherigen Felder stehen in .fields.
+    In einem offenen String liest feed() nur das neue Stück (Scan-Position und Escape-Zustand
+    bleiben stehen) und fügt den Puffer erst zusammen, wenn der String schließt -> linear statt
+    quadratisch in der Länge eines langen Werts.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self._parts = []        # angekommene Stücke; "".join() erst, wenn es etwas zu parsen gibt
+        self._size = 0
+        self._pos = -1          # -1: „{“ noch nicht gesehen
+        self._decoder = json.JSONDecoder()
+        self._str_start = -1    # öffnendes „"“ des Strings, der gerade gelesen wird
+        self._str_scan = 0      # bis hier ist er schon gelesen
+        self._str_escape = False  # letztes gelesenes Zeichen war ein Backslash
+        self._key = None        # (Anfang, Ende) des fertigen Schlüssels, dessen Wert noch offen ist
+
+    def _string_end(self, buf: str, start: int):
+        """Ende (hinter dem schließenden „"“) des Strings ab `start`; None, solange er offen ist."""
+        if start != self._str_start:
+            self._str_start, self._str_scan, self._str_escape = start, start + 1, False
+        pos, escape, closed = _scan_json_string(buf, self._str_scan, self._str_escape)
+        if closed:
+            self._str_start = -1
+            return pos
+        self._str_scan, self._str_escape = pos, escape
+        return None
+
+    def feed(self, text: str) -> list:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._str_start >= 0:
+            # offener String, bisher bis zum Ende gelesen: nur das neue Stück ansehen
+            pos, escape, closed = _scan_json_string(text, 0, self._str_escape)
+            if not closed:
+                self._str_scan, self._str_escape = self._size, escape
+                return []
+        buf = "".join(self._parts)
+        self._parts = [buf]
+        if self._pos < 0:
+            start = buf.find("{")
+            if start < 0:
+                return []
+            self._pos = start + 1
+        done = []
+        while True:
+            key_start = _JSON_SEP.match(buf, self._pos).end()
+            if key_start >= len(buf) or buf[key_start] != '"':
+                break
+            if self._key is not None and self._key[0] == key_start:
+                key_end = self._key[1]
+            else:
+                key_end = self._string_end(buf, key_start)
+                if key_end is None:
+                    break
+                self._key = (key_start, key_end)
+            pos = _skip_ws(buf, key_end)
+            if pos >= len(buf) or buf[pos] != ":":
+                break
+            pos = _skip_ws(buf, pos + 1)
+            if pos >= len(buf):
+                break
+            if buf[pos] == '"':
+                end = self._string_end(buf, pos)
+                if end is None:
+                    break
+                value = json.loads(buf[pos:end])
+            else:
+                # Zahl/true/null/Objekt: erst fertig, wenn danach schon „,“ oder „}“ steht
+                try:
+                    value, end = self._decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    break
+                if _skip_ws(buf, end) >= len(buf):
+                    break
+            key = json.loads(buf[key_start:key_end])
+            self.fields[key] = value
+            done.append(key)
+            self._pos = end
+            self._key = None
+        return done
+
+def _skip_ws(buf: str, pos: int) -> int:
+    while pos < len(buf) and buf[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+def parse_with_llm(text_content: str, config: dict | None = None, media_dir: str | None = None, token=None,
+                   on_fields=None) -> tuple[dict, list]:
+    """
+    on_fields(fields): Streaming-Modus (Config „llm_stream“). Wird im aufrufenden Thread mit allen bisher
+    fertigen JSON-Feldern aufgerufen, sobald ein weiteres Feld vollständig ist. Das Ergebnis ist
+    dasselbe wie ohne Streaming.
+    """
+    # Lade Config dynamisch (Batch-Worker übergeben config/media_dir, damit sie mw nicht anfassen)
+    if config is None:
+        config = mw.addonManager.getConfig(__name__) or {}
     api_key = config.get("openai_api_key", "").strip()
     # Standard-Modell, aber wir prüfen gleich, ob wir Vision brauchen
     model = config.get("openai_model", "gpt-4o-mini") 
@@ -185,7 +488,8 @@ def parse_with_llm(text_content: str) -> tuple[dict, list]:
         return None, ["Kein API Key konfiguriert!"]
 
     # 1. Bilder im Text suchen (src="...")
-    media_dir = mw.col.media.dir()
+    if media_dir is None:
+        media_dir = mw.col.media.dir()
     image_refs = re.findall(r'src="([^"]+)"', text_content)
     
     # 2. Content zusammenbauen (Text + Bilder)
@@ -199,7 +503,8 @@ def parse_with_llm(text_content: str) -> tuple[dict, list]:
         "da die Antworten in der App gemischt werden. "
         "Schreibe stattdessen immer den vollständigen Text der Antwortoption aus "
         "(z.B. statt 'B ist falsch' schreibe 'Die Hypertonie ist falsch, weil...').\n"
-        "Antworte AUSSCHLIESSLICH als JSON: {'Frage': '...', 'Antwort A': '...', ... 'Antwort E': '...', 'Antwort': 'Erklärung (OHNE Buchstaben)', 'Correct': 'A'}.\n"
+        "Antworte AUSSCHLIESSLICH als JSON mit den Feldern in genau dieser Reihenfolge: "
+        "{'Frage': '...', 'Antwort A': '...', ... 'Antwort E': '...', 'Correct': 'A', 'Antwort': 'Erklärung (OHNE Buchstaben)'}.\n"
         "Hier ist der Inhalt:\n" + text_content
     )
 
@@ -208,7 +513,7 @@ def parse_with_llm(text_content: str) -> tuple[dict, list]:
         "text": prompt_text
     })
 
-    has_images = False
+    images = []  # (mime_type, bytes)
     for img_fname in image_refs:
         # Filename bereinigen (manchmal URL-encoded)
         img_fname = urllib.parse.unquote(img_fname)
@@ -218,67 +523,83 @@ def parse_with_llm(text_content: str) -> tuple[dict, list]:
             mime_type, _ = mimetypes.guess_type(full_path)
             if mime_type and mime_type.startswith('image'):
                 try:
-                    base64_img = encode_image(full_path)
-                    content_payload.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime_type};base64,{base64_img}"
-                        }
-                    })
-                    has_images = True
+                    with open(full_path, "rb") as image_file:
+                        images.append((mime_type, image_file.read()))
                 except Exception:
                     pass # Wenn ein Bild kaputt ist, ignorieren wir es
+    # Große Screenshots verkleinern/neu komprimieren (gecacht pro Bild-Hash)
+    images = prepare_images(images, config.get("image_max_side", 1536), config.get("image_quality", 80))
+    has_images = bool(images)
     
     # Wenn Bilder dabei sind, erzwingen wir ein Vision-fähiges Modell
     if has_images and "gpt-4" not in model:
         model = "gpt-4o-mini"
 
+    # 3. Antwort-Cache: gleicher Prompt + gleiche (aufbereitete) Bildbytes + Modell + Prompt-Version -> kein Request
+    cache = get_llm_cache(config.get("llm_cache_mb", 50))
+    cache_key = llm_cache_key(PROMPT_VERSION, model, prompt_text, [raw for _, raw in images])
+    cached = cache.get(cache_key)
+    if cached is not None:
+        count("llm.cache_hits")
+        return _llm_content_to_prop(cached)
+
+    for mime_type, raw in images:
+        content_payload.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{mime_type};base64,{base64.b64encode(raw).decode('utf-8')}"
+            }
+        })
+
     data = {
         "model": model,
         "messages": [{"role": "user", "content": content_payload}],
         "temperature": 0.0
     }
 
+    count("llm.requests")
+    count("llm.images", len(images))
+    headers = {"Authorization": f"Bearer {api_key}"}
     try:
-        req = urllib.request.Request(
-            "https://api.openai.com/v1/chat/completions",
-            data=json.dumps(data).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}"
-            }
-        )
-        with urllib.request.urlopen(req) as response:
-            res = json.load(response)
-            content = res["choices"][0]["message"]["content"]
-            try:
-                content = content.replace("```json", "").replace("```", "").strip()
-                js = json.loads(content)
-            except json.JSONDecodeError:
-                return None, ["AI-Antwort war kein valides JSON"]
-
-            prop = {
-                "Frage": js.get("Frage", ""),
-                "Kopfzeile": "",
-                "Eigene Notizen": "",
-                "Antwort": js.get("Antwort", "")
-            }
-            opts = ["Antwort A", "Antwort B", "Antwort C", "Antwort D", "Antwort E"]
-            correct_letter = (js.get("Correct") or "").upper().strip()
-            raw_opts = [js.get(k, "") for k in opts]
-            
-            if correct_letter in "ABCDE" and len(correct_letter) == 1:
-                idx = "ABCDE".index(correct_letter)
-                correct_text = raw_opts[idx]
-                raw_opts.pop(idx)
-                raw_opts.insert(0, correct_text)
+        with timed("llm.request"):
+            if on_fields is not None and config.get("llm_stream", True):
+                content, usage = _stream_llm(get_client(config), data, headers, token, on_fields)
             else:
-                return None, ["AI konnte keine Lösung identifizieren"]
-
-            for i, k in enumerate(opts):
-                prop[k] = raw_opts[i] if i < len(raw_opts) else ""
+                res = get_client(config).post_json("/chat/completions", data, headers=headers, token=token)
+                content, usage = res["choices"][0]["message"]["content"], res.get("usage")
+    except Cancelled:
+        count("llm.cancelled")
+        return None, ["AI Request abgebrochen"]
+    except Exception as e:
+        count("llm.errors")
+        return None, [f"AI Request Error: {str(e)}"]
+    usage = usage or {}
+    count("llm.prompt_tokens", usage.get("prompt_tokens", 0))
+    count("llm.completion_tokens", usage.get("completion_tokens", 0))
 
-            return prop, []
+    prop, warnings = _llm_content_to_prop(content)
+    if prop:
+        cache.put(cache_key, content)
+    return prop, warnings
 
-    except Exception as e:
-        return None, [f"AI Request Error: {str(e)}"]
\ No newline at end of file
+def _stream_llm(client, data: dict, headers: dict, token, on_fields) -> tuple[str, dict]:
+    """Chat-Completion als SSE-Stream; meldet fertige JSON-Felder an on_fields. -> (Inhalt, usage)."""
+    payload = dict(data, stream=True, stream_options={"include_usage": True})
+    parts, usage = [], None
+    fields = JsonFieldStream()
+    t0 = time.perf_counter()
+    first = True
+    for event in client.stream_sse("/chat/completions", payload, headers=headers, token=token):
+        chunk = json.loads(event)
+        usage = chunk.get("usage") or usage
+        for choice in chunk.get("choices") or ():
+            delta = (choice.get("delta") or {}).get("content")
+            if not delta:
+                continue
+            parts.append(delta)
+            if fields.feed(delta):
+                if first:
+                    STATS.observe("llm.first_field", time.perf_counter() - t0)
+                    first = False
+                on_fields(dict(fields.fields))
+    return "".join(parts), usage
@@ -0,0 +1,295 @@
+# pipeline.py — Hintergrund-Pipelines (Auto-Accept, AI-Fix-Batch); GUI bleibt bedienbar
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from aqt.qt import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QPushButton, Qt
+)
+from aqt.operations import CollectionOp
+
+from .bulk import BulkWriter
+from .config import TAG_BATCH_DUP
+from .dupindex import BatchDeduper
+from .parsing import parse_with_llm, llm_partial_prop
+from .http_client import CancelToken
+
+CHUNK_SIZE = 200
+
+
+def _fmt_eta(seconds: float) -> str:
+    if seconds is None or seconds != seconds or seconds == float("inf"):
+        return "–"
+    seconds = int(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d} min" if seconds >= 60 else f"{seconds} s"
+
+
+class PipelineProgress(QDialog):
+    """Fortschritt mit Durchsatz/ETA und Abbrechen-Knopf; blockiert Anki nicht."""
+
+    def __init__(self, parent, title: str, total: int):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setWindowModality(Qt.WindowModal)
+        self.cancelled = False
+        self.on_cancel = None  # z. B. CancelToken.cancel -> laufende Requests sofort abbrechen
+
+        layout = QVBoxLayout(self)
+        self.label = QLabel("Starte…", self)
+        layout.addWidget(self.label)
+        self.bar = QProgressBar(self)
+        self.bar.setRange(0, max(total, 1))
+        layout.addWidget(self.bar)
+        self.stats = QLabel("", self)
+        layout.addWidget(self.stats)
+
+        btns = QHBoxLayout()
+        btns.addStretch()
+        self.btnCancel = QPushButton("Abbrechen", self)
+        self.btnCancel.clicked.connect(self.reject)
+        btns.addWidget(self.btnCancel)
+        layout.addLayout(btns)
+
+    def reject(self):
+        # Schließen = Abbrechen anfordern; der laufende Chunk wird noch fertig ausgewertet
+        self.cancelled = True
+        self.btnCancel.setEnabled(False)
+        self.label.setText("Wird abgebrochen…")
+        if self.on_cancel is not None:
+            self.on_cancel()
+
+    def update_stats(self, checked: int, total: int, accepted: int, rate: float, eta: float, verb: str = "übernommen"):
+        self.bar.setValue(checked)
+        if not self.cancelled:
+            self.label.setText(f"Geprüft {checked}/{total} · {verb} {accepted}")
+        self.stats.setText(f"{rate:.1f} Notizen/s · Rest ca. {_fmt_eta(eta)}")
+
+
+class AutoAcceptPipeline:
+    """
+    Verarbeitet `nids` in Chunks:
+      - evaluate(chunk) -> [(nid, prop), ...] läuft im Hintergrund (mw.taskman)
+      - Dubletten innerhalb der Auswahl (BatchDeduper, über alle Chunks) werden nur einmal
+        angelegt, die übrigen Quellen mit TAG_BATCH_DUP zur Prüfung markiert
+      - zwischen den Chunks wird Abbrechen geprüft; bis dahin wird nichts geschrieben
+      - am Ende schreibt BulkWriter alle sicheren Vorschläge in EINER CollectionOp; nur diese
+        Schreibvorgänge bilden den Undo-Schritt, Bearbeitungen während der Auswertung bleiben eigene
+    on_finished(summary) bekommt checked/total/accepted/duplicates/seconds/cancelled.
+    """
+
+    def __init__(self, mw, parent, nids, evaluate, model, header, on_finished):
+        self.mw = mw
+        self.parent = parent
+        self.nids = list(nids)
+        self.evaluate = evaluate
+        self.model = model
+        self.header = header
+        self.on_finished = on_finished
+        self.checked = 0
+        self.duplicates = 0
+        self.error = None
+        self._accepted = []   # [(nid, prop)] über alle Chunks, geschrieben erst in _finish
+        self._dup_nids = []
+        self._dedupe = BatchDeduper()
+        self._started = 0.0
+        self._progress = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._progress = PipelineProgress(self.parent, "MC-Mapper – Auto-Accept", len(self.nids))
+        self._progress.show()
+        self._next_chunk()
+
+    def _next_chunk(self):
+        if self._progress.cancelled or self.checked >= len(self.nids):
+            self._finish()
+            return
+        chunk = self.nids[self.checked:self.checked + CHUNK_SIZE]
+        # Chunks laufen nacheinander -> der Deduper braucht keinen Lock
+        self.mw.taskman.run_in_background(lambda: self._dedupe.split(self.evaluate(chunk)), self._chunk_done)
+
+    def _chunk_done(self, fut):
+        try:
+            accepted, dups = fut.result()
+        except Exception as e:
+            self.error = e
+            self._finish()
+            return
+        if self._progress.cancelled:
+            self._finish()
+            return
+
+        self._accepted.extend(accepted)
+        self._dup_nids.extend(nid for nid, _ in dups)
+        self.duplicates += len(dups)
+        self.checked += min(CHUNK_SIZE, len(self.nids) - self.checked)
+
+        elapsed = time.perf_counter() - self._started
+        rate = self.checked / elapsed if elapsed > 0 else 0.0
+        eta = (len(self.nids) - self.checked) / rate if rate > 0 else float("inf")
+        self._progress.update_stats(self.checked, len(self.nids), len(self._accepted), rate, eta, verb="sicher")
+        self._next_chunk()
+
+    def _write(self, col):
+        writer = BulkWriter(col, self.model, self.header)
+        writer.write(self._accepted)
+        writer.tag(self._dup_nids, TAG_BATCH_DUP)
+        return writer.finish()
+
+    def _finish(self):
+        progress, self._progress = self._progress, None
+        progress.label.setText("Schreibe…")
+        summary = {
+            "checked": self.checked,
+            "total": len(self.nids),
+            "duplicates": self.duplicates,
+            "cancelled": progress.cancelled,
+            "error": self.error,
+        }
+
+        def on_done(result):
+            progress.accept()
+            summary["accepted"] = result.count
+            summary["seconds"] = time.perf_counter() - self._started
+            summary["rate"] = summary["checked"] / summary["seconds"] if summary["seconds"] > 0 else 0.0
+            self.on_finished(summary)
+
+        # Auch nach Abbruch/Fehler: bereits ausgewertete Chunks werden geschrieben.
+        # Als CollectionOp, damit Anki die Änderungen mitbekommt und keine anderen Schreibzugriffe dazwischenkommen
+        CollectionOp(self.parent, self._write).success(on_done).run_in_background()
+
+
+class AiBatchFix:
+    """
+    AI-Fix für viele Notizen: jobs = [(nid, llm_text), ...] gehen parallel an parse_with_llm
+    (ThreadPool mit `workers` Threads). Die Gesamtzeit skaliert so mit der API-Parallelität
+    statt mit der Einzel-Latenz.
+      - on_result(nid, prop, warnings) kommt pro erfolgreichem Vorschlag im GUI-Thread an
+      - on_finished(summary) mit done/total/ok/failed/cancelled/seconds
+    """
+
+    def __init__(self, mw, parent, jobs, workers, on_result, on_finished):
+        self.mw = mw
+        self.parent = parent
+        self.jobs = list(jobs)
+        self.workers = max(1, int(workers))
+        self.on_result = on_result
+        self.on_finished = on_finished
+        self.done = 0
+        self.ok = 0
+        self.token = CancelToken()
+        self._started = 0.0
+        self._progress = None
+
+    def start(self):
+        # Config/Medienordner im GUI-Thread lesen; die Worker fassen mw nicht an
+        config = self.mw.addonManager.getConfig(__name__) or {}
+        media_dir = self.mw.col.media.dir()
+        self._started = time.perf_counter()
+        self._progress = PipelineProgress(self.parent, "MC-Mapper – AI-Fix (alle markierten)", len(self.jobs))
+        self._progress.on_cancel = self.token.cancel
+        self._progress.show()
+        self.mw.taskman.run_in_background(lambda: self._run(config, media_dir), self._finish)
+
+    def _run(self, config, media_dir):
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futs = {pool.submit(parse_with_llm, text, config, media_dir, self.token): nid for nid, text in self.jobs}
+            for fut in as_completed(futs):
+                if self._progress.cancelled:
+                    break
+                try:
+                    prop, warnings = fut.result()
+                except Exception as e:
+                    prop, warnings = None, [f"AI Request Error: {e}"]
+                self.mw.taskman.run_on_main(lambda nid=futs[fut], p=prop, w=warnings: self._report(nid, p, w))
+        finally:
+            # Abbrechen: nicht gestartete Requests verwerfen; laufende beendet das CancelToken
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _report(self, nid, prop, warnings):
+        self.done += 1
+        if prop:
+            self.ok += 1
+            self.on_result(nid, prop, warnings)
+        if self._progress is None:
+            return
+        elapsed = time.perf_counter() - self._started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (len(self.jobs) - self.done) / rate if rate > 0 else float("inf")
+        self._progress.update_stats(self.done, len(self.jobs), self.ok, rate, eta, verb="Vorschläge")
+
+    def _finish(self, fut):
+        progress, self._progress = self._progress, None
+        error = None
+        try:
+            fut.result()
+        except Exception as e:
+            error = e
+        progress.accept()
+        self.on_finished({
+            "done": self.done,
+            "total": len(self.jobs),
+            "ok": self.ok,
+            "failed": self.done - self.ok,
+            "cancelled": progress.cancelled,
+            "error": error,
+            "seconds": time.perf_counter() - self._started,
+        })
+
+
+class AiSingleFix:
+    """
+    Einzelner AI-Fix im Hintergrund; der Dialog bleibt bedienbar und der Request abbrechbar.
+    Mit on_partial wird gestreamt: jedes fertige Feld kommt sofort als Zwischenstand
+    on_partial(prop, ready) im GUI-Thread an (ready = Lösung bekannt), der Fortschrittsdialog
+    schließt sich beim ersten Feld.
+    """
+
+    def __init__(self, mw, parent, text, on_finished, on_partial=None):
+        self.mw = mw
+        self.parent = parent
+        self.text = text
+        self.on_finished = on_finished  # on_finished(prop, warnings, cancelled)
+        self.on_partial = on_partial
+        self.token = CancelToken()
+        self._progress = None
+        self._finished = False
+
+    def start(self):
+        config = self.mw.addonManager.getConfig(__name__) or {}
+        media_dir = self.mw.col.media.dir()
+        self._progress = PipelineProgress(self.parent, "MC-Mapper – AI-Fix", 0)
+        self._progress.bar.setRange(0, 0)  # unbestimmt
+        self._progress.label.setText("Warte auf OpenAI…")
+        self._progress.on_cancel = self.token.cancel
+        self._progress.show()
+        on_fields = self._on_fields if self.on_partial is not None else None
+        self.mw.taskman.run_in_background(
+            lambda: parse_with_llm(self.text, config, media_dir, self.token, on_fields), self._finish
+        )
+
+    def cancel(self):
+        self.token.cancel()
+
+    def _on_fields(self, fields: dict):
+        # Worker-Thread: Zwischenstand berechnen, Anzeige im GUI-Thread
+        prop, ready = llm_partial_prop(fields)
+        self.mw.taskman.run_on_main(lambda: self._partial(prop, ready))
+
+    def _partial(self, prop: dict, ready: bool):
+        if self._finished or self.token.cancelled:
+            return
+        if self._progress is not None:
+            progress, self._progress = self._progress, None
+            progress.accept()
+        self.on_partial(prop, ready)
+
+    def _finish(self, fut):
+        self._finished = True
+        progress, self._progress = self._progress, None
+        if progress is not None:
+            progress.accept()
+        try:
+            prop, warnings = fut.result()
+        except Exception as e:
+            prop, warnings = None, [f"AI Request Error: {e}"]
+        self.on_finished(prop, warnings, self.token.cancelled)
@@ -0,0 +1,56 @@
+# prefetch.py — Vorausberechnung der Nachbarkarten im Review-Dialog (Hintergrund-Thread)
+
+
+class Prefetcher:
+    """
+    Bereitet die Karten um die aktuelle Position herum vor, während der Nutzer liest.
+    - prepare(nid) -> dict läuft im Hintergrund (mw.taskman), immer nur eine Karte zur Zeit
+    - schedule(ids) setzt die Wunschliste (Reihenfolge = Priorität) und verwirft den Rest
+    - take(nid) holt ein fertiges Ergebnis ab (oder None -> synchron laden)
+    """
+
+    def __init__(self, mw, prepare):
+        self.mw = mw
+        self.prepare = prepare
+        self._ready = {}
+        self._queue = []
+        self._wanted = set()
+        self._running = False
+        self._epoch = 0  # discard()/clear() während eines laufenden prepare -> Ergebnis verwerfen
+
+    def schedule(self, ids):
+        self._wanted = set(ids)
+        self._ready = {nid: entry for nid, entry in self._ready.items() if nid in self._wanted}
+        self._queue = [nid for nid in ids if nid not in self._ready]
+        self._kick()
+
+    def take(self, nid):
+        return self._ready.get(nid)
+
+    def discard(self, nid):
+        self._ready.pop(nid, None)
+        self._epoch += 1
+
+    def clear(self):
+        self._epoch += 1
+        self._ready.clear()
+        self._queue = []
+        self._wanted = set()
+
+    def _kick(self):
+        if self._running or not self._queue:
+            return
+        nid = self._queue.pop(0)
+        self._running = True
+        epoch = self._epoch
+        self.mw.taskman.run_in_background(lambda: self.prepare(nid), lambda fut: self._done(nid, epoch, fut))
+
+    def _done(self, nid, epoch, fut):
+        self._running = False
+        try:
+            entry = fut.result()
+        except Exception:
+            entry = None
+        if entry is not None and nid in self._wanted and epoch == self._epoch:
+            self._ready[nid] = entry
+        self._kick()
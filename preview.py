@@ -0,0 +1,75 @@
+# preview.py — Teil-Updates der Vorschlags-Vorschau: nur die Werte geänderter Zeilen im QTextDocument ersetzen
+from aqt.qt import QTextCursor
+
+from .render import PROP_FIELDS, value_fragment
+from .stats import timed
+
+
+class PreviewPatcher:
+    """
+    Hält pro Feld einen Cursor über dem Wert der Zeile im Dokument von render_prop_html().
+    Cursor im selben Dokument verschieben sich bei Änderungen davor mit, daher nur einmal pro
+    setHtml() suchen; nach jedem setHtml() reset() aufrufen.
+    """
+
+    def __init__(self, document):
+        self.document = document          # QTextDocument der Vorschau (newView.document())
+        self._cursors = None              # Feld -> QTextCursor über dem Wert
+
+    def reset(self):
+        self._cursors = None
+
+    def patch(self, prop: dict, fields) -> bool:
+        """Ersetzt nur die Werte der geänderten Zeilen; False -> komplett neu rendern."""
+        cursors = self.row_cursors()
+        if cursors is None:
+            return False
+        doc = self.document
+        blocks = doc.blockCount()
+        with timed("ui.patch_preview"):
+            for field in fields:
+                cur = cursors.get(field)
+                if cur is None:
+                    continue
+                start = cur.selectionStart()
+                cur.removeSelectedText()
+                html = value_fragment(field, prop.get(field, ""))
+                if html:
+                    cur.insertHtml(html)
+                end = cur.position()
+                cur.setPosition(start)
+                cur.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        # Wert mit eigenen Blöcken (z. B. getipptes <p>) -> Zeilengrenzen stimmen nicht mehr
+        return doc.blockCount() == blocks
+
+    def row_cursors(self):
+        """
+        Feld -> Cursor, dessen Auswahl genau den Wert der Zeile umfasst („Label: Wert“, ein Block pro
+        Zeile). None, wenn das Dokument nicht so aussieht (dann komplett rendern).
+        """
+        if self._cursors is not None:
+            return self._cursors
+        doc = self.document
+        cursors, k = {}, 0
+        block = doc.begin()
+        while block.isValid():
+            text = block.text()
+            label = PROP_FIELDS[k] + ":" if k < len(PROP_FIELDS) else None
+            if label and (text == label or text.startswith(label + " ")):
+                cur = QTextCursor(doc)
+                if text == label:
+                    # Qt schluckt das Leerzeichen vor einem leeren Wert am Blockende
+                    cur.setPosition(block.position() + len(label))
+                    cur.insertText(" ")
+                start = block.position() + len(label) + 1
+                cur.setPosition(start)
+                cur.setPosition(block.position() + block.length() - 1, QTextCursor.MoveMode.KeepAnchor)
+                cursors[PROP_FIELDS[k]] = cur
+                k += 1
+            elif text.strip():
+                return None
+            block = block.next()
+        if k < len(PROP_FIELDS):
+            return None
+        self._cursors = cursors
+        return cursors
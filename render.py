@@ -0,0 +1,120 @@
+# render.py — HTML für die Review-Ansichten: gemeinsame Stylesheets und begrenzter Render-Cache
+import re
+import threading
+from collections import OrderedDict
+
+from .util import html_preview
+from .stats import stage, count
+
+# Als defaultStyleSheet der QTextBrowser gesetzt -> steht nicht mehr in jedem gerenderten HTML
+PROP_CSS = """
+  .wrap { font-family: Segoe UI, Arial; font-size:12px; line-height:1.35; }
+  .card { border: 1px solid rgba(255,255,255,0.12); border-radius: 8px; padding: 10px; }
+  .row  { margin: 4px 0 6px; }
+  .lab  { font-weight:700; display:inline-block; min-width:110px; }
+  .val  { display:inline; }
+  .sep  { margin: 8px 0; border-top: 1px dashed rgba(255,255,255,0.15); }
+  img   { max-width:100%; height:auto; display:block; margin:6px 0; }
+  .row.question-label .lab { color: rgb(0, 150, 255); }
+  .row.opt-right { background: rgba(40, 167, 69, 0.12); border-left: 3px solid rgba(40, 167, 69, 0.6); border-radius: 4px; padding-left: 8px; }
+  .row.opt-right .lab { color: #2aa158; }
+  .row.opt-wrong .lab { color: #a0a0a0; }
+  .v-right { color: #2aa158; }
+  .v-wrong { color: #bcbcbc; }
+"""
+
+OPTION_FIELDS = ("Antwort A", "Antwort B", "Antwort C", "Antwort D", "Antwort E")
+PROP_FIELDS = ("Frage",) + OPTION_FIELDS + ("Kopfzeile", "Eigene Notizen", "Antwort")
+CORRECT_KEY = "Antwort A"
+RENDER_CACHE_SIZE = 256  # Einträge (ALT- und Vorschlags-HTML zusammen)
+
+
+def inline_html(s: str) -> str:
+    if not s:
+        return ""
+    s = s.replace("\r\n","\n").replace("\r","\n")
+    s = re.sub(r"\n{2,}", "\n", s)
+    return s.replace("\n","<br>")
+
+
+def _row_class(field: str) -> str | None:
+    if field == "Frage":
+        return "question-label"
+    if field in OPTION_FIELDS:
+        return "opt-right" if field == CORRECT_KEY else "opt-wrong"
+    return None
+
+
+def value_html(field: str, value: str) -> str:
+    """Wert einer Zeile; Farbe hängt am Wert selbst, damit value_fragment() sie ohne Zeile behält."""
+    cls = {"opt-right": "val v-right", "opt-wrong": "val v-wrong"}.get(_row_class(field), "val")
+    return f"<span class='{cls}'>{inline_html(value)}</span>"
+
+
+def value_fragment(field: str, value: str) -> str:
+    """Nur der Wert als HTML-Fragment für ein Teil-Update im QTextDocument (leer -> "")."""
+    return f"<span class='wrap'>{value_html(field, value)}</span>" if value else ""
+
+
+def _row(field: str, value: str) -> str:
+    cls = _row_class(field)
+    cls = f"row {cls}" if cls else "row"
+    return f"<div class='{cls}'><span class='lab'>{field}:</span> {value_html(field, value)}</div>"
+
+
+@stage("render.prop_html")
+def render_prop_html(prop: dict) -> str:
+    """Rechte Seite (Vorschlag), eine Zeile pro Feld in PROP_FIELDS-Reihenfolge; Stylesheet: PROP_CSS."""
+    rows = [_row("Frage", prop.get("Frage", "")), "<div class='sep'></div>"]
+    rows += [_row(k, prop.get(k, "")) for k in OPTION_FIELDS]
+    rows.append("<div class='sep'></div>")
+    rows += [_row(k, prop.get(k, "")) for k in ("Kopfzeile", "Eigene Notizen", "Antwort")]
+    return "<div class='wrap'><div class='card'>" + "".join(rows) + "</div></div>"
+
+
+def prop_key(prop: dict) -> tuple:
+    """Cache-Key eines Vorschlags: genau die Werte, die render_prop_html liest."""
+    return tuple(prop.get(k) or "" for k in PROP_FIELDS)
+
+
+class RenderCache:
+    """
+    LRU über fertiges HTML beider Ansichten; thread-sicher (Prefetch rendert im Hintergrund).
+    - ALT-Ansicht: Key (nid, mod) -> geänderte Notiz = neuer Key, alter Eintrag fällt hinten raus
+    - Vorschlag: Key prop_key(prop) -> gleicher Inhalt wird nie zweimal gerendert
+    """
+
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE):
+        self.maxsize = max(1, int(maxsize))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+        count("render.cache_hit" if html is not None else "render.cache_miss")
+        return html
+
+    def _put(self, key, html: str) -> str:
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return html
+
+    def old_html(self, note, media_dir: str | None, ir=None) -> str:
+        key = ("old", note.id, note.mod)
+        html = self._get(key)
+        return html if html is not None else self._put(key, html_preview(note, media_dir, ir=ir, css=False))
+
+    def prop_html(self, prop: dict) -> str:
+        key = ("prop", prop_key(prop))
+        html = self._get(key)
+        return html if html is not None else self._put(key, render_prop_html(prop))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,34 +1,38 @@
 # review.py — konsistente, gut scannbare rechte Seite (Label inline), kompakte ALT-Ansicht
-import re
 from aqt.qt import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTextBrowser,
     QLabel, QLineEdit, QMessageBox, QWidget, QScrollArea,
     Qt, QCheckBox, QUrl, QTextOption, QComboBox, QToolButton,
-    QMenu, QWidgetAction, QShortcut, QKeySequence, QApplication
+    QMenu, QWidgetAction, QShortcut, QKeySequence, QPlainTextEdit, QFileDialog, QFontDatabase,
+    QTimer,
 )
 from aqt import mw
-from anki.notes import Note
 
 # Imports aus deinen Modulen
-from .config import TARGET_MODEL_NAME, FIELDS, TAG_NEW
-from .parsing import parse_note_to_proposal, parse_with_llm
-from .util import html_preview, normalize_combo_key, key_to_tag, find_similar_notes_fuzzy
-
-def _with_img_breaks_exact(html: str) -> str:
-    if not html:
-        return ""
-    def repl(m):
-        return "<br>" + m.group(1) + "<br>"
-    html = re.sub(r"(?is)(?:\s*(?:<br\s*/?>\s*)+)?(<img\b[^>]*>)(?:\s*(?:<br\s*/?>\s*)+)?", repl, html)
-    html = re.sub(r"(?is)(<br\s*/?>\s*){3,}", r"<br><br>", html)
-    return html
-
-def _inline_html(s: str) -> str:
-    if not s:
-        return ""
-    s = s.replace("\r\n","\n").replace("\r","\n")
-    s = re.sub(r"\n{2,}", "\n", s)
-    return s.replace("\n","<br>")
+from .config import TARGET_MODEL_NAME, FIELDS, TAG_NEW, TAG_BATCH_DUP
+from .parsing import NoteIR, PARSER_VERSION
+from .util import normalize_combo_key, key_to_tag, PREVIEW_CSS
+from .bulk import build_note
+from .pipeline import AutoAcceptPipeline, AiBatchFix, AiSingleFix
+from .dupindex import get_fuzzy_index, get_key_index, save_all
+from .noteinfo import NoteInfoStore, TIER_FUZZY
+from .cache import get_proposal_cache, flush_all, get_llm_cache
+from .prefetch import Prefetcher
+from .parallel import get_parse_pool, shutdown_pool
+from .stats import STATS, stage, timed
+from .overview import OverviewModel, build_overview_view
+from .notedata import iter_note_rows, field_names
+from .render import RenderCache, PROP_CSS, PROP_FIELDS, RENDER_CACHE_SIZE
+from .preview import PreviewPatcher
+
+PREVIEW_DEBOUNCE_MS = 150  # Tippen im Bearbeiten-Panel: so lange sammeln, dann Vorschau aktualisieren
+
+def _llm_input(items) -> str:
+    """items: (Feldname, Wert) wie Note.items() / NoteRow.items()."""
+    raw_text = ""
+    for f, value in items:
+        raw_text += f"{f}: {value}\n"
+    return raw_text
 
 class TargetModelDialog(QDialog):
     def __init__(self, parent, models, default_idx, initial_header=""):
@@ -62,6 +66,62 @@ class TargetModelDialog(QDialog):
     def get_selection(self):
         return self.combo.currentIndex(), self.headerEdit.text()
 
+class StatsDialog(QDialog):
+    """Zeiten/Zähler der Sitzung (stats.STATS), JSON-Export und cProfile-Schalter."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowTitle("MC-Mapper – Statistik")
+        self.resize(760, 520)
+
+        layout = QVBoxLayout(self)
+        self.text = QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        layout.addWidget(self.text)
+
+        self.chkProfile = QCheckBox("cProfile aufzeichnen (nur GUI-Thread)", self)
+        self.chkProfile.setChecked(STATS.profiling)
+        self.chkProfile.toggled.connect(self._toggle_profile)
+        layout.addWidget(self.chkProfile)
+
+        btns = QHBoxLayout()
+        for label, slot in (("Aktualisieren", self.refresh), ("Zurücksetzen", self._reset),
+                            ("Als JSON exportieren…", self._export)):
+            btn = QPushButton(label, self)
+            btn.clicked.connect(slot)
+            btns.addWidget(btn)
+        btns.addStretch()
+        close = QPushButton("Schließen", self)
+        close.clicked.connect(self.accept)
+        btns.addWidget(close)
+        layout.addLayout(btns)
+        self.refresh()
+
+    def refresh(self):
+        self.text.setPlainText(STATS.report_text())
+
+    def _reset(self):
+        STATS.reset()
+        self.refresh()
+
+    def _toggle_profile(self, on: bool):
+        if on:
+            STATS.start_profile()
+        else:
+            STATS.stop_profile()
+        self.refresh()
+
+    def _export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Statistik exportieren", "mc_mapper_stats.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            STATS.export_json(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Export", f"Konnte nicht schreiben: {e}")
+
 class Review(QDialog):
     def __init__(self, mw, note_ids):
         super().__init__(mw)
@@ -75,8 +135,18 @@ class Review(QDialog):
         self._manual_override = False
         self._setting_fields = False
         self.field_editors = {}
+        self._preview_dirty = set()                  # Felder, deren Vorschau-Zeile noch aussteht
+        self._preview_is_prop = False                # newView zeigt gerade render_prop_html
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self._preview_timer.timeout.connect(self._flush_preview_edits)
         self.fixed_header = ""
-        self._info_cache = {}
+        self._ai_results = {}                        # nid -> (prop, warnings) aus "AI-Fix alle" (Prüf-Queue)
+        self._prefetcher = Prefetcher(mw, self._prepare_card)
+        self._ai_fix = None                          # (nid, AiSingleFix) solange ein einzelner AI-Fix läuft
+        self._ai_touched = set()                     # Felder, die der Nutzer während des laufenden AI-Fix bearbeitet hat
+        self._render = RenderCache((mw.addonManager.getConfig(__name__) or {}).get("render_cache_size", RENDER_CACHE_SIZE))
         self.setWindowTitle("MC-Mapper – Review")
 
         self.oldView = QTextBrowser()
@@ -85,6 +155,11 @@ class Review(QDialog):
             v.setWordWrapMode(QTextOption.WrapAtWordBoundaryOrAnywhere)
             v.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.newView.document().setBaseUrl(QUrl.fromLocalFile(self.mw.col.media.dir() + "/"))
+        # CSS einmal pro Ansicht statt in jedem setHtml()
+        self.oldView.document().setDefaultStyleSheet(PREVIEW_CSS)
+        self.newView.document().setDefaultStyleSheet(PROP_CSS)
+        self._patcher = PreviewPatcher(self.newView.document())
+        self.newView.document().setUndoRedoEnabled(False)  # Teil-Updates per Cursor sollen keinen Undo-Stack aufbauen
 
         self.info = QLabel("")
 
@@ -99,9 +174,18 @@ class Review(QDialog):
         self.btnAi = QPushButton("✨ AI-Fix")
         self.btnAi.setToolTip("Versucht, die Frage mit OpenAI zu parsen (Key in Add-on Konfiguration nötig)")
         
+        self.btnAiAll = QPushButton("✨ AI-Fix alle")
+        self.btnAiAll.setToolTip("Schickt alle Karten mit Warnungen im aktuellen Filter parallel an OpenAI und sammelt die Vorschläge zur Prüfung")
+        
         self.btnAuto = QPushButton("🚀 Auto-Sicher")
         self.btnAuto.setToolTip("Übernimmt alle Karten, bei denen sich der Parser 100% sicher ist (Turbo-Modus)")
 
+        self.btnOverview = QPushButton("☰ Übersicht")
+        self.btnOverview.setToolTip("Tabelle aller Karten im Filter mit Status; sortierbar, Klick springt zur Karte")
+
+        self.btnStats = QPushButton("📊 Statistik")
+        self.btnStats.setToolTip("Zeiten pro Stufe, LLM-Requests/Tokens/Bytes; Export als JSON, optional cProfile")
+
         # Connections
         self.btnPrev.clicked.connect(self.prev)
         self.btnNext.clicked.connect(self.next)
@@ -110,7 +194,10 @@ class Review(QDialog):
         self.btnApply.clicked.connect(self.apply_current)
         self.btnEdit.clicked.connect(self.toggle_edit_panel)
         self.btnAi.clicked.connect(self.on_ai_repair)
+        self.btnAiAll.clicked.connect(self.on_ai_fix_all)
         self.btnAuto.clicked.connect(self.on_auto_accept)
+        self.btnStats.clicked.connect(lambda: StatsDialog(self).exec())
+        self.btnOverview.clicked.connect(self.toggle_overview)
 
         self.filterButton = QToolButton(self)
         self.filterButton.setText("Filter")
@@ -136,6 +223,11 @@ class Review(QDialog):
                 "Zeigt nur Karten, bei denen keine oder keine eindeutige richtige Antwort erkannt wurde.",
                 "chkNoCorrect",
             ),
+            (
+                "Nur Karten mit AI-Vorschlag",
+                "Zeigt nur Karten, für die „AI-Fix alle“ einen Vorschlag erzeugt hat (Prüf-Queue).",
+                "chkAiQueue",
+            ),
         ]
 
         self._filter_checks = []
@@ -153,23 +245,32 @@ class Review(QDialog):
         self.filterMenu.addAction(filtersAction)
 
         top = QHBoxLayout()
+        # Übersicht: Tabelle kommt nach der Ziel-Auswahl dazu (braucht NoteInfoStore)
+        self.overviewPanel = QWidget(self); self.overviewPanel.setVisible(False)
+        self.overviewLayout = QVBoxLayout(self.overviewPanel); self.overviewLayout.setContentsMargins(0, 0, 0, 0)
+        self.overviewModel = None
+        self._syncing_overview = False
+        top.addWidget(self.overviewPanel, 2)
         left = QVBoxLayout();  left.addWidget(QLabel("ALT"));           left.addWidget(self.oldView)
         right = QVBoxLayout(); self.newLabel = QLabel("NEU (Vorschlag)"); right.addWidget(self.newLabel); right.addWidget(self.newView)
         self.editPanel = self._build_edit_panel(); right.addWidget(self.editPanel)
-        top.addLayout(left); top.addLayout(right)
+        top.addLayout(left, 3); top.addLayout(right, 3)
 
         nav = QHBoxLayout()
         nav.addWidget(self.btnPrev); nav.addWidget(self.btnNext); nav.addSpacing(12)
         nav.addWidget(QLabel("Position:")); self.posLbl = QLabel(""); nav.addWidget(self.posLbl)
         nav.addSpacing(12); nav.addWidget(self.jumpEdit); nav.addWidget(self.btnJump)
         nav.addStretch()
+        nav.addWidget(self.btnOverview)
         nav.addWidget(self.filterButton)
         nav.addSpacing(12)
         nav.addWidget(self.info)
 
         actions = QHBoxLayout()
         actions.addWidget(self.btnAuto)
+        actions.addWidget(self.btnStats)
         actions.addStretch()
+        actions.addWidget(self.btnAiAll)
         actions.addWidget(self.btnAi)
         actions.addWidget(self.btnEdit)
         actions.addWidget(self.btnApply)
@@ -181,6 +282,25 @@ class Review(QDialog):
             self.reject(); return
         self.newLabel.setText(f"NEU ({self.model['name']})")
         self.setWindowTitle(f"MC-Mapper – Review ({self.model['name']})")
+
+        # Dublettenindizes einmalig aufbauen bzw. mit der Collection abgleichen
+        self.mw.progress.start(immediate=True, label="Dublettenindex wird abgeglichen…")
+        try:
+            get_fuzzy_index(self.mw.col, self.model, refresh=True)
+            get_key_index(self.mw.col, self.model, refresh=True)
+        finally:
+            self.mw.progress.finish()
+        self.notes = NoteInfoStore(
+            self.mw.col, self.model, mw.addonManager.getConfig(__name__) or {},
+            get_proposal_cache(self.mw.col, PARSER_VERSION),
+        )
+        self.notes.on_forget = self._prefetcher.discard
+        self.notes.parse_pool = get_parse_pool((mw.addonManager.getConfig(__name__) or {}).get("parse_workers", 0))
+
+        self.overviewModel = OverviewModel(self.notes, self._ai_results, self, self.mw.taskman.run_in_background)
+        self.overviewView = build_overview_view(self.overviewModel, self.overviewPanel)
+        self.overviewView.selectionModel().currentRowChanged.connect(self._overview_row_changed)
+        self.overviewLayout.addWidget(self.overviewView)
         
         # Shortcuts
         QShortcut(QKeySequence("Ctrl+Return"), self).activated.connect(self.apply_current)
@@ -249,11 +369,12 @@ class Review(QDialog):
     def toggle_edit_panel(self):
         self._set_edit_panel_visible(not self.editPanel.isVisible())
 
-    def _sync_edit_fields(self):
+    def _sync_edit_fields(self, skip=()):
         self._setting_fields = True
         try:
             for field, editor in self.field_editors.items():
-                editor.setText(self.prop.get(field, ""))
+                if field not in skip:
+                    editor.setText(self.prop.get(field, ""))
         finally:
             self._setting_fields = False
 
@@ -264,16 +385,37 @@ class Review(QDialog):
             self.prop = {f: "" for f in FIELDS}
         self.prop[field] = text
         self._manual_override = True
-        self._update_preview()
-
-    def _update_preview(self):
+        if self._ai_fix is not None:
+            self._ai_touched.add(field)  # Streaming überschreibt dieses Feld nicht mehr
+        # Nicht pro Tastendruck rendern: Felder sammeln, nach PREVIEW_DEBOUNCE_MS nur deren Zeilen ersetzen
+        self._preview_dirty.add(field)
+        self._preview_timer.start()
+
+    def _flush_preview_edits(self):
+        fields, self._preview_dirty = self._preview_dirty, set()
+        if fields and not self._patch_preview(fields):
+            self._update_preview()
+
+    def _patch_preview(self, fields) -> bool:
+        """Ersetzt nur die Werte der geänderten Zeilen im Dokument; False -> komplett neu rendern."""
+        return self._preview_is_prop and self._patcher.patch(self.prop, fields)
+
+    def _set_preview_html(self, html: str, is_prop: bool = False):
+        """Ganzes Dokument ersetzen; ausstehende Teil-Updates und Zeilen-Cursor sind damit hinfällig."""
+        self._preview_timer.stop()
+        self._preview_dirty.clear()
+        self._patcher.reset()
+        self._preview_is_prop = is_prop
+        with timed("ui.setHtml"):
+            self.newView.setHtml(html)
+
+    def _update_preview(self, html: str | None = None):
         if not self.prop:
-            self.newView.setHtml("")
-            return
-        if not self._prop_generated and not self._manual_override:
-            self.newView.setHtml("<i>Kein sicherer Vorschlag – bitte Bearbeiten…</i>")
+            self._set_preview_html("")
+        elif not self._prop_generated and not self._manual_override:
+            self._set_preview_html("<i>Kein sicherer Vorschlag – bitte Bearbeiten…</i>")
         else:
-            self.newView.setHtml(self._render_prop_html(self.prop))
+            self._set_preview_html(html if html is not None else self._render.prop_html(self.prop), is_prop=True)
 
     def _filters_changed(self, *_args):
         self._update_filter_button_text()
@@ -283,70 +425,13 @@ class Review(QDialog):
         active = sum(1 for chk in getattr(self, "_filter_checks", []) if chk.isChecked())
         self.filterButton.setText(f"Filter ({active})" if active else "Filter")
 
-    def _render_prop_html(self, prop: dict) -> str:
-        css = """
-        <style>
-          .wrap { font-family: Segoe UI, Arial; font-size:12px; line-height:1.35; }
-          .card { border: 1px solid rgba(255,255,255,0.12); border-radius: 8px; padding: 10px; }
-          .row  { margin: 4px 0 6px; }
-          .lab  { font-weight:700; display:inline-block; min-width:110px; }
-          .val  { display:inline; }
-          .sep  { margin: 8px 0; border-top: 1px dashed rgba(255,255,255,0.15); }
-          img   { max-width:100%; height:auto; display:block; margin:6px 0; }
-          .row.question-label .lab { color: rgb(0, 150, 255); }
-          .row.opt-right { background: rgba(40, 167, 69, 0.12); border-left: 3px solid rgba(40, 167, 69, 0.6); border-radius: 4px; padding-left: 8px; }
-          .row.opt-right .lab, .row.opt-right .val { color: #2aa158; }
-          .row.opt-wrong .lab { color: #a0a0a0; }
-          .row.opt-wrong .val { color: #bcbcbc; }
-        </style>
-        """
-        rows = []
-        def add_row(label, value, row_class=None):
-            cls = "row"
-            if row_class:
-                cls += f" {row_class}"
-            rows.append(f"<div class='{cls}'><span class='lab'>{label}:</span> <span class='val'>{_inline_html(value)}</span></div>")
-
-        add_row("Frage",     prop.get("Frage",""), row_class="question-label")
-        rows.append("<div class='sep'></div>")
-        correct_key = "Antwort A"
-        for k in ["Antwort A","Antwort B","Antwort C","Antwort D","Antwort E"]:
-            cls = "opt-right" if k == correct_key else "opt-wrong"
-            add_row(k, prop.get(k,""), row_class=cls)
-        rows.append("<div class='sep'></div>")
-        add_row("Kopfzeile",      prop.get("Kopfzeile",""))
-        add_row("Eigene Notizen", prop.get("Eigene Notizen",""))
-        add_row("Antwort",        prop.get("Antwort",""))
-
-        return css + "<div class='wrap'><div class='card'>" + "".join(rows) + "</div></div>"
-
     def apply_all_filters(self):
-        filtered = []
-        config = mw.addonManager.getConfig(__name__) or {}
-        
-        for nid in self.all_note_ids:
-            note = self.mw.col.get_note(nid)
-            if note is None:
-                continue
-            tags = set(note.tags)
-            
-            if self.model:
-                try:
-                    if note.model().get("name") == self.model.get("name"):
-                        continue
-                except Exception:
-                    pass
-
-            if self.chkHideMigr.isChecked() and TAG_NEW in tags:
-                continue
-            
-            info = self._get_note_info(nid, note)
-
-            if self.chkNoCorrect.isChecked() and not info.get("no_correct"):
-                continue
-            
-            filtered.append(nid)
-        return filtered
+        return self.notes.filter_ids(
+            self.all_note_ids,
+            hide_migrated=self.chkHideMigr.isChecked(),
+            only=set(self._ai_results) if self.chkAiQueue.isChecked() else None,
+            no_correct_only=self.chkNoCorrect.isChecked(),
+        )
 
     def _apply_filter(self, reset_position: bool = True):
         self.note_ids = self.apply_all_filters()
@@ -355,60 +440,45 @@ class Review(QDialog):
         self._clamp()
         self.load()
 
-    def _build_note_info(self, nid: int, note, prop=None, warnings=None):
-        if prop is None or warnings is None:
-            prop, warnings = parse_note_to_proposal(note)
-        warnings = warnings or []
-        info = {
-            "prop": prop,
-            "warnings": warnings,
-            "has_warnings": bool(warnings),
-            "no_correct": any("Keine eindeutige richtige Antwort" in w for w in warnings),
-            "key_tag": None,
-            "has_duplicate": False,
-            "is_fuzzy_duplicate": False,
-        }
-        
-        config = mw.addonManager.getConfig(__name__) or {}
-        dup_thresh = config.get("duplicate_threshold", 0.85)
-
-        if prop:
-            combo_key = normalize_combo_key(prop)
-            key_tag = key_to_tag(combo_key)
-            info["key_tag"] = key_tag
-            
-            hits = self.mw.col.find_notes(f'tag:"{key_tag}"') if key_tag else []
-            
-            is_fuzzy = False
-            if not hits and prop.get("Frage"):
-                fuzzy_hits = find_similar_notes_fuzzy(self.mw.col, prop["Frage"], threshold=dup_thresh)
-                if fuzzy_hits:
-                    hits = [h[0] for h in fuzzy_hits]
-                    is_fuzzy = True
-
-            info["has_duplicate"] = any(hid != nid for hid in hits)
-            info["is_fuzzy_duplicate"] = is_fuzzy
-            
-        return info
-
-    def _get_note_info(self, nid: int, note=None):
-        cached = self._info_cache.get(nid)
-        if cached is not None:
-            return cached
-        if note is None:
-            try:
-                note = self.mw.col.get_note(nid)
-            except Exception:
-                return {"prop": None, "warnings": [], "has_warnings": False, "no_correct": False, "key_tag": None, "has_duplicate": False}
-        info = self._build_note_info(nid, note)
-        self._info_cache[nid] = info
-        return info
-
     def _clamp(self):
         self.i = max(0, min(self.i, len(self.note_ids)-1))
         self.btnPrev.setEnabled(self.i > 0); self.btnNext.setEnabled(self.i < len(self.note_ids)-1)
         total = len(self.note_ids); self.posLbl.setText(f"{(self.i+1) if total else 0}/{total}")
+        self._sync_overview()
+
+    # ---- Übersicht
+    def toggle_overview(self):
+        visible = not self.overviewPanel.isVisible()
+        self.overviewPanel.setVisible(visible)
+        self.btnOverview.setText("☰ Übersicht ausblenden" if visible else "☰ Übersicht")
+        self._sync_overview()
+
+    def _sync_overview(self):
+        """Tabelle an Filterliste/Position angleichen; nur solange sie sichtbar ist."""
+        if self.overviewModel is None or not self.overviewPanel.isVisible():
+            return
+        self._syncing_overview = True
+        try:
+            self.overviewModel.set_ids(self.note_ids)
+            self.overviewModel.refresh()
+            if self.note_ids:
+                row = self.overviewModel.row_of(self.note_ids[self.i])
+                if row >= 0:
+                    self.overviewView.selectRow(row)
+                    self.overviewView.scrollTo(self.overviewModel.index(row, 0))
+        finally:
+            self._syncing_overview = False
 
+    def _overview_row_changed(self, current, _previous):
+        if self._syncing_overview or not current.isValid():
+            return
+        nid = self.overviewModel.nid_at(current.row())
+        pos = self.overviewModel.position_of(nid) if nid is not None else -1
+        if pos >= 0 and pos != self.i:
+            self.i = pos
+            self.load()
+
+    @stage("ui.load")
     def load(self):
         if not self.note_ids:
             self.orig = None
@@ -417,7 +487,7 @@ class Review(QDialog):
             self._prop_generated = False
             self._manual_override = False
             self.oldView.setHtml("<i>Keine Notizen in der aktuellen Auswahl/Filter.</i>")
-            self.newView.setHtml("")
+            self._set_preview_html("")
             self.info.setText("")
             self._sync_edit_fields()
             self._clamp()
@@ -425,12 +495,40 @@ class Review(QDialog):
 
         self._clamp()
         nid = self.note_ids[self.i]
-        self.orig = self.mw.col.get_note(nid)
-        parsed_prop, warnings = parse_note_to_proposal(self.orig)
-        self.warnings = warnings
-        self._prop_generated = parsed_prop is not None
+        if self._ai_fix is not None and self._ai_fix[0] != nid:
+            # Weitergeblättert: laufenden AI-Fix der vorigen Karte abbrechen
+            self._ai_fix[1].cancel()
+            self._ai_fix = None
+            self.btnApply.setEnabled(True)
+        # Vorausberechnet? Nur gültig, solange die Notiz seitdem nicht geändert wurde
+        card = self._prefetcher.take(nid)
+        if card is None or card["note"].mod != self.mw.col.db.scalar("select mod from notes where id = ?", nid):
+            card = self._prepare_card(nid)
+        self.orig = card["note"]
+        info = card["info"]
+        self.warnings = list(info["warnings"])
+        self._prop_generated = info["prop"] is not None
         self._manual_override = False
+        self.prop = dict(card["prop"])
+
+        with timed("ui.setHtml"):
+            self.oldView.setHtml(card["old_html"])
+        self._schedule_prefetch()
+
+        ai = self._ai_results.get(nid)
+        if ai:
+            self._show_ai_proposal(*ai)
+            return
+        
+        display_warnings = list(self.warnings)
+        if info.get("is_fuzzy_duplicate"):
+            display_warnings.append("⚠️ Ähnliche Frage gefunden (Fuzzy)")
+            
+        self.info.setText(" | ".join(display_warnings) if display_warnings else "")
+        self._sync_edit_fields()
+        self._update_preview(card["new_html"])
 
+    def _display_prop(self, parsed_prop) -> dict:
         if parsed_prop:
             prop = parsed_prop.copy()
         else:
@@ -439,20 +537,33 @@ class Review(QDialog):
             prop.setdefault(field, "")
         if self.fixed_header and not prop.get("Kopfzeile"):
             prop["Kopfzeile"] = self.fixed_header
-        self.prop = prop
+        return prop
+
+    @stage("ui.prepare_card")
+    def _prepare_card(self, nid: int) -> dict:
+        """Alles, was load() für eine Karte braucht; läuft synchron oder im Prefetch-Thread."""
+        note = self.mw.col.get_note(nid)
+        ir = NoteIR.from_note(note)  # Felder nur einmal tokenisieren: Parser + ALT-Preview
+        info = self.notes.get(nid, note, ir, tier=TIER_FUZZY)  # Anzeige braucht den Fuzzy-Dublettenhinweis
+        prop = self._display_prop(info["prop"])
+        return {
+            "note": note,
+            "info": info,
+            "prop": prop,
+            "old_html": self._render.old_html(note, self.mw.col.media.dir(), ir=ir),
+            "new_html": self._render.prop_html(prop) if info["prop"] else None,
+        }
 
-        self.oldView.setHtml(html_preview(self.orig, self.mw.col.media.dir()))
-        
-        info = self._build_note_info(nid, self.orig, parsed_prop, self.warnings)
-        self._info_cache[nid] = info
-        
-        display_warnings = list(self.warnings)
-        if info.get("is_fuzzy_duplicate"):
-            display_warnings.append("⚠️ Ähnliche Frage gefunden (Fuzzy)")
-            
-        self.info.setText(" | ".join(display_warnings) if display_warnings else "")
-        self._sync_edit_fields()
-        self._update_preview()
+    def _schedule_prefetch(self):
+        """Nächste/vorige N Karten (abwechselnd, nächste zuerst) im Hintergrund vorbereiten."""
+        config = mw.addonManager.getConfig(__name__) or {}
+        depth = max(0, int(config.get("prefetch_depth", 3)))
+        ids = []
+        for k in range(1, depth + 1):
+            for j in (self.i + k, self.i - k):
+                if 0 <= j < len(self.note_ids):
+                    ids.append(self.note_ids[j])
+        self._prefetcher.schedule(ids)
 
     def next(self):
         if self.i < len(self.note_ids)-1:
@@ -471,88 +582,144 @@ class Review(QDialog):
     def on_ai_repair(self):
         if not self.orig: return
         
-        raw_text = ""
-        for f in self.orig.keys():
-            raw_text += f"{f}: {self.orig[f]}\n"
-
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        try:
-            prop, warnings = parse_with_llm(raw_text)
-        finally:
-            QApplication.restoreOverrideCursor()
-
-        if not prop:
-            QMessageBox.warning(self, "AI Error", "Konnte nicht parsen:\n" + "\n".join(warnings))
-            return
-
+        nid = self.orig.id
+        if self._ai_fix is not None:
+            self._ai_fix[1].cancel()
+        self._ai_touched = set()
+
+        def on_partial(prop, ready):
+            if self.orig is not None and self.orig.id == nid:
+                self._show_ai_partial(prop, ready)
+
+        def on_finished(prop, warnings, cancelled):
+            if self._ai_fix is None or self._ai_fix[1] is not fix:
+                return  # abgelöst (weitergeblättert oder neuer AI-Fix)
+            self._ai_fix = None
+            self.btnApply.setEnabled(True)
+            if cancelled:
+                return
+            if not prop:
+                QMessageBox.warning(self, "AI Error", "Konnte nicht parsen:\n" + "\n".join(warnings))
+                return
+            # Inzwischen weitergeblättert? Dann nur nicht anzeigen
+            if self.orig is None or self.orig.id != nid:
+                return
+            self._show_ai_proposal(self._keep_user_edits(prop), warnings, skip=self._ai_touched)
+
+        # Request läuft im Hintergrund (Keep-Alive-Client, Timeouts, abbrechbar); Felder kommen gestreamt
+        fix = AiSingleFix(self.mw, self, _llm_input(self.orig.items()), on_finished, on_partial)
+        self._ai_fix = (nid, fix)
+        fix.start()
+
+    def _keep_user_edits(self, prop: dict) -> dict:
+        """AI-Felder, außer denen, die der Nutzer während des AI-Fix selbst bearbeitet hat."""
+        return dict(prop, **{f: self.prop.get(f, "") for f in self._ai_touched})
+
+    def _show_ai_partial(self, prop: dict, ready: bool):
+        """Zwischenstand beim Streaming: nur geänderte Zeilen neu, Übernehmen erst mit bekannter Lösung."""
+        prop = self._keep_user_edits(prop)
+        changed = [f for f in PROP_FIELDS if (prop.get(f) or "") != (self.prop.get(f) or "")]
         self.prop = prop
         self._manual_override = True
+        self.warnings = ["✨ AI schreibt…" if ready else "✨ AI schreibt… (Lösung folgt)"]
+        self.btnApply.setEnabled(ready)
+        self.info.setText(self.warnings[0])
+        self._sync_edit_fields(skip=self._ai_touched)
+        if changed and not self._patch_preview(changed):
+            self._update_preview()
+
+    def _show_ai_proposal(self, prop: dict, warnings: list, skip=()):
+        self.prop = dict(prop)
+        self._manual_override = True
         self.warnings = ["✨ AI-Generated"] + warnings
         self._update_preview()
         self.info.setText(" | ".join(self.warnings))
-        self._sync_edit_fields()
+        self._sync_edit_fields(skip=skip)
+
+    def on_ai_fix_all(self):
+        config = mw.addonManager.getConfig(__name__) or {}
+        if not (config.get("openai_api_key") or "").strip():
+            QMessageBox.warning(self, "AI Error", "Kein API Key konfiguriert!")
+            return
+
+        flagged = []
+        for nid in self.note_ids:
+            if nid in self._ai_results:
+                continue
+            info = self.notes.get(nid)
+            if info.get("has_warnings") or info.get("no_correct"):
+                flagged.append(nid)
+        if not flagged:
+            QMessageBox.information(self, "AI-Fix", "Keine Karten mit Warnungen im aktuellen Filter.")
+            return
+
+        workers = max(1, int(config.get("ai_workers", 4)))
+        if QMessageBox.question(self, "AI-Fix alle",
+            f"{len(flagged)} Karten mit Warnungen an OpenAI schicken ({workers} parallel)? "
+            "Die Vorschläge werden gesammelt und erst nach Prüfung übernommen.",
+            QMessageBox.Yes | QMessageBox.No) != QMessageBox.Yes:
+            return
+
+        rows = list(iter_note_rows(self.mw.col, flagged))
+        names = field_names(self.mw.col, (row.mid for row in rows))
+        jobs = [(row.id, _llm_input(row.items(names[row.mid]))) for row in rows]
+
+        def on_result(nid, prop, warnings):
+            self._ai_results[nid] = (prop, warnings)
+            self._sync_overview()
+            if self.orig is not None and self.orig.id == nid:
+                self._show_ai_proposal(prop, warnings)
+
+        def on_finished(summary):
+            head = "Abgebrochen – Teilergebnis:\n" if summary["cancelled"] else ""
+            if summary["error"] is not None:
+                head = f"Abgebrochen wegen Fehler: {summary['error']}\n"
+            QMessageBox.information(self, "AI-Fix",
+                f"{head}{summary['ok']} Vorschläge, {summary['failed']} fehlgeschlagen "
+                f"({summary['done']}/{summary['total']} in {summary['seconds']:.1f} s, "
+                f"Cache-Trefferquote {get_llm_cache(config.get('llm_cache_mb', 50)).hit_rate:.0%}).\n"
+                "Die Vorschläge stehen im Filter „Nur Karten mit AI-Vorschlag“ zur Prüfung bereit.")
+            if summary["ok"]:
+                self.chkAiQueue.setChecked(True)
+
+        AiBatchFix(self.mw, self, jobs, workers, on_result, on_finished).start()
 
     def on_auto_accept(self):
-        accepted = 0
         total = len(self.note_ids)
         
         if QMessageBox.question(self, "Auto-Accept", 
-            "Soll ich versuchen, alle 100% sicheren Karten automatisch zu verarbeiten? (Warnung: Dubletten werden ignoriert)", 
+            "Soll ich versuchen, alle 100% sicheren Karten automatisch zu verarbeiten? "
+            f"(Dubletten innerhalb der Auswahl werden nur einmal angelegt, die übrigen mit „{TAG_BATCH_DUP}“ markiert; "
+            "Dubletten zu vorhandenen Karten werden ignoriert)", 
             QMessageBox.Yes | QMessageBox.No) != QMessageBox.Yes:
             return
 
-        self.mw.checkpoint("MC-Mapper Auto-Accept")
-        self.mw.progress.start(immediate=True)
-        
-        ids_to_process = list(self.note_ids)
-        
-        try:
-            for i, nid in enumerate(ids_to_process):
-                self.mw.progress.update(label=f"Verarbeite {i+1}/{len(ids_to_process)}...", value=i, max=len(ids_to_process))
-                
-                info = self._get_note_info(nid)
-                
-                if (info["prop"] 
-                    and not info["has_warnings"] 
-                    and not info["no_correct"]):
-                    
-                    orig_note = self.mw.col.get_note(nid)
-                    current_prop = info["prop"]
-                    
-                    if self.fixed_header and not current_prop.get("Kopfzeile"):
-                        current_prop["Kopfzeile"] = self.fixed_header
-
-                    n = Note(self.mw.col, self.model)
-                    for f in FIELDS:
-                        n[f] = _with_img_breaks_exact(current_prop.get(f, ""))
-                    
-                    try:
-                        orig_cids = list(orig_note.cards())
-                        deck_id = orig_cids[0].did if orig_cids else self.mw.col.decks.get_current_id()
-                    except:
-                        deck_id = self.mw.col.decks.get_current_id()
-                    
-                    self.mw.col.add_note(n, deck_id)
-
-                    o_tags = set(orig_note.tags)
-                    o_tags.add(TAG_NEW)
-                    orig_note.tags = list(o_tags)
-                    self.mw.col.update_note(orig_note)
-                    
-                    accepted += 1
-
-            self.mw.col.save()
-            self._info_cache.clear()
+        def on_finished(summary):
+            self.notes.clear()
+            self._prefetcher.clear()
+            self.notes.refresh_dup_stamp()
             self._apply_filter(reset_position=True)
-                    
-        finally:
-            self.mw.progress.finish()
-            
-        QMessageBox.information(self, "Fertig", f"{accepted} von {total} Karten im Turbo-Modus verarbeitet!")
+            if summary["error"] is not None:
+                head = f"Abgebrochen wegen Fehler: {summary['error']}\n"
+            elif summary["cancelled"]:
+                head = "Abgebrochen – Teilergebnis:\n"
+            else:
+                head = ""
+            QMessageBox.information(self, "Fertig",
+                f"{head}{summary['accepted']} von {total} Karten im Turbo-Modus verarbeitet! "
+                f"({summary['checked']} geprüft, {summary['seconds']:.1f} s, {summary['rate']:.0f} Notizen/s)"
+                + (f"\n{summary['duplicates']} Dubletten innerhalb der Auswahl übersprungen und mit „{TAG_BATCH_DUP}“ markiert."
+                   if summary["duplicates"] else ""))
+
+        # Auswertung läuft chunkweise im Hintergrund (abbrechbar), geschrieben wird am Ende in einem Undo-Schritt
+        AutoAcceptPipeline(
+            self.mw, self, self.note_ids, self.notes.safe_proposals,
+            self.model, self.fixed_header, on_finished,
+        ).start()
 
     def apply_current(self, suppress_dialogs=False):
-        if not self.note_ids or not self.orig:
-            return
+        if not self.note_ids or not self.orig or not self.btnApply.isEnabled():
+            return  # auch Strg+Enter, solange der gestreamte AI-Vorschlag noch keine Lösung hat
         
         self.mw.checkpoint("MC-Mapper apply")
         self.mw.col.save()
@@ -568,24 +735,23 @@ class Review(QDialog):
         key_tag = key_to_tag(normalize_combo_key(current_prop))
         
         if not suppress_dialogs:
-            dup_hits = self.mw.col.find_notes(f'tag:"{key_tag}"')
+            dup_hits = get_key_index(self.mw.col, self.model).lookup(key_tag)
             if dup_hits:
                 btn = QMessageBox.question(self, "Dublettenhinweis",
                     f"Eine identische Frage existiert bereits ({len(dup_hits)} Treffer). Trotzdem neu anlegen?",
                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
                 if btn != QMessageBox.Yes: return
 
-        n = Note(self.mw.col, self.model)
-        for f in FIELDS:
-            n[f] = _with_img_breaks_exact(current_prop.get(f, ""))
+        n = build_note(self.mw.col, self.model, current_prop)
         
-        try:
-            orig_cids = list(self.orig.cards()); deck_id = orig_cids[0].did if orig_cids else self.mw.col.decks.get_current_id()
-        except Exception:
-            deck_id = self.mw.col.decks.get_current_id()
-        self.mw.col.add_note(n, deck_id)
+        with timed("db.apply_current"):
+            try:
+                orig_cids = list(self.orig.cards()); deck_id = orig_cids[0].did if orig_cids else self.mw.col.decks.get_current_id()
+            except Exception:
+                deck_id = self.mw.col.decks.get_current_id()
+            self.mw.col.add_note(n, deck_id)
 
-        o_tags = set(self.orig.tags); o_tags.add(TAG_NEW); self.orig.tags = list(o_tags); self.mw.col.update_note(self.orig)
+            o_tags = set(self.orig.tags); o_tags.add(TAG_NEW); self.orig.tags = list(o_tags); self.mw.col.update_note(self.orig)
 
         old_ids = list(self.note_ids)
         old_index = self.i
@@ -593,8 +759,16 @@ class Review(QDialog):
         current_id = self.orig.id
 
         self.prop = current_prop
-        self._info_cache.clear()
-        self.note_ids = self.apply_all_filters()
+        self.notes.refresh_dup_stamp()
+
+        # Inkrementell statt apply_all_filters(): neu bewertet werden nur die übernommene Notiz
+        # (neue mod) und Notizen, für die die neue Karte eine Dublette ist. Die Filterzugehörigkeit
+        # ändert sich nur über das TAG_NEW-Tag, das Parse-Ergebnis bleibt gleich.
+        for nid in {current_id} | self.notes.affected_by_new_note(current_prop):
+            self.notes.forget(nid)
+        in_ai_queue = self._ai_results.pop(current_id, None) is not None
+        if self.chkHideMigr.isChecked() or (in_ai_queue and self.chkAiQueue.isChecked()):
+            self.note_ids = [nid for nid in self.note_ids if nid != current_id]
 
         if next_id and next_id in self.note_ids:
             self.i = self.note_ids.index(next_id)
@@ -611,4 +785,9 @@ class Review(QDialog):
         self.load()
 
 def run_review(mw, note_ids):
-    Review(mw, note_ids).exec()
\ No newline at end of file
+    try:
+        Review(mw, note_ids).exec()
+    finally:
+        save_all()
+        flush_all()
+        shutdown_pool()
\ No newline at end of file
@@ -0,0 +1,35 @@
+# standalone.py — Add-on-Module außerhalb von Anki laden (bench.py, batch.py, Worker-Prozesse)
+import os
+import sys
+import types
+import importlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = "mc_mapper"
+
+
+def load_addon(user_files: str | None = None, package: str = PACKAGE):
+    """
+    Registriert den Add-on-Ordner als Paket `package`, ohne __init__.py auszuführen
+    (Menüs/Hooks brauchen eine laufende Anki-GUI). Danach funktioniert `import mc_mapper.parsing`.
+    user_files: Sidecars (Fuzzy-Index, Caches) dorthin statt in den Add-on-Ordner schreiben.
+    Auch als initializer für ProcessPoolExecutor gedacht.
+    """
+    pkg = sys.modules.get(package)
+    if pkg is None:
+        pkg = types.ModuleType(package)
+        pkg.__path__ = [HERE]
+        sys.modules[package] = pkg
+    if user_files:
+        util = importlib.import_module(f"{package}.util")
+        util.USER_FILES = user_files
+    return pkg
+
+
+# Worker-Prozesse (parallel.py) führen diese Datei per runpy.run_path mit run_name WORKER_RUN_NAME aus:
+# dann ist das Paket unter seinem Anki-Namen registriert, bevor der erste Auftrag entpickelt wird,
+# und der Worker importiert nur die Parser-Module statt __init__.py (aqt, Menüs).
+WORKER_RUN_NAME = "__mc_mapper_worker__"
+
+if __name__ == WORKER_RUN_NAME:
+    load_addon(package=WORKER_PACKAGE)  # noqa: F821 (von run_path über init_globals gesetzt)
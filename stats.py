@@ -0,0 +1,165 @@
+# stats.py — Laufzeitmessung pro Stufe (Zeiten, Perzentile, Zähler), JSON-Export, optional cProfile
+import io
+import json
+import time
+import pstats
+import cProfile
+import platform
+import threading
+from collections import deque
+from functools import wraps
+
+SAMPLES = 2048  # letzte Einzelzeiten pro Stufe für die Perzentile
+
+
+class _Stage:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+class Stats:
+    """
+    Sammelt Zeiten pro Stufe (inklusive verschachtelter Stufen) und freie Zähler; thread-sicher.
+    Worker-Prozesse (parallel.py) messen nur in sich selbst und tauchen hier nicht auf.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._started = time.time()
+        self._profiler = None
+        self._profile_text = None
+
+    # ---- Erfassen
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            st = self._stages.get(name)
+            if st is None:
+                st = self._stages[name] = _Stage()
+            st.count += 1
+            st.total += seconds
+            if seconds > st.max:
+                st.max = seconds
+            st.samples.append(seconds)
+
+    def count(self, name: str, n: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._started = time.time()
+            self._profile_text = None
+
+    # ---- cProfile (erfasst nur den Thread, der start_profile() aufruft, also die GUI)
+    @property
+    def profiling(self) -> bool:
+        return self._profiler is not None
+
+    def start_profile(self):
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self, top: int = 40) -> str:
+        prof, self._profiler = self._profiler, None
+        if prof is None:
+            return self._profile_text or ""
+        prof.disable()
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(top)
+        self._profile_text = out.getvalue()
+        return self._profile_text
+
+    # ---- Auswertung
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {}
+            for name, st in self._stages.items():
+                vals = sorted(st.samples)
+                stages[name] = {
+                    "count": st.count,
+                    "total_s": round(st.total, 4),
+                    "mean_ms": round(st.total / st.count * 1000, 3) if st.count else 0.0,
+                    "p50_ms": round(_percentile(vals, 0.50) * 1000, 3),
+                    "p90_ms": round(_percentile(vals, 0.90) * 1000, 3),
+                    "p99_ms": round(_percentile(vals, 0.99) * 1000, 3),
+                    "max_ms": round(st.max * 1000, 3),
+                }
+            return {
+                "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._started)),
+                "python": platform.python_version(),
+                "stages": dict(sorted(stages.items(), key=lambda kv: -kv[1]["total_s"])),
+                "counters": dict(sorted(self._counters.items())),
+                "profile": self._profile_text,
+            }
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.snapshot(), fh, ensure_ascii=False, indent=2)
+
+    def report_text(self) -> str:
+        snap = self.snapshot()
+        lines = [f"seit {snap['since']}", "",
+                 f"{'Stufe':<28}{'Anzahl':>8}{'Summe s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, st in snap["stages"].items():
+            lines.append(f"{name:<28}{st['count']:>8}{st['total_s']:>10.2f}{st['p50_ms']:>10.2f}"
+                         f"{st['p90_ms']:>10.2f}{st['p99_ms']:>10.2f}{st['max_ms']:>10.1f}")
+        if snap["counters"]:
+            lines += ["", "Zähler"]
+            lines += [f"  {name:<26}{value:>12,.0f}" for name, value in snap["counters"].items()]
+        if snap["profile"]:
+            lines += ["", "cProfile (GUI-Thread)", snap["profile"]]
+        return "\n".join(lines)
+
+
+STATS = Stats()
+
+
+class timed:
+    """`with timed("llm.request"):` misst einen Block als Stufe."""
+
+    __slots__ = ("name", "_t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STATS.observe(self.name, time.perf_counter() - self._t0)
+        return False
+
+
+def stage(name: str):
+    """Dekorator: jeder Aufruf der Funktion wird als Stufe `name` gemessen."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STATS.observe(name, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def count(name: str, n: float = 1):
+    STATS.count(name, n)
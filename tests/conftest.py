@@ -0,0 +1,23 @@
+# conftest.py — Add-on-Module ohne laufendes Anki laden (wie bench.py/batch.py)
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from standalone import load_addon  # noqa: E402
+
+# Sidecars (Indizes, Caches) der Tests nicht in den Add-on-Ordner schreiben
+load_addon(user_files=tempfile.mkdtemp(prefix="mc_mapper_tests_"))
+
+
+def pytest_collection_modifyitems(session, config, items):
+    # Der Add-on-Ordner hat ein __init__.py -> pytest würde es als Paket importieren und damit
+    # aqt laden und Menüs registrieren. Die Tests brauchen es nicht (Module kommen über standalone.py).
+    for item in items:
+        for node in item.listchain():
+            if isinstance(node, pytest.Package) and str(node.path) == ROOT:
+                node.setup = lambda: None
@@ -0,0 +1,96 @@
+# test_bulk.py — Sammel-Schreibpfad gegen eine echte (temporäre) Anki-Collection: Batches, Undo, Tags
+import os
+import importlib
+
+import pytest
+
+from standalone import PACKAGE
+
+collection = pytest.importorskip("anki.collection", reason="anki nicht installiert")
+
+bulk = importlib.import_module(f"{PACKAGE}.bulk")
+config = importlib.import_module(f"{PACKAGE}.config")
+
+
+@pytest.fixture
+def col(tmp_path):
+    col = collection.Collection(os.path.join(str(tmp_path), "collection.anki2"))
+    mm = col.models
+    model = mm.new("MC Test")
+    for name in config.FIELDS:
+        mm.add_field(model, mm.new_field(name))
+    tmpl = mm.new_template("Karte 1")
+    tmpl["qfmt"], tmpl["afmt"] = "{{Frage}}", "{{Antwort}}"
+    mm.add_template(model, tmpl)
+    mm.add(model)
+    yield col
+    col.close()
+
+
+def _sources(col, n, deck="Quelle"):
+    did = col.decks.id(deck)
+    basic = col.models.by_name("Basic")
+    notes = []
+    for i in range(n):
+        note = col.new_note(basic)
+        note["Front"], note["Back"] = f"Frage {i}? a) x b) y c) z", "a"
+        notes.append(note)
+    col.add_notes([collection.AddNoteRequest(note=note, deck_id=did) for note in notes])
+    return [note.id for note in notes], did
+
+
+def _prop(i):
+    return {"Frage": f"Frage {i}?", "Antwort A": "x", "Antwort B": "y", "Antwort C": "z", "Correct": "A"}
+
+
+def test_commit_in_batches_with_one_undo_step(col, monkeypatch):
+    nids, did = _sources(col, 1200)
+    model = col.models.by_name("MC Test")
+    batches, progress = [], []
+    add_notes = col.add_notes
+    monkeypatch.setattr(col, "add_notes", lambda reqs: batches.append(len(reqs)) or add_notes(reqs))
+    undo_before = col.undo_status().undo
+
+    result = bulk.commit_proposals(col, model, [(nid, _prop(i)) for i, nid in enumerate(nids)],
+                                   header="Kardio", undo_name="Test-Übernahme",
+                                   on_progress=lambda done, total: progress.append((done, total)))
+
+    assert batches == [500, 500, 200]
+    assert progress == [(500, 1200), (1000, 1200), (1200, 1200)]
+    assert result.count == 1200 and result.changes.note_text
+    new_ids = col.find_notes('"note:MC Test"')
+    assert len(new_ids) == 1200
+    note = col.get_note(new_ids[0])
+    assert note["Kopfzeile"] == "Kardio" and note["Frage"].startswith("Frage ")
+    assert {col.get_card(cid).did for cid in col.find_cards('"note:MC Test"')} == {did}
+    assert sorted(col.find_notes(f'"tag:{config.TAG_NEW}"')) == sorted(nids)
+
+    # genau ein Undo-Schritt nimmt Notizen und Tags zurück
+    assert col.undo_status().undo == "Test-Übernahme"
+    col.undo()
+    assert col.undo_status().undo == undo_before
+    assert not col.find_notes('"note:MC Test"')
+    assert not col.find_notes(f'"tag:{config.TAG_NEW}"')
+
+
+def test_writer_write_and_tag_share_undo_step(col):
+    nids, _ = _sources(col, 30)
+    writer = bulk.BulkWriter(col, col.models.by_name("MC Test"), undo_name="Test-Schritt")
+    writer.write([(nid, _prop(i)) for i, nid in enumerate(nids[:20])])
+    writer.tag(nids[20:], "mc-mapper/skipped")
+    writer.write([(nid, _prop(i)) for i, nid in enumerate(nids[20:25])])
+    result = writer.finish()
+    assert result.count == 25
+    assert sorted(col.find_notes('"tag:mc-mapper/skipped"')) == sorted(nids[20:])
+    assert len(col.find_notes(f'"tag:{config.TAG_NEW}"')) == 25
+
+    col.undo()
+    assert not col.find_notes('"note:MC Test"') and not col.find_notes("tag:mc-mapper*")
+
+
+def test_writer_without_writes_adds_no_undo_entry(col):
+    _sources(col, 3)
+    before = col.undo_status()
+    result = bulk.BulkWriter(col, col.models.by_name("MC Test")).finish()
+    assert result.count == 0 and not result.changes.note_text
+    assert col.undo_status() == before
@@ -0,0 +1,108 @@
+# test_cache.py — ProposalCache (Sidecar pro Collection), Invalidierung, Vorbefüllen des NoteInfoStore; LLM-Antwort-Cache
+import os
+import types
+import sqlite3
+
+import pytest
+
+import bench
+
+addon = bench.load_addon()
+cache = addon.cache
+noteinfo = addon.noteinfo
+
+
+def _store_setup(tmp_path, n=300):
+    col, src_ids, target = bench.build_collection(addon, n, 5, os.path.join(str(tmp_path), "c.anki2"))
+    props = cache.ProposalCache(os.path.join(str(tmp_path), "proposals.sqlite"), addon.parsing.PARSER_VERSION)
+    return col, src_ids, target, props
+
+
+def test_prefill_reads_cache_in_batches(tmp_path, monkeypatch):
+    col, src_ids, target, props = _store_setup(tmp_path)
+    first = noteinfo.NoteInfoStore(col, target, {}, props)
+    first.prefill(src_ids)
+
+    calls = []
+    get_many = props.get_many
+    monkeypatch.setattr(props, "get", lambda *a: calls.append("get"))
+    monkeypatch.setattr(props, "get_many", lambda keys: calls.append(len(list(keys))) or get_many(keys))
+    again = noteinfo.NoteInfoStore(col, target, {}, props)
+    again.prefill(src_ids)
+    assert calls == [len(src_ids)]  # eine Abfrage für alle, kein get() pro Notiz
+    for nid in src_ids:
+        assert again.get(nid) == first.get(nid)
+
+
+def test_entry_invalid_after_mod_change(tmp_path):
+    props = cache.ProposalCache(os.path.join(str(tmp_path), "p.sqlite"), 1)
+    props.put(1, 100, {"prop": {"Frage": "x"}}, "s1")
+    assert props.get(1, 100) == ({"prop": {"Frage": "x"}}, "s1")  # noch ungespeichert
+    props.flush()
+    assert props.get(1, 100) == ({"prop": {"Frage": "x"}}, "s1")
+    assert props.get(1, 101) is None
+
+
+def test_get_many_returns_only_valid_entries(tmp_path):
+    props = cache.ProposalCache(os.path.join(str(tmp_path), "p.sqlite"), 1)
+    for nid in range(1, 1201):
+        props.put(nid, nid, {"n": nid}, None)
+    props.flush()
+    props.put(5000, 7, {"n": 5000}, "neu")  # noch in _pending
+    keys = [(nid, nid if nid % 3 else nid + 1) for nid in range(1, 1201)] + [(5000, 7), (9999, 1)]
+    got = props.get_many(keys)
+    assert set(got) == {nid for nid in range(1, 1201) if nid % 3} | {5000}
+    assert got[5000] == ({"n": 5000}, "neu") and got[1] == ({"n": 1}, None)
+
+
+def test_version_change_invalidates_and_closes_old(tmp_path):
+    col = types.SimpleNamespace(path=os.path.join(str(tmp_path), "v.anki2"))
+    try:
+        old = cache.get_proposal_cache(col, 1)
+        assert cache.get_proposal_cache(col, 1) is old
+        old.put(1, 10, {"n": 1}, None)
+        new = cache.get_proposal_cache(col, 2)
+        assert new is not old and new.get(1, 10) is None
+        with pytest.raises(sqlite3.ProgrammingError):
+            old._db.execute("select 1")
+        # Eintrag der alten Version wurde beim Schließen geschrieben, gilt aber nur für sie
+        reopened = cache.ProposalCache(addon.util.user_files_path(col, "proposals.sqlite"), 1)
+        assert reopened.get(1, 10) == ({"n": 1}, None)
+        reopened.close()
+    finally:
+        cache._CACHES.pop(col.path).close()
+
+
+def test_llm_key_depends_on_prompt_version():
+    key = cache.llm_cache_key(addon.parsing.PROMPT_VERSION, "m", "Prompt", [b"img"])
+    assert key == cache.llm_cache_key(addon.parsing.PROMPT_VERSION, "m", "Prompt", [b"img"])
+    assert key != cache.llm_cache_key(addon.parsing.PROMPT_VERSION + 1, "m", "Prompt", [b"img"])
+    assert key != cache.llm_cache_key(addon.parsing.PROMPT_VERSION, "m", "Prompt", [b"img2"])
+
+
+def _llm_cache(tmp_path, monkeypatch, max_bytes):
+    clock = iter(range(1, 10**6))
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))  # eindeutige last_used-Werte
+    return cache.LlmCache(os.path.join(str(tmp_path), "llm.sqlite"), max_bytes)
+
+
+def test_llm_cache_counts_hits_and_misses(tmp_path, monkeypatch):
+    llm = _llm_cache(tmp_path, monkeypatch, 10_000)
+    assert llm.get("k") is None
+    llm.put("k", "Antwört")
+    assert llm.get("k") == "Antwört" and llm.get("k") == "Antwört"
+    stats = llm.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["bytes"] == len("Antwört".encode("utf-8"))
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_llm_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    llm = _llm_cache(tmp_path, monkeypatch, 1000)
+    for key in "abcd":
+        llm.put(key, key * 240)
+    assert llm.get("a")                  # a zuletzt benutzt -> b ist jetzt am ältesten
+    llm.put("e", "e" * 240)              # 1200 > 1000 -> bis 900 Bytes verdrängen: b und c
+    assert llm.get("b") is None and llm.get("c") is None
+    assert all(llm.get(key) for key in "ade")
+    assert llm.stats()["bytes"] == 720
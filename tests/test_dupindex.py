@@ -0,0 +1,223 @@
+# test_dupindex.py — Kombi-Key-Index nach Undo (Zeilen ändern sich ohne Hooks) und unter parallelen Zugriffen;
+# Dubletten innerhalb einer Auswahl (BatchDeduper/near_key)
+import os
+import importlib
+import threading
+import types
+
+from standalone import PACKAGE
+
+import bench
+
+config = importlib.import_module(f"{PACKAGE}.config")
+dupindex = importlib.import_module(f"{PACKAGE}.dupindex")
+
+
+def _collection(tmp_path):
+    col = bench.BenchCollection(os.path.join(tmp_path, "test.anki2"))
+    target = col.models.add(3, config.TARGET_MODEL_NAME, config.FIELDS)
+    qa = {"question": "Welches Enzym ist beim Infarkt zuerst erhöht?",
+          "options": ["Myoglobin", "Troponin", "CK-MB", "LDH", "AST"], "correct": 0}
+    fields = bench.target_fields(qa, config.FIELDS)
+    nids = col.add_notes(target["id"], [(fields, []), (fields, [])])
+    return col, target, nids
+
+
+def test_lookup_drops_notes_removed_without_hook(tmp_path):
+    col, target, (a, b) = _collection(str(tmp_path))
+    idx = dupindex.KeyIndex(target["id"], dupindex._combo_ords(target))
+    idx.sync(col)
+    key = next(iter(idx._nids))
+    assert idx.lookup(key) == [a, b]
+
+    # wie Undo von "Notiz anlegen": Zeile weg, notes_will_be_deleted kommt nicht
+    col.db.execute("delete from notes where id = ?", b)
+    assert idx.lookup(key) == [a]
+    assert b not in idx._keys
+
+
+def test_undo_marks_indexes_stale(tmp_path, monkeypatch):
+    col, target, (a, b) = _collection(str(tmp_path))
+    monkeypatch.setattr(dupindex, "_KEY_INDEXES", {})
+    monkeypatch.setattr(dupindex, "_INDEXES", {})
+    keys = dupindex.get_key_index(col, target)
+    fuzzy = dupindex.get_fuzzy_index(col, target)
+    question = col.get_note(a)["Frage"]
+    assert {nid for nid, _ in fuzzy.query(question)} == {a, b}
+
+    col.db.execute("delete from notes where id = ?", b)
+    dupindex._on_state_did_undo(None)
+    assert keys.stale and fuzzy.stale
+    fuzzy = dupindex.get_fuzzy_index(col, target)
+    assert not fuzzy.stale
+    assert [nid for nid, _ in fuzzy.query(question)] == [a]
+    assert dupindex.get_key_index(col, target)._keys.keys() == {a}
+
+
+def test_hooks_index_only_saved_edits(tmp_path):
+    col, target, (a, b) = _collection(str(tmp_path))
+    fuzzy = dupindex.FuzzyIndex(target["id"], config.FIELDS.index("Frage"))
+    fuzzy.sync(col)
+    old = col.get_note(a)["Frage"]
+    new_question = "Welches Hormon senkt den Blutzucker nach dem Essen?"
+
+    # Editor: note_will_flush bei jedem Tastendruck, gespeichert wird nichts
+    note = col.get_note(a)
+    note.fields[config.FIELDS.index("Frage")] = new_question
+    for _ in range(5):
+        fuzzy.note_changed(note)
+    assert fuzzy._touched == {a}
+    assert {nid for nid, _ in fuzzy.query(new_question)} == set()
+    assert fuzzy._touched == {a}              # mod unverändert -> bleibt gemerkt
+    fuzzy._flush_pending(final=True)          # Operation durch, Notiz nie gespeichert
+    assert not fuzzy._touched
+    assert {nid for nid, _ in fuzzy.query(old)} == {a, b}
+
+    # gespeichert: Zeile mit neuem mod -> eingerechnet
+    fuzzy.note_changed(note)
+    flds = "\x1f".join(note.fields)
+    col.db.execute("update notes set flds = ?, mod = mod + 1 where id = ?", flds, a)
+    assert [nid for nid, _ in fuzzy.query(new_question)] == [a]
+    assert not fuzzy._touched
+
+
+def test_hooks_new_notes_tracked_once(tmp_path):
+    col, target, (a, b) = _collection(str(tmp_path))
+    keys = dupindex.KeyIndex(target["id"], dupindex._combo_ords(target))
+    keys.sync(col)
+    added = col.get_note(a)
+    discarded = col.get_note(a)
+    added.id = discarded.id = 0
+    for note in (added, added, discarded):
+        keys.note_added(note)
+        keys.note_changed(note)               # id 0: note_will_flush zählt nicht
+    assert len(keys._pending) == 2 and not keys._touched
+
+    (c,) = col.add_notes(target["id"], [(added.fields, [])])
+    added.id = c
+    keys._flush_pending(final=True)
+    assert not keys._pending                  # verworfene Notiz hängt nicht mehr
+    assert keys.lookup(keys.key_for_fields(added.fields)) == [a, b, c]
+
+
+class _Hook:
+    def __init__(self):
+        self._hooks = []
+
+    def append(self, cb):
+        self._hooks.append(cb)
+
+    def remove(self, cb):
+        self._hooks.remove(cb)
+
+
+def test_register_survives_reload():
+    hook = _Hook()
+    dupindex._register(hook, dupindex._on_note_will_flush)
+    dupindex._register(hook, dupindex._on_note_will_flush)
+    assert hook._hooks == [dupindex._on_note_will_flush]
+
+    # Reload: gleiches Modul, neues Funktionsobjekt -> ersetzt statt doppelt
+    reloaded = types.FunctionType(dupindex._on_note_will_flush.__code__, {})
+    reloaded.__module__ = dupindex._on_note_will_flush.__module__
+    reloaded.__qualname__ = dupindex._on_note_will_flush.__qualname__
+    other = lambda note: None  # noqa: E731 (fremder Callback bleibt)
+    hook.append(other)
+    dupindex._register(hook, reloaded)
+    assert hook._hooks == [other, reloaded]
+
+
+def test_concurrent_put_and_query():
+    idx = dupindex.FuzzyIndex(1, 0)
+    words = "herz lunge niere leber milz magen darm blut knochen nerv haut auge".split()
+    texts = [" ".join(words[(i + k) % len(words)] + str(i % 7) for k in range(6)) for i in range(60)]
+    errors = []
+
+    def writer():
+        try:
+            for i in range(3000):
+                idx.put(i % 400, None, texts[i % len(texts)])
+                if i % 3 == 0:
+                    idx.remove((i - 1) % 400)
+        except Exception as e:  # pragma: no cover - nur bei Race
+            errors.append(e)
+
+    def reader():
+        try:
+            for i in range(200):
+                idx.query(texts[i % len(texts)], threshold=0.8)
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_note_info_store_concurrent_get(tmp_path):
+    addon = bench.load_addon()
+    col, src_ids, target = bench.build_collection(addon, 300, 7, os.path.join(str(tmp_path), "c.anki2"))
+    noteinfo = addon.noteinfo
+    store = noteinfo.NoteInfoStore(col, target, {"duplicate_threshold": 0.85})
+    results, errors = [{} for _ in range(4)], []
+
+    def worker(out, tier):
+        try:
+            for nid in src_ids:
+                out[nid] = store.get(nid, tier=tier)
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(results[i], i % 3)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    reference = noteinfo.NoteInfoStore(col, target, {"duplicate_threshold": 0.85})
+    for nid in src_ids:
+        final = store.get(nid, tier=noteinfo.TIER_FUZZY)
+        expected = reference.get(nid, tier=noteinfo.TIER_FUZZY)
+        assert final == expected
+        for out in results:
+            assert out[nid]["prop"] == expected["prop"]
+
+
+Q = {"Frage": "Welches Enzym steigt beim Infarkt zuerst?", "Antwort A": "Myoglobin",
+     "Antwort B": "Troponin T", "Antwort C": "CK-MB", "Antwort D": "LDH", "Antwort E": ""}
+
+
+def test_batch_deduper_catches_duplicates_within_batch():
+    near = dict(Q, **{"Frage": "  welches Enzym steigt beim Infarkt – zuerst ? ",
+                      "Antwort B": "LDH", "Antwort D": "troponin-T"})  # andere Reihenfolge der Falschen
+    deduper = dupindex.BatchDeduper()
+    keep, dups = deduper.split([(1, Q), (2, dict(Q)), (3, near)])
+    assert keep == [(1, Q)] and dups == [(2, 1), (3, 1)]
+    # split() chunkweise: Vertreter aus früheren Aufrufen gelten weiter
+    keep, dups = deduper.split([(4, dict(near, **{"Antwort C": "ck mb"}))])
+    assert keep == [] and dups == [(4, 1)]
+
+
+def test_batch_deduper_keeps_distinct_questions():
+    variants = [
+        dict(Q, Frage="Welches Enzym steigt beim Infarkt zuletzt?"),
+        dict(Q, **{"Antwort A": "Troponin T", "Antwort B": "Myoglobin"}),   # andere richtige Antwort
+        dict(Q, **{"Antwort E": "AST"}),
+        dict(Q, Frage=Q["Frage"] + ' <img src="ekg1.png">'),
+        dict(Q, Frage=Q["Frage"] + ' <img src="ekg2.png">'),                # gleiche Frage, anderes Bild
+        {"Frage": "Welcher Wert ist beim Infarkt erhöht?", "Antwort A": "Troponin"},
+        {"Frage": "Welcher Wert ist beim Infarkt erniedrigt?", "Antwort A": "Troponin"},
+    ]
+    items = list(enumerate([Q] + variants))
+    keep, dups = dupindex.BatchDeduper().split(items)
+    assert dups == [] and keep == items
+    assert len({dupindex.near_key(prop) for _, prop in items}) == len(items)
+
+
+def test_near_key_ignores_case_punctuation_and_wrong_answer_order():
+    assert dupindex.near_key({"Frage": "  ?! – "}) is None
+    same = dict(Q, **{"Frage": Q["Frage"].upper().replace(" ", "  "), "Antwort C": "LDH", "Antwort D": "CK MB"})
+    assert dupindex.near_key(same) == dupindex.near_key(Q)
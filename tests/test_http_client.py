@@ -0,0 +1,196 @@
+# test_http_client.py — HttpClient gegen einen lokalen http.server: Keep-Alive, gzip, Retry, Timeout, Abbruch
+import gzip
+import json
+import time
+import threading
+import importlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from standalone import PACKAGE
+
+http_client = importlib.import_module(f"{PACKAGE}.http_client")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hit = server.hits[self.path]
+        if self.path == "/v1/echo":
+            return self._send(200, json.dumps({"port": self.client_address[1]}).encode())
+        if self.path == "/v1/gzip":
+            body = gzip.compress(json.dumps({"text": "ä" * 1000}).encode())
+            return self._send(200, body, {"Content-Encoding": "gzip"})
+        if self.path.startswith("/v1/flaky"):
+            # /v1/flaky?fail=2&after=0.3
+            args = dict(p.split("=") for p in self.path.partition("?")[2].split("&") if p)
+            if hit <= int(args.get("fail", 0)):
+                headers = {"Retry-After": args["after"]} if "after" in args else {}
+                return self._send(503, b'{"error": "busy"}', headers)
+            return self._send(200, json.dumps({"attempt": hit}).encode())
+        if self.path == "/v1/bad":
+            return self._send(400, b'{"error": "bad request"}')
+        if self.path == "/v1/hang":
+            server.release.wait(5)  # antwortet erst, wenn der Test aufräumt
+            return self._send(200, b"{}")
+        if self.path == "/v1/sse":
+            return self._sse(["eins", "zwei", "drei"], delay=0)
+        if self.path == "/v1/sse-slow":
+            return self._sse(["eins"] + ["weiter"] * 50, delay=0.1)
+        self._send(404, b"{}")
+
+    def _sse(self, events, delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self._chunk(b": ping\n\n")
+            for event in events:
+                self._chunk(b"data: " + json.dumps(event).encode() + b"\n\n")
+                if self.server.release.wait(delay):
+                    return
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    srv.hits = {}
+    srv.lock = threading.Lock()
+    srv.release = threading.Event()
+    threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield srv
+    srv.release.set()
+    srv.shutdown()
+    srv.server_close()
+
+
+def _client(server, **kw):
+    kw = {"backoff": 0.01, **kw}
+    return http_client.HttpClient(f"http://127.0.0.1:{server.server_port}/v1", **kw)
+
+
+def _cancel_after(token, seconds):
+    timer = threading.Timer(seconds, token.cancel)
+    timer.start()
+    return timer
+
+
+def test_keep_alive_reuses_connection(server):
+    client = _client(server)
+    ports = {client.post_json("/echo", {})["port"] for _ in range(5)}
+    assert len(ports) == 1
+    client.close()
+    assert client.post_json("/echo", {})["port"] not in ports
+
+
+def test_gzip_body_decoded(server):
+    client = _client(server)
+    assert client.post_json("/gzip", {}) == {"text": "ä" * 1000}
+    # nach gzip-Antwort bleibt die Verbindung nutzbar
+    assert client.post_json("/echo", {})
+
+
+def test_retry_with_exponential_backoff(server, monkeypatch):
+    delays = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    monkeypatch.setattr(http_client.random, "random", lambda: 0.5)  # Jitter-Faktor 1.0
+    client = _client(server, retries=3, backoff=0.1)
+    assert client.post_json("/flaky?fail=3", {}) == {"attempt": 4}
+    assert delays == pytest.approx([0.1, 0.2, 0.4])
+
+
+def test_retry_after_takes_precedence(server, monkeypatch):
+    delays = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    client = _client(server, retries=2, backoff=5.0)
+    assert client.post_json("/flaky?fail=2&after=0.25", {}) == {"attempt": 3}
+    assert delays == [0.25, 0.25]
+
+
+def test_gives_up_after_retries_and_on_client_errors(server):
+    client = _client(server, retries=1)
+    with pytest.raises(http_client.HttpError) as err:
+        client.post_json("/flaky?fail=5", {})
+    assert err.value.status == 503 and server.hits["/v1/flaky?fail=5"] == 2
+    with pytest.raises(http_client.HttpError) as err:
+        client.post_json("/bad", {})
+    assert err.value.status == 400 and server.hits["/v1/bad"] == 1  # 400 wird nicht wiederholt
+
+
+def test_read_timeout(server):
+    client = _client(server, read_timeout=0.2, retries=0)
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        client.post_json("/hang", {})
+    assert time.perf_counter() - t0 < 2
+
+
+def test_cancel_mid_request(server):
+    client = _client(server, retries=3)
+    token = http_client.CancelToken()
+    _cancel_after(token, 0.2)
+    t0 = time.perf_counter()
+    with pytest.raises(http_client.Cancelled):
+        client.post_json("/hang", {}, token=token)
+    assert time.perf_counter() - t0 < 2
+    assert server.hits["/v1/hang"] == 1  # kein Retry nach Abbruch
+
+
+def test_cancel_during_backoff(server):
+    client = _client(server, retries=3)
+    token = http_client.CancelToken()
+    _cancel_after(token, 0.2)
+    t0 = time.perf_counter()
+    with pytest.raises(http_client.Cancelled):
+        client.post_json("/flaky?fail=5&after=30", {}, token=token)
+    assert time.perf_counter() - t0 < 2
+
+
+def test_sse_stream_and_connection_reuse(server):
+    client = _client(server)
+    port = client.post_json("/echo", {})["port"]
+    assert [json.loads(e) for e in client.stream_sse("/sse", {})] == ["eins", "zwei", "drei"]
+    assert client.post_json("/echo", {})["port"] == port  # nach [DONE] zurück in den Pool
+
+
+def test_cancel_mid_sse_stream(server):
+    client = _client(server)
+    token = http_client.CancelToken()
+    events = []
+    t0 = time.perf_counter()
+    with pytest.raises(http_client.Cancelled):
+        for event in client.stream_sse("/sse-slow", {}, token=token):
+            events.append(json.loads(event))
+            if len(events) == 2:
+                _cancel_after(token, 0.05)
+    assert events[0] == "eins" and len(events) < 10
+    assert time.perf_counter() - t0 < 2
+    assert client.post_json("/echo", {})  # abgebrochene Verbindung nicht im Pool
@@ -0,0 +1,67 @@
+# test_llm_standin.py — SSE-Client und parse_with_llm gegen llm_standin.serve() (früher llm_standin.py --check)
+import json
+import importlib
+
+import pytest
+
+import llm_standin
+from standalone import PACKAGE
+
+http_client = importlib.import_module(f"{PACKAGE}.http_client")
+parsing = importlib.import_module(f"{PACKAGE}.parsing")
+
+
+@pytest.fixture
+def standin(request):
+    kw = getattr(request, "param", {})
+    server = llm_standin.serve(0, **{"delay": 0.005, "piece": 8, **kw})
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _config(server, **kw):
+    return {"openai_api_key": "x", "openai_base_url": f"http://127.0.0.1:{server.server_port}/v1",
+            "llm_cache_mb": 0, "http_retries": 3, **kw}
+
+
+def test_stream_sse_yields_deltas_and_usage(standin):
+    client = http_client.HttpClient(f"http://127.0.0.1:{standin.server_port}/v1")
+    payload = {"stream": True, "stream_options": {"include_usage": True}, "messages": []}
+    events = [json.loads(e) for e in client.stream_sse("/chat/completions", payload)]
+    content = "".join(c["delta"]["content"] for e in events for c in e["choices"])
+    assert json.loads(content) == llm_standin.ANSWER
+    assert "usage" in events[-1]
+    client.close()
+
+
+def test_streaming_reports_fields_and_matches_plain(standin):
+    seen = []
+    streamed = parsing.parse_with_llm("Frage: …", _config(standin), media_dir="",
+                                      on_fields=lambda fields: seen.append(list(fields)))
+    plain = parsing.parse_with_llm("Frage: …", _config(standin, llm_stream=False), media_dir="")
+    assert streamed == plain and streamed[0]
+    # ein Aufruf pro neu fertigem Feld, in Antwort-Reihenfolge
+    assert [keys[-1] for keys in seen] == list(llm_standin.ANSWER)
+    assert seen[-1] == list(llm_standin.ANSWER)
+
+
+@pytest.mark.parametrize("standin", [{"fail": 2}], indirect=True)
+def test_retries_busy_server(standin):
+    prop, warnings = parsing.parse_with_llm("Frage: …", _config(standin), media_dir="", on_fields=lambda f: None)
+    assert prop and standin.requests == 3
+
+
+@pytest.mark.parametrize("standin", [{"delay": 0.05}], indirect=True)
+def test_cancel_mid_stream(standin):
+    token = http_client.CancelToken()
+    seen = []
+
+    def on_fields(fields):
+        seen.append(list(fields))
+        token.cancel()
+
+    prop, warnings = parsing.parse_with_llm("Frage: …", _config(standin), media_dir="", token=token,
+                                            on_fields=on_fields)
+    assert prop is None and warnings == ["AI Request abgebrochen"]
+    assert seen == [["Frage"]]
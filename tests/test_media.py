@@ -0,0 +1,97 @@
+# test_media.py — Bildaufbereitung: kleine Bilder unverändert, Transparenz bleibt PNG, Cache mit Verdrängung
+import os
+import random
+import importlib
+
+import pytest
+
+from standalone import PACKAGE
+
+QtCore = pytest.importorskip("PyQt6.QtCore", reason="PyQt6 nicht installiert")
+QtGui = pytest.importorskip("PyQt6.QtGui", reason="PyQt6 nicht installiert")
+
+media = importlib.import_module(f"{PACKAGE}.media")
+
+
+@pytest.fixture
+def qt_media(monkeypatch, tmp_path):
+    # media wurde ggf. ohne aqt.qt importiert (_HAS_QT False) -> Qt-Klassen aus PyQt6 einsetzen
+    for name, mod in (("QImage", QtGui), ("QImageReader", QtGui), ("QBuffer", QtCore),
+                      ("QByteArray", QtCore), ("QIODevice", QtCore), ("Qt", QtCore)):
+        monkeypatch.setattr(media, name, getattr(mod, name), raising=False)
+    monkeypatch.setattr(media, "_HAS_QT", True)
+    monkeypatch.setattr(media, "cache_dir", lambda: str(tmp_path / "media_cache"))
+    monkeypatch.setattr(media, "_cache_bytes", None)
+    return media
+
+
+def _image(width, height, alpha=False, fmt="PNG", seed=8) -> bytes:
+    """Rauschbild (komprimiert schlecht -> Neukodierung lohnt sich)."""
+    rng = random.Random(seed)
+    img = QtGui.QImage(width, height, QtGui.QImage.Format.Format_ARGB32 if alpha else QtGui.QImage.Format.Format_RGB32)
+    for y in range(height):
+        for x in range(width):
+            img.setPixel(x, y, (rng.randrange(40, 256) if alpha else 255) << 24 | rng.getrandbits(24))
+    buf = QtCore.QBuffer()
+    buf.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+    assert img.save(buf, fmt)
+    return bytes(buf.data())
+
+
+def _decoded(raw):
+    img = QtGui.QImage.fromData(raw)
+    return img.width(), img.height(), img.hasAlphaChannel()
+
+
+def _cache_files(qt_media):
+    folder = qt_media.cache_dir()
+    return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+
+def _no_recompress(*args):
+    raise AssertionError("Bild wurde dekodiert")
+
+
+def test_small_image_sent_unchanged(qt_media, monkeypatch):
+    raw = _image(120, 80)
+    assert len(raw) < qt_media.SMALL_IMAGE_BYTES
+    monkeypatch.setattr(qt_media, "_recompress", _no_recompress)
+    mime, out = qt_media.prepare_image(raw, "image/png", max_side=200)
+    assert (mime, out) == ("image/png", raw) and out is raw
+    assert _cache_files(qt_media) == []  # nicht einmal ein Cache-Eintrag
+
+
+def test_transparency_stays_png(qt_media):
+    mime, out = qt_media.prepare_image(_image(300, 150, alpha=True), "image/png", max_side=100)
+    assert mime == "image/png" and _decoded(out) == (100, 50, True)
+
+    mime, out = qt_media.prepare_image(_image(300, 150), "image/png", max_side=100)
+    assert mime == "image/jpeg" and _decoded(out) == (100, 50, False)
+
+
+def test_result_served_from_cache(qt_media, monkeypatch):
+    raw = _image(300, 150)
+    first = qt_media.prepare_image(raw, "image/png", max_side=100)
+    assert len(_cache_files(qt_media)) == 1
+    with monkeypatch.context() as m:
+        m.setattr(qt_media, "_recompress", _no_recompress)
+        assert qt_media.prepare_image(raw, "image/png", max_side=100) == first
+    # andere Einstellungen -> eigener Schlüssel
+    qt_media.prepare_image(raw, "image/png", max_side=120)
+    assert len(_cache_files(qt_media)) == 2
+
+
+def test_cache_evicts_least_recently_used(qt_media, monkeypatch):
+    blob = b"x" * 1000  # + "image/png\n" = 1010 Bytes pro Eintrag
+    monkeypatch.setattr(qt_media, "CACHE_MAX_BYTES", 4100)
+    for i, key in enumerate("abc"):
+        qt_media._cache_put(key, "image/png", blob)
+        os.utime(qt_media._cache_path(key), (1000 + i, 1000 + i))
+    assert qt_media._cache_get("a") == ("image/png", blob)  # a jetzt zuletzt benutzt
+    qt_media._cache_put("d", "image/png", blob)
+    assert qt_media._cache_bytes == 4040
+    os.utime(qt_media._cache_path("d"), (2000, 2000))
+
+    qt_media._cache_put("e", "image/png", blob)  # 5050 > 4100 -> bis 3690 räumen: b und c
+    assert _cache_files(qt_media) == ["a.bin", "d.bin", "e.bin"]
+    assert qt_media._cache_bytes == 3030
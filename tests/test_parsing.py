@@ -0,0 +1,121 @@
+# test_parsing.py — Marker-Suche gegen die frühere Scan-Variante; JsonFieldStream beim Streaming
+import json
+import random
+import importlib
+
+from standalone import PACKAGE
+
+import bench
+
+parsing = importlib.import_module(f"{PACKAGE}.parsing")
+
+ANSWER = {
+    "Frage": 'Was zeigt das „EKG“? Mit "Zitat", Backslash \\ und \\u00e4\nzweite Zeile',
+    "Antwort A": "ST-Hebung", "Antwort B": "", "Antwort C": "Delta-Welle",
+    "Antwort D": "QT-Verlängerung", "Antwort E": "}\",{",
+    "Correct": "A",
+    "Antwort": "x" * 5000 + "\\",
+}
+TEXT = "```json\n" + json.dumps(ANSWER, ensure_ascii=False, indent=1) + "\n```"
+
+
+def _feed(text, piece):
+    stream, keys = parsing.JsonFieldStream(), []
+    for i in range(0, len(text), piece):
+        keys += stream.feed(text[i:i + piece])
+    return stream, keys
+
+
+def test_pieces_give_same_fields_in_order():
+    for piece in (1, 2, 3, 16, len(TEXT)):
+        stream, keys = _feed(TEXT, piece)
+        assert stream.fields == ANSWER
+        assert keys == list(ANSWER)
+
+
+def test_field_reported_once_complete():
+    stream = parsing.JsonFieldStream()
+    assert stream.feed('{"Frage": "erst') == []
+    assert stream.feed(' halb\\') == []           # Escape über die Stückgrenze
+    assert stream.feed('"", "Correct"') == ["Frage"]  # String-Wert ist mit dem „"“ fertig
+    assert stream.feed(': "B"') == ["Correct"]
+    assert stream.fields == {"Frage": 'erst halb"', "Correct": "B"}
+    assert stream.feed(', "n": 12') == []          # Zahl erst fertig, wenn danach „,“ oder „}“ folgt
+    assert stream.feed("}") == ["n"]
+
+
+def test_open_string_is_not_rescanned():
+    # Langer Wert in kleinen Stücken: solange er offen ist, wird der Puffer nicht zusammengefügt
+    stream = parsing.JsonFieldStream()
+    stream.feed('{"Antwort": "')
+    for _ in range(1000):
+        assert stream.feed("abc\\n") == []
+    assert len(stream._parts) == 1001
+    assert stream.feed('"}') == ["Antwort"]
+    assert stream.fields["Antwort"] == "abc\n" * 1000
+
+
+def _pick_best_sequence_scan(txt: str):
+    """Frühere Variante (neuer Scan ab jedem „a“, quadratisch); nur noch Orakel für _best_run."""
+    def collect(mark_pat):
+        ms = list(mark_pat.finditer(txt))
+        if not ms: return []
+        runs = []
+        expected = ['a', 'b', 'c', 'd', 'e']
+        starts = [i for i, m in enumerate(ms) if m.group(1).lower() == 'a']
+        for si in starts:
+            seq, ei = [], 0
+            for m in ms[si:]:
+                ch = m.group(1).lower()
+                if ch == expected[ei]:
+                    seq.append(m); ei = min(ei + 1, 4)
+                elif ch in expected[ei+1:]:
+                    seq.append(m); ei = expected.index(ch)
+                if len(seq) == 5: break
+            if 3 <= len(seq) <= 5: runs.append(seq)
+        return runs
+
+    runs = collect(parsing.STRICT_OPT_MARK)
+    if not runs: runs = collect(parsing.LENIENT_OPT_MARK)
+    if not runs: return []
+    runs.sort(key=lambda r: r[-1].end(), reverse=True)
+    return runs[0]
+
+
+def _spans(seq):
+    return [m.span() for m in seq]
+
+
+def _random_front(rng) -> str:
+    # kurze Marker-Suppen: Buchstaben mit/ohne Klammer, dazwischen Wörter -> viele Gleichstände
+    tokens = []
+    for _ in range(rng.randint(0, 40)):
+        r = rng.random()
+        if r < 0.6:
+            tokens.append(rng.choice("aAbBcCdDeEfF") + rng.choice(("", "", ")", ".", ":", "-", ")")))
+        else:
+            tokens.append(rng.choice(("Typ", "Hepatitis", "x1", "Gruppe", "und", "a1", "(b)")))
+    return rng.choice((" ", "\n", "  ")).join(tokens)
+
+
+def test_pick_matches_scan_on_random_fronts():
+    rng = random.Random(24)
+    for _ in range(5000):
+        txt = _random_front(rng)
+        assert _spans(parsing._pick_best_sequence(txt)) == _spans(_pick_best_sequence_scan(txt)), txt
+
+
+def test_pick_matches_scan_on_pathological_fronts():
+    rng = random.Random(2024)
+    for _ in range(60):
+        txt = bench.pathological_front(rng)
+        assert _spans(parsing._pick_best_sequence(txt)) == _spans(_pick_best_sequence_scan(txt))
+
+
+def test_pick_simple_cases():
+    assert parsing._pick_best_sequence("Frage ohne Optionen") == []
+    seq = parsing._pick_best_sequence("Welcher Typ? a) eins b) zwei c) drei d) vier e) fünf")
+    assert [m.group(1) for m in seq] == list("abcde")
+    # ohne Klammer-Marker: lockere Suche („a “-Stil), Buchstaben in Wörtern zählen nicht
+    seq = parsing._pick_best_sequence("Hepatitis B bei Typ a? A eins B zwei C drei")
+    assert [m.group(1) for m in seq] == list("ABC")
@@ -0,0 +1,240 @@
+# test_qt_smoke.py — Übersichtstabelle und Teil-Updates der Vorschau headless (QT_QPA_PLATFORM=offscreen)
+#
+# aqt.qt lädt QtWebEngine mit; fehlen dessen Systembibliotheken (CI-Container), wird für diese Tests
+# ein schmales aqt.qt aus PyQt6.QtCore/QtGui/QtWidgets eingesetzt und danach wieder entfernt.
+import os
+import sys
+import types
+import importlib
+
+import pytest
+
+from standalone import PACKAGE
+
+pytest.importorskip("PyQt6.QtWidgets", reason="PyQt6 nicht installiert")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ENTRY = {
+    "Frage": "Welcher Laborwert ist beim Infarkt zuerst erhöht?",
+    "Antwort A": "Myoglobin", "Antwort B": "Troponin", "Antwort C": "CK-MB",
+    "Antwort D": "LDH", "Antwort E": "AST",
+    "Kopfzeile": "Kardiologie", "Eigene Notizen": "", "Antwort": "Myoglobin steigt nach 1–2 h.",
+}
+
+
+def _qt_shim() -> dict:
+    import PyQt6.QtCore as QtCore
+    import PyQt6.QtGui as QtGui
+    import PyQt6.QtWidgets as QtWidgets
+    qt = types.ModuleType("aqt.qt")
+    for mod in (QtCore, QtGui, QtWidgets):
+        for name in dir(mod):
+            if not name.startswith("_"):
+                setattr(qt, name, getattr(mod, name))
+    aqt = types.ModuleType("aqt")
+    aqt.__path__ = []
+    aqt.mw = None
+    aqt.qt = qt
+    return {"aqt": aqt, "aqt.qt": qt}
+
+
+@pytest.fixture(scope="module")
+def qt():
+    saved = {name: sys.modules.get(name) for name in ("aqt", "aqt.qt")}
+    try:
+        import aqt.qt  # noqa: F401
+    except ImportError:
+        sys.modules.update(_qt_shim())
+    try:
+        from aqt.qt import QApplication
+        app = QApplication.instance() or QApplication([])
+        yield types.SimpleNamespace(
+            app=app,
+            overview=importlib.import_module(f"{PACKAGE}.overview"),
+            preview=importlib.import_module(f"{PACKAGE}.preview"),
+            render=importlib.import_module(f"{PACKAGE}.render"),
+        )
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+class FakeNotes:
+    """NoteInfoStore-Ersatz: Infos fest vorgegeben, Dubletten-Stufen erst nach get(tier=...) und dann gemerkt."""
+
+    def __init__(self, infos, fuzzy):
+        self.infos = infos          # nid -> Info mit dem Ergebnis der exakten Prüfung
+        self.fuzzy = fuzzy          # nids, die die Fuzzy-Prüfung als Dublette meldet
+        self.exact = set()
+        self.checked = set()
+        self.tiers = []
+
+    def get(self, nid, tier=0):
+        self.tiers.append(tier)
+        base = self.infos[nid]
+        if tier >= 1:  # TIER_EXACT
+            self.exact.add(nid)
+        if tier >= 2:  # TIER_FUZZY
+            self.checked.add(nid)
+        done = 2 if nid in self.checked or base["prop"] is None else 1 if nid in self.exact else 0
+        info = dict(base, dup_tier=done, has_duplicate=base["has_duplicate"] and done >= 1)
+        info["is_fuzzy_duplicate"] = nid in self.checked and nid in self.fuzzy
+        return info
+
+
+def _info(question, warnings=(), has_duplicate=False):
+    prop = dict(ENTRY, Frage=question) if question else None
+    return {"prop": prop, "warnings": list(warnings), "has_warnings": bool(warnings),
+            "has_duplicate": has_duplicate, "no_correct": False}
+
+
+def _model(qt, run_in_background=None):
+    notes = FakeNotes({
+        10: _info("Zeta"),
+        11: _info("alpha", warnings=["Kopfzeile fehlt"]),
+        12: _info("Mitte", has_duplicate=True),
+        13: _info(None),
+        14: _info("beta"),
+    }, fuzzy={14})
+    ai_results = {11: (dict(ENTRY, Frage="Omega (AI)"), [])}
+    model = qt.overview.OverviewModel(notes, ai_results, run_in_background=run_in_background)
+    model.set_ids([10, 11, 12, 13, 14])
+    return model, notes
+
+
+def _column(model, col, role=None):
+    from aqt.qt import Qt
+    role = role or Qt.ItemDataRole.DisplayRole
+    return [model.data(model.index(row, col), role) for row in range(model.rowCount())]
+
+
+def test_overview_rows_and_data(qt):
+    model, notes = _model(qt)
+    assert model.rowCount() == 5 and model.columnCount() == 3
+    assert _column(model, 0) == ["1", "2", "3", "4", "5"]
+    # Spalte 2 zeigt den AI-Vorschlag vor dem geparsten
+    assert _column(model, 2) == ["Zeta", "Omega (AI)", "Mitte", "", "beta"]
+    # ohne run_in_background rechnet data() die Fuzzy-Stufe sofort
+    labels = qt.overview.STATUS_LABELS
+    ov = qt.overview
+    assert _column(model, 1) == [labels[s] for s in
+                                 (ov.ST_OK, ov.ST_AI, ov.ST_DUPLICATE, ov.ST_NO_CORRECT, ov.ST_FUZZY)]
+    assert notes.checked == {10, 14}
+
+
+def test_overview_sort_matches_display(qt):
+    from aqt.qt import Qt
+    model, notes = _model(qt)
+    ov = qt.overview
+
+    model.sort(2, Qt.SortOrder.AscendingOrder)
+    assert _column(model, 2) == ["", "beta", "Mitte", "Omega (AI)", "Zeta"]
+
+    # Sortieren rechnet keine Dublettenstufe nach: ungeprüfte Zeilen im eigenen Eimer
+    notes.tiers.clear()
+    model.sort(1, Qt.SortOrder.AscendingOrder)
+    assert model._rows == [13, 11, 10, 12, 14]  # keine Lösung, AI, dann ungeprüft in Listenfolge
+    assert set(notes.tiers) == {0}
+
+    # angezeigt -> Fuzzy-Stufe gerechnet -> neu sortiert nach dem, was jetzt in der Tabelle steht
+    shown = _column(model, 1)
+    model.sort(1, Qt.SortOrder.AscendingOrder)
+    assert sorted(shown, key=list(ov.STATUS_LABELS.values()).index) == _column(model, 1)
+    assert _column(model, 1)[0] == ov.STATUS_LABELS[ov.ST_OK]
+
+
+def test_set_ids_keeps_sorted_order_and_places_changed_rows(qt):
+    from aqt.qt import Qt
+    model, notes = _model(qt)
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    _column(model, 1)  # anzeigen -> Stufen gerechnet
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert model._rows == [11, 14, 12, 13, 10]  # AI, Fuzzy, Dublette, keine Lösung, ok
+
+    # neuer Filter: 13 fällt raus, 15 kommt dazu, 10 bekommt einen AI-Vorschlag
+    notes.infos[15] = _info("gamma", has_duplicate=True)
+    model.ai_results[10] = (dict(ENTRY, Frage="AI"), [])
+    notes.tiers.clear()
+    model.set_ids([10, 11, 12, 14, 15])
+    assert model._rows == [15, 11, 10, 14, 12]  # 15 ungeprüft (ST_PENDING oben), 10 jetzt bei AI
+    assert set(notes.tiers) == {0}
+    expected = list(model._rows)
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert model._rows == expected
+    assert [model.row_of(nid) for nid in expected] == list(range(5))
+
+
+def test_overview_pending_rows_filled_in_background(qt):
+    jobs = []
+    model, notes = _model(qt, run_in_background=lambda fn, on_done: jobs.append((fn, on_done)))
+    changed = []
+    model.dataChanged.connect(lambda top, bottom: changed.append(top.row()))
+    ov = qt.overview
+
+    assert _column(model, 1)[0] == ov.STATUS_LABELS[ov.ST_PENDING]
+    assert len(jobs) == 1 and not notes.checked  # immer nur eine Hintergrund-Aufgabe zugleich
+
+    while jobs:
+        fn, on_done = jobs.pop()
+        on_done(types.SimpleNamespace(result=fn))
+    assert sorted(changed) == [0, 4]
+    assert _column(model, 1)[4] == ov.STATUS_LABELS[ov.ST_FUZZY]
+    _column(model, 1)
+    assert not jobs  # schon angefragte Zeilen nicht erneut einreihen
+
+
+def _doc(qt, prop):
+    from aqt.qt import QTextDocument
+    doc = QTextDocument()
+    doc.setDefaultStyleSheet(qt.render.PROP_CSS)
+    doc.setUndoRedoEnabled(False)
+    doc.setHtml(qt.render.render_prop_html(prop))
+    return doc
+
+
+def _blocks(doc):
+    """Pro Block Text und Formatierung der Fragmente (Farbe, fett); leerer Wert = Label ohne Leerzeichen."""
+    out, block = [], doc.begin()
+    while block.isValid():
+        frags, it = [], block.begin()
+        while not it.atEnd():
+            frag = it.fragment()
+            fmt = frag.charFormat()
+            style = (fmt.foreground().color().name(), fmt.fontWeight())
+            if frags and frags[-1][1] == style:
+                frags[-1] = (frags[-1][0] + frag.text(), style)
+            else:
+                frags.append((frag.text(), style))
+            it += 1
+        frags = [(text.rstrip(), style) for text, style in frags if text.strip()]
+        out.append((block.text().rstrip(), frags))
+        block = block.next()
+    return out
+
+
+def test_preview_patch_matches_full_render(qt):
+    edited = dict(ENTRY, **{"Frage": "Welches Enzym <b>zuerst</b>?", "Antwort B": "",
+                            "Eigene Notizen": "merken\nzweite Zeile", "Antwort": "kurz"})
+    doc = _doc(qt, ENTRY)
+    patcher = qt.preview.PreviewPatcher(doc)
+    fields = [f for f in qt.render.PROP_FIELDS if edited[f] != ENTRY[f]]
+    assert patcher.patch(edited, fields)
+    assert _blocks(doc) == _blocks(_doc(qt, edited))
+
+    # Cursor bleiben über mehrere Teil-Updates gültig
+    assert patcher.patch(ENTRY, fields)
+    assert _blocks(doc) == _blocks(_doc(qt, ENTRY))
+
+
+def test_preview_patch_refuses_foreign_documents(qt):
+    from aqt.qt import QTextDocument
+    doc = QTextDocument()
+    doc.setHtml("<i>Kein sicherer Vorschlag – bitte Bearbeiten…</i>")
+    assert qt.preview.PreviewPatcher(doc).patch(ENTRY, ["Frage"]) is False
+
+    # Wert mit eigenem Absatz -> Zeilengrenzen verschoben, Aufrufer rendert komplett
+    doc = _doc(qt, ENTRY)
+    assert qt.preview.PreviewPatcher(doc).patch(dict(ENTRY, Frage="<p>eins</p><p>zwei</p>"), ["Frage"]) is False
@@ -0,0 +1,99 @@
+# test_sanitize.py — sanitize_keep_img (Tokenizer) gegen die frühere bs4-Variante und feste Erwartungen
+import os
+import json
+import importlib
+
+import pytest
+
+from standalone import PACKAGE
+
+util = importlib.import_module(f"{PACKAGE}.util")
+
+MEDIA_DIR = "/tmp/mc_mapper_media"
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+with open(os.path.join(DATA_DIR, "exam_html.json"), encoding="utf-8") as fh:
+    EXAM_FIELDS = json.load(fh)  # typische Prüfungsfelder (Word/Anki-Editor), auch Grundlage von bench.py
+
+# Gezielte Randfälle; dazu kommen die Prüfungsfelder aus EXAM_FIELDS
+CASES = [
+    # Entities und Zeichenreferenzen
+    "a &amp; b &lt;c&gt; &quot;d&quot; &nbsp;e",
+    "&#150; &#x2013; &#X2013; &#8211; &#; &#x; &#99999999; &#65abc; &#x41zz;",
+    "&auml;&Ouml;&szlig; &unknown; &amp &lt &copy2020",
+    "Na&lt;sup&gt;+&lt;/sup&gt; bleibt Text",
+    # Kommentare, CDATA, Deklarationen, Processing Instructions
+    "<!-- k -->Text<!---->",
+    "<!--a<b>c</b>-->x",
+    "<![CDATA[ x < y ]]>Text",
+    "<!DOCTYPE html>Text",
+    "<?xml version='1.0'?>Text",
+    # nicht geschlossene und falsch verschachtelte Tags
+    "<div><b>Fett <i>kursiv</b> normal?</i></div> danach",
+    "<p>A<p>B<div>C</p>D",
+    "<span>eins</div>zwei</span></span>drei",
+    "<div><div><div>tief</div>",
+    "<li>eins<li>zwei</ul>",
+    "<td>zelle</tr>text</table>",
+    "<b><u><i>alles</b></u></i><br/>Rest</br>",
+    "Vor<script>var a = '<b>';</script>Nach<style>p{}</style>Ende",
+    "<script>nie geschlossen <b>fett</b>",
+    # pre / textarea
+    "<pre>  a\n    b\n\n\tc</pre>  x   y",
+    "<pre><b>fett   im pre</b>\n<img src='p.png'>  </pre>",
+    "<textarea>  a   b\n\n c </textarea> x   y",
+    "<pre>  <pre> doppelt </pre>  raus </pre>  ",
+    # img: Quoting, Groß-/Kleinschreibung, leere und doppelte Attribute
+    "<IMG SRC=\"Abb 1.PNG\" ALT='x \"y\"' Width=300>Text",
+    "<img src='ekg_\"typisch\".png' class=\"  a \t b  \">",
+    "<img src=ohne.png alt=ohne-anfuehrung>",
+    "<img src=\"x.png\" src=\"y.png\" alt>",
+    "<img\nsrc=\"umbruch.png\"\n\nalt=\"zeilen\">",
+    "<img src=\"q&amp;a.png\" alt=\"&lt;pfeil&gt;\">",
+    "<img src=\"\">leer<img alt=\"ohne src\"><img src=\"   \">",
+    # file://-Vorschau: relative Pfade umschreiben, absolute URIs nicht
+    "<img src=\"lokal.jpg\"><img src=\"a b/ä ö.png\">",
+    "<img src=\"file:///C:/anki/x.png\"><img src=\"HTTPS://example.org/a.png\"><img src=\"http://x/b.png\">",
+    # Leerraum
+    "   \n\n  <div>  </div>\n<div>\n</div>  viele    Leerzeichen  \n\n\n  Ende  ",
+    "A\r\nB\rC\n\r\nD",
+    "<span> </span><span>\n</span><span>\t \t</span>x",
+    "",
+]
+
+EXPECTED = [
+    ("Fieber &gt;38,5&deg;C &#150; CRP", {}, "Fieber >38,5°C – CRP"),
+    ("<div><b>Fett <i>kursiv</b> normal?</i></div> danach", {}, "Fett kursiv normal?\n danach"),
+    ("<p>A<p>B<br>C", {}, "AB\nC"),
+    ("<pre>  a\n  b</pre>  x   y", {}, "a\n b x y"),
+    ("Vor<script>var a = '<b>';</script>Nach<!-- k -->", {}, "VorNach<!-- k -->"),
+    ("<IMG class=\"a\tb\" SRC=\"Abb 1.PNG\" ALT='x \"y\"'>Text", {},
+     "<img alt='x \"y\"' class=\"a b\" src=\"Abb 1.PNG\"/>Text"),
+    ("<IMG class=\"a\tb\" SRC=\"Abb 1.PNG\" ALT='x \"y\"'>Text", {"preview": True, "media_dir": "/m"},
+     "<img alt='x \"y\"' class=\"a b\" src=\"file:///m/Abb%201.PNG\"/>Text"),
+    ("<img src=\"https://example.org/a.png\">", {"preview": True, "media_dir": "/m"},
+     "<img src=\"https://example.org/a.png\"/>"),
+]
+
+KWARGS = [{}, {"preview": True, "media_dir": MEDIA_DIR}]
+
+
+@pytest.mark.parametrize("html, kw, expected", EXPECTED)
+def test_expected_output(html, kw, expected):
+    assert util.sanitize_keep_img(html, **kw) == expected
+
+
+@pytest.mark.parametrize("kw", KWARGS, ids=["field", "preview"])
+@pytest.mark.parametrize("html", CASES + EXAM_FIELDS)
+def test_matches_bs4(html, kw):
+    pytest.importorskip("bs4", reason="bs4 nicht installiert: Vergleich mit _sanitize_keep_img_bs4 übersprungen")
+    assert util.sanitize_keep_img(html, **kw) == util._sanitize_keep_img_bs4(html, **kw)
+
+
+def test_parts_render_twice():
+    # Review rendert Feld und Vorschau aus denselben Teilen
+    html = "<div>Frage<img src='a.png'></div>"
+    parts = util.sanitize_parts(html)
+    assert util.render_sanitized(parts) == util.sanitize_keep_img(html)
+    assert util.render_sanitized(parts, preview=True, media_dir=MEDIA_DIR) == \
+        util.sanitize_keep_img(html, preview=True, media_dir=MEDIA_DIR)
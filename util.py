@@ -1,17 +1,18 @@
-# util.py — Konsistente, kompakte Previews mit Medien (mit bs4-Fallback)
+# util.py — Konsistente, kompakte Previews mit Medien
+import os
 import re
 import hashlib
 from html import unescape
+from html.entities import html5
+from html.parser import HTMLParser
+from functools import lru_cache
 from pathlib import Path
 
-# bs4 optional
-try:
-    from bs4 import BeautifulSoup
-    _HAS_BS4 = True
-except Exception:
-    _HAS_BS4 = False
-
 from .config import TAG_HASH_PREFIX
+from .notedata import iter_note_rows
+from .stats import stage
+
+USER_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_files")
 
 # --- Normalisierung von Feldnamen (robust ggü. Umlauten/Interpunktion) ---
 def _norm_name(s: str) -> str:
@@ -35,37 +36,217 @@ def _clean_ws_multiline(txt: str) -> str:
     return txt.strip()
 
 
-def _strip_html_simple(html: str, *, preview: bool = False, media_dir: str | None = None) -> str:
+# --- Sanitizer: ein Durchlauf über html.parser, gleiche Ausgabe wie der frühere bs4-Weg ---
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta",
+    "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex",
+    "nextid", "spacer",
+})
+_BLOCK_TAGS = frozenset({"p", "div", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6"})
+_DROP_TAGS = frozenset({"script", "style"})
+_PRE_TAGS = frozenset({"pre", "textarea"})
+_LIST_ATTRS = frozenset({"class", "accesskey", "dropzone"})  # mehrwertige Attribute (Leerraum normalisiert)
+_ASCII_SPACES = " \n\t\x0c\r"
+_CRLF_RE = re.compile(r"\r\n?")
+_SPACES_RE = re.compile(r"[ \t\u00a0]+")
+_NEWLINES_RE = re.compile(r"\n{2,}")
+_CHARREF_RE = {10: re.compile(r"^([0-9]+)(.*)", re.S), 16: re.compile(r"^([0-9a-f]+)(.*)", re.S)}
+
+
+def _charref_char(num: int) -> str:
+    if num == 0 or num > 0x10FFFF or 0xD800 <= num <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= num <= 0x9F:
+        # &#150; & Co. stammen fast immer aus Windows-1252-Text
+        try:
+            return bytes([num]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(num)
+
+
+def _quote_attr(val: str) -> str:
+    if '"' in val and "'" not in val:
+        return f"'{val}'"
+    return f'"{val}"'
+
+
+class _KeepImgParser(HTMLParser):
     """
-    Fallback ohne BeautifulSoup:
-      - <br> -> \n
-      - <img src="..."> bleibt erhalten (bei preview=True ggf. in file:// umschreiben)
-      - sonstiges HTML entfernt
+    Streamt die Tokens von html.parser direkt in Ausgabeteile, ohne Baum:
+    Verschachtelung wird nur über einen Stack offener Tag-Namen nachgebildet
+    (schließendes Tag schließt bis zum passenden offenen, unbekannte werden ignoriert).
+    Teile sind Text oder die Attribute eines <img> (dict); render_sanitized() setzt sie zusammen.
     """
-    if not html:
-        return ""
-    s = html
-
-    # <br> -> \n
-    s = re.sub(r'(?i)<br\s*/?>', '\n', s)
 
-    # IMG: src extrahieren und ggf. auf file:// umschreiben
-    def _img_repl(m):
-        src = (m.group(1) or "").strip()
-        if preview and media_dir and not src.lower().startswith(("http://","https://","file://")):
-            src = Path(media_dir, src).absolute().as_uri()
-        return f'<img src="{src}">'
-
-    s = re.sub(r'(?is)<img\b[^>]*src="([^"]+)"[^>]*>', _img_repl, s)
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.out = []
+        self._data = []
+        self._stack = []
+        self._open = {}
+        self._drop = 0       # offene script/style -> Inhalt verwerfen
+        self._pre = 0        # offene pre/textarea -> Leerraum nicht zusammenfassen
+        self._void_closed = []
+
+    # ---- Text
+    def _flush(self, prefix: str | None = None, suffix: str = ""):
+        if not self._data:
+            return
+        data = "".join(self._data)
+        self._data = []
+        if not self._pre and not data.strip(_ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        if self._drop:
+            return
+        if prefix is None:
+            self.out.append(data)
+        else:
+            self.out.append(unescape(prefix + data + suffix))
+
+    def _special(self, data: str, prefix: str, suffix: str):
+        self._flush()
+        self._data.append(data)
+        self._flush(prefix, suffix)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+        base, reg = 10, _CHARREF_RE[10]
+        if name[:1] in ("x", "X"):
+            name, base, reg = name[1:], 16, _CHARREF_RE[16]
+        try:
+            self._data.append(_charref_char(int(name, base)))
+            return
+        except ValueError:
+            pass
+        m = reg.search(name)
+        if m is not None:
+            self._data.append(_charref_char(int(m.group(1), base)))
+            name = m.group(2)
+        self._data.append(name)
+
+    def handle_entityref(self, name):
+        self._data.append(html5.get(name + ";", "&" + name))
+
+    def handle_comment(self, data):
+        self._special(data, "<!--", "-->")
+
+    def handle_decl(self, decl):
+        self._special(decl[len("DOCTYPE "):], "<!DOCTYPE ", ">\n")
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            self._special(data[len("CDATA["):], "<![CDATA[", "]]>")
+        else:
+            self._special(data, "<?", "?>")
+
+    def handle_pi(self, data):
+        self._special(data, "<?", ">")
+
+    # ---- Tags
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, _void_end=False)
+        self._end(tag)
+
+    def handle_starttag(self, tag, attrs, _void_end: bool = True):
+        self._flush()
+        if tag in _VOID_TAGS:
+            # leere Elemente haben keinen Inhalt -> gleich ausgeben statt auf den Stack
+            if not self._drop:
+                self._emit_void(tag, attrs)
+            if _void_end:
+                self._void_closed.append(tag)
+            self._open[tag] = self._open.get(tag, 0) + 1
+            self._stack.append(tag)
+            if _void_end:
+                self._end(tag)
+            return
+        self._stack.append(tag)
+        self._open[tag] = self._open.get(tag, 0) + 1
+        if tag in _DROP_TAGS:
+            self._drop += 1
+        if tag in _PRE_TAGS:
+            self._pre += 1
+
+    def handle_endtag(self, tag):
+        if tag in self._void_closed:
+            self._void_closed.remove(tag)
+            return
+        self._end(tag)
+
+    def _end(self, tag):
+        self._flush()
+        if not self._open.get(tag):
+            return
+        while self._stack:
+            name = self._stack.pop()
+            self._open[name] -= 1
+            if name in _DROP_TAGS:
+                self._drop -= 1
+            elif name in _PRE_TAGS:
+                self._pre -= 1
+            elif name in _BLOCK_TAGS and not self._drop:
+                self.out.append("\n")
+            if name == tag:
+                break
+
+    def _emit_void(self, tag, attrs):
+        if tag == "br":
+            self.out.append("\n")
+            return
+        if tag != "img":
+            return
+        values = {}
+        for key, val in attrs:
+            values[key] = "" if val is None else val
+        if (values.get("src") or "").strip():
+            self.out.append(values)
+
+    def result(self) -> list:
+        self.close()
+        self._flush()
+        while self._stack:
+            self._end(self._stack[0])
+        return self.out
+
+
+@lru_cache(maxsize=4096)
+def media_uri(media_dir: str, src: str) -> str:
+    """file://-URI einer Mediendatei; gemerkt, weil dieselben Bilder bei jedem Vor/Zurück wieder auftauchen."""
+    return Path(media_dir, src).absolute().as_uri()
+
+
+def _img_tag(values: dict, preview: bool, media_dir: str | None) -> str:
+    src = values["src"].strip()
+    if preview and media_dir and not src.lower().startswith(("http://", "https://", "file://")):
+        values = dict(values, src=media_uri(media_dir, src))
+    parts = []
+    for key in sorted(values):
+        val = values[key]
+        if key in _LIST_ATTRS:
+            val = " ".join(val.split())
+        parts.append(f"{key}={_quote_attr(val)}")
+    return "<img " + " ".join(parts) + "/>"
+
+
+@stage("util.sanitize")
+def sanitize_parts(html: str) -> list:
+    """Tokenisiert einmal; das Ergebnis kann mit render_sanitized() mehrfach (Feld/Preview) gerendert werden."""
+    if not html:
+        return []
+    parser = _KeepImgParser()
+    parser.feed(html)
+    return parser.result()
 
-    # Restliches HTML weg
-    s = re.sub(r'(?is)<[^>]+>', ' ', s)
 
-    # Normalisieren
-    txt = unescape(s).replace('\r', '')
-    txt = re.sub(r'[ \t]+', ' ', txt)
-    txt = re.sub(r'\n{2,}', '\n', txt)
-    return _clean_ws_multiline(txt)
+def render_sanitized(parts: list, *, preview: bool = False, media_dir: str | None = None) -> str:
+    txt = "".join(p if isinstance(p, str) else _img_tag(p, preview, media_dir) for p in parts)
+    txt = _CRLF_RE.sub("\n", txt)
+    txt = _SPACES_RE.sub(" ", txt)
+    txt = _NEWLINES_RE.sub("\n", txt)
+    return txt.strip()
 
 
 def sanitize_keep_img(html: str, *, preview: bool = False, media_dir: str | None = None) -> str:
@@ -75,11 +256,18 @@ def sanitize_keep_img(html: str, *, preview: bool = False, media_dir: str | None
     - Blockelemente fügen EINEN '\n' an (kompakt)
     - preview=True: src -> file:// Pfade (QTextBrowser)
     - Keine künstlichen \n um <img> (Spacing macht CSS)
+    Ein Durchlauf über den Tokenizer; Ausgabe identisch zu _sanitize_keep_img_bs4.
     """
     if not html:
         return ""
-    if not _HAS_BS4:
-        return _strip_html_simple(html, preview=preview, media_dir=media_dir)
+    return render_sanitized(sanitize_parts(html), preview=preview, media_dir=media_dir)
+
+
+def _sanitize_keep_img_bs4(html: str, *, preview: bool = False, media_dir: str | None = None) -> str:
+    """Frühere BeautifulSoup-Variante; nur noch Referenz für Vergleichsläufe."""
+    if not html:
+        return ""
+    from bs4 import BeautifulSoup
 
     soup = BeautifulSoup(html, "html.parser")
 
@@ -113,25 +301,32 @@ def sanitize_keep_img(html: str, *, preview: bool = False, media_dir: str | None
     return txt
 
 
-def strip_html_keep_media(html: str) -> str:
-    if not html:
-        return ""
-    txt = sanitize_keep_img(html, preview=False, media_dir=None)
+def one_line(txt: str) -> str:
     # Für Feldspeicher: kompakt auf einer Zeile (Q/A-Felder)
     txt = txt.replace("\n", " ")
     txt = re.sub(r"\s+", " ", txt).strip()
     return txt
 
 
-def normalize_option_text(s: str) -> str:
-    if s is None:
+def strip_html_keep_media(html: str) -> str:
+    if not html:
         return ""
-    txt = strip_html_keep_media(s)
+    return one_line(sanitize_keep_img(html, preview=False, media_dir=None))
+
+
+def strip_option_prefix(txt: str) -> str:
+    """Zweiter Teil von normalize_option_text für bereits HTML-bereinigten Text."""
     txt = re.sub(r"^\s*([a-eA-E])(?:[\)\.\:\-])?\s+", "", txt)
     txt = re.sub(r"\s+", " ", txt).strip()
     return txt
 
 
+def normalize_option_text(s: str) -> str:
+    if s is None:
+        return ""
+    return strip_option_prefix(strip_html_keep_media(s))
+
+
 def find_model_by_name(col, name: str):
     for m in col.models.all():
         if m["name"] == name:
@@ -146,53 +341,82 @@ def _field(note, name: str) -> str:
         return ""
 
 
-def html_preview(note, media_dir: str | None = None):
+PREVIEW_CSS = """
+  .wrap { font-family: Segoe UI, Arial; font-size:12px; line-height:1.35; }
+  .row  { margin: 4px 0 6px; }
+  .lbl  { font-weight:700; display:inline-block; min-width:110px; }
+  .val  { display:inline; }
+  img   { max-width: 100%; height: auto; display:block; margin:6px 0; }
+  i     { color:#888; }
+"""
+
+
+@stage("render.html_preview")
+def html_preview(note, media_dir: str | None = None, ir=None, css: bool = True):
     """
     ALT-Ansicht: kompakte Zeilen, Label inline (z. B. „Vorderseite: …“).
     Bilder werden blockig mit moderatem Abstand dargestellt.
+    Mit `ir` (parsing.NoteIR) werden die dort schon tokenisierten Felder wiederverwendet.
+    css=False: ohne <style>-Block (PREVIEW_CSS ist dann defaultStyleSheet der Ansicht).
     """
-    all_names = [f["name"] for f in note.model()["flds"]]
+    all_names = list(ir.names) if ir is not None else [f["name"] for f in note.model()["flds"]]
     # Feldreihenfolge: bevorzugt Vorderseite/Rückseite zuerst, dann Rest
     front = [n for n in all_names if _norm_name(n) in FRONT_KEYS]
     back  = [n for n in all_names if _norm_name(n) in BACK_KEYS]
     others = [n for n in all_names if n not in front + back]
     ordered = front + back + others
 
-    def _prep(val: str) -> str:
-        txt = sanitize_keep_img(val, preview=True, media_dir=media_dir)
+    def _prep(nm: str) -> str:
+        if ir is not None:
+            txt = ir.preview(nm, media_dir)
+        else:
+            txt = sanitize_keep_img(_field(note, nm), preview=True, media_dir=media_dir)
         return (txt or "(leer)").replace("\n", "<br>")
 
     rows = []
     for nm in ordered:
-        html = _prep(_field(note, nm))
+        html = _prep(nm)
         rows.append(f"<div class='row'><span class='lbl'>{nm}:</span> <span class='val'>{html}</span></div>")
 
-    css = """
-    <style>
-      .wrap { font-family: Segoe UI, Arial; font-size:12px; line-height:1.35; }
-      .row  { margin: 4px 0 6px; }
-      .lbl  { font-weight:700; display:inline-block; min-width:110px; }
-      .val  { display:inline; }
-      img   { max-width: 100%; height: auto; display:block; margin:6px 0; }
-      i     { color:#888; }
-    </style>
-    """
-    return css + "<div class='wrap'>" + "".join(rows) + "</div>"
+    body = "<div class='wrap'>" + "".join(rows) + "</div>"
+    return f"<style>{PREVIEW_CSS}</style>" + body if css else body
+
+
+def with_img_breaks_exact(html: str) -> str:
+    if not html:
+        return ""
+    def repl(m):
+        return "<br>" + m.group(1) + "<br>"
+    html = re.sub(r"(?is)(?:\s*(?:<br\s*/?>\s*)+)?(<img\b[^>]*>)(?:\s*(?:<br\s*/?>\s*)+)?", repl, html)
+    html = re.sub(r"(?is)(<br\s*/?>\s*){3,}", r"<br><br>", html)
+    return html
+
+
+COMBO_FIELDS = ("Frage", "Antwort A", "Antwort B", "Antwort C", "Antwort D", "Antwort E")
+
+
+_BR_RE = re.compile(r"(?i)<br\s*/?>")
 
 
 def normalize_combo_key(prop: dict) -> str:
-    parts = [
-        prop.get("Frage", ""),
-        prop.get("Antwort A", ""),
-        prop.get("Antwort B", ""),
-        prop.get("Antwort C", ""),
-        prop.get("Antwort D", ""),
-        prop.get("Antwort E", ""),
-    ]
+    # <br> zählt als Leerraum: angelegte Notizen tragen die Bild-Umbrüche von with_img_breaks_exact,
+    # Parser-Vorschläge nicht -> gleicher Key für Vorschlag und daraus erzeugte Notiz
+    parts = [_BR_RE.sub(" ", prop.get(f) or "") for f in COMBO_FIELDS]
     txt = "||".join(re.sub(r"\s+", " ", p).strip() for p in parts)
     return txt.lower()
 
 
+def user_files_dir(*parts: str) -> str:
+    """Pfad in user_files; USER_FILES wird erst beim Aufruf gelesen (standalone.load_addon setzt es um)."""
+    return os.path.join(USER_FILES, *parts)
+
+
+def user_files_path(col, filename: str) -> str:
+    """Pfad in user_files, pro Collection getrennt (Profile teilen sich den Add-on-Ordner)."""
+    col_key = hashlib.sha1(str(getattr(col, "path", "")).encode("utf-8")).hexdigest()[:10]
+    return user_files_dir(f"{col_key}_{filename}")
+
+
 def key_to_tag(key: str) -> str:
     h = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
     return f"{TAG_HASH_PREFIX}{h}"
@@ -204,8 +428,17 @@ def compute_fuzz_ratio(text1: str, text2: str) -> float:
         return 0.0
     return difflib.SequenceMatcher(None, text1, text2).ratio()
 
-def find_similar_notes_fuzzy(col, text: str, threshold: float = 0.85):
-    """Findet Notizen, deren 'Frage'-Feld dem Text ähnelt."""
+@stage("dup.fuzzy")
+def find_similar_notes_fuzzy(col, text: str, threshold: float = 0.85, model=None, top_k: int | None = None):
+    """Findet Notizen, deren 'Frage'-Feld dem Text ähnelt.
+
+    Mit `model` wird der persistente MinHash/LSH-Index des Ziel-Notiztyps abgefragt
+    (siehe dupindex.py); ohne `model` bleibt der alte Wortsuche-Scan als Fallback.
+    """
+    if model is not None:
+        from .dupindex import get_fuzzy_index, DEFAULT_TOP_K
+        return get_fuzzy_index(col, model).query(text, threshold, top_k or DEFAULT_TOP_K)
+
     # Performance-Hack: Suche erst grob nach Wörtern, dann fuzzy prüfen
     # Um nicht die ganze DB zu scannen, suchen wir nach dem längsten Wort
     words = [w for w in text.split() if len(w) > 4]
@@ -217,13 +450,11 @@ def find_similar_notes_fuzzy(col, text: str, threshold: float = 0.85):
     candidate_ids = col.find_notes(f'"{search_term}"')
     
     hits = []
-    for nid in candidate_ids:
-        note = col.get_note(nid)
+    for row in iter_note_rows(col, candidate_ids):
         # Wir nehmen an, das erste Feld ist die Frage (oder wir scannen alle)
-        n_text = note.fields[0] 
-        ratio = compute_fuzz_ratio(text, n_text)
+        ratio = compute_fuzz_ratio(text, row.fields[0])
         if ratio >= threshold:
-            hits.append((nid, ratio))
+            hits.append((row.id, ratio))
     
     hits.sort(key=lambda x: x[1], reverse=True)
-    return hits
\ No newline at end of file
+    return hits[:top_k] if top_k else hits